@@ -0,0 +1,106 @@
+"""
+Load test: concurrent in-flight requests per worker on the thread endpoint.
+
+Compares a synchronous worker, which serves one request at a time, with the
+async views served on a single event loop. Gemini is replaced by a fake client
+that sleeps for a fixed latency, so the numbers only reflect how many
+requests one worker keeps in flight. The fake is
+resumax_algo.fake_gemini.FakeClient; see benchmarks/load_test.py for a fuller
+load test with users, attachments and per-stage percentiles.
+
+Usage (from resumax_backend/):
+    python benchmarks/concurrent_requests.py --requests 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "resumax_backend.settings")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.ALLOWED_HOSTS = ["testserver"]
+    settings.LOGGING["loggers"]["resumax_algo"]["level"] = "ERROR"
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def run_sync_worker(client, thread_ids):
+    """One request at a time, as a synchronous WSGI worker would serve them."""
+    start = time.perf_counter()
+    for thread_id in thread_ids:
+        response = client.post(f"/api/threads/{thread_id}/", {"prompt-text": "Review my resume"})
+        assert response.status_code == 200, response.content[:200]
+    return time.perf_counter() - start
+
+
+async def run_async_worker(client, thread_ids):
+    """All requests concurrently on one event loop, as a single ASGI worker."""
+    async def send(thread_id):
+        response = await client.post(f"/api/threads/{thread_id}/", {"prompt-text": "Review my resume"})
+        assert response.status_code == 200, response.content[:200]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(thread_id) for thread_id in thread_ids))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Gemini latency in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(os.path.join(tmp_dir, "benchmark.sqlite3"))
+        from django.conf import settings
+        from django.contrib.auth.models import User
+        from django.test import AsyncClient, Client
+        from resumax_algo import gemini_model
+        from resumax_algo.models import ConversationsThread
+
+        user = User.objects.create_user(username="loadtest", password="loadtest")
+        threads = [
+            ConversationsThread.objects.create(title=f"Thread {i}", user=user).id
+            for i in range(args.requests)
+        ]
+        gemini_model._base_knowledge_uris = []
+
+        results = {}
+        for mode in ("sync", "async"):
+            settings.RESUMAX_GEMINI_CLIENT = {
+                'BACKEND': 'resumax_algo.fake_gemini.FakeClient',
+                'OPTIONS': {'latency': args.latency, 'upload_delay': 0},
+            }
+            gemini_model.reset_genai_client()
+            gemini_model.reset_chat_session_store()
+            fake_client = gemini_model._get_genai_client()
+            if mode == "sync":
+                client = Client()
+                client.force_login(user)
+                elapsed = run_sync_worker(client, threads)
+            else:
+                client = AsyncClient()
+                client.force_login(user)
+                elapsed = asyncio.run(run_async_worker(client, threads))
+            results[mode] = (elapsed, fake_client.max_in_flight)
+
+    print(f"{args.requests} requests, fake Gemini latency {args.latency}s")
+    print(f"{'worker':<8}{'seconds':>10}{'req/s':>10}{'max in-flight':>16}")
+    for mode, (elapsed, max_in_flight) in results.items():
+        print(f"{mode:<8}{elapsed:>10.2f}{args.requests / elapsed:>10.1f}{max_in_flight:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: reference-document prompt tokens versus base-knowledge corpus size.
+
+Builds synthetic corpora of tagged passages, indexes them in a throwaway
+vector store and, for a set of prompts, compares the tokens of attaching the
+whole corpus (what uploading every base-knowledge file costs) with the
+passages knowledge_base.select_passages picks under the token budget, and
+times the selection.
+
+Usage (from resumax_backend/):
+    python benchmarks/knowledge_base_tokens.py --sizes 50 200 800 3200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "resumax_backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from resumax_algo import knowledge_base  # noqa: E402
+from resumax_algo.vector_store import VectorStore  # noqa: E402
+
+TOPICS = {
+    'resume': ["quantify each bullet with metrics", "keep the resume to one page", "list technical skills",
+               "order sections by relevance", "start bullets with action verbs"],
+    'academic_cv': ["list publications in a consistent citation style", "describe research methodology",
+                    "summarize grants and funding", "include teaching experience"],
+    'cover_letter': ["address the hiring manager by name", "reference the company's mission",
+                     "end with a call to action", "connect claims to resume evidence"],
+}
+DISCIPLINES = ['stem', 'business', 'humanities', 'social_sciences', 'arts']
+FILLER = ("Career advisors at the Loeb center recommend reviewing this with a peer before applying. "
+          "Tailor the wording to the role and keep formatting consistent across sections. ")
+PROMPTS = [
+    ("Does each bullet on my resume have metrics?", 'resume', 'stem'),
+    ("Which citation style should my publications use?", 'academic_cv', 'humanities'),
+    ("Does my cover letter end with a call to action?", 'cover_letter', 'business'),
+    ("Should I keep the resume to one page?", 'resume', None),
+]
+
+
+def synthetic_corpus(rng, size):
+    """Return ``size`` passages of about 1,000 characters; a third are untagged general advice."""
+    passages = []
+    for i in range(size):
+        doc_type = rng.choice(list(TOPICS))
+        general = rng.random() < 0.33
+        text = f"{rng.choice(TOPICS[doc_type]).capitalize()}. " + FILLER * 5
+        passages.append({
+            'title': '', 'source': f"guide_{i // 10}.pdf", 'page': i % 10 + 1, 'text': text,
+            'doc_types': [] if general else [doc_type],
+            'disciplines': [] if general or rng.random() < 0.5 else [rng.choice(DISCIPLINES)],
+        })
+    return passages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs='+', default=[50, 200, 800, 3200])
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--candidates", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"token budget {args.budget}, {args.candidates} candidates per prompt")
+    print(f"{'passages':>9}{'all tokens':>12}{'selected':>10}{'ratio':>9}{'select ms':>11}")
+    for size in args.sizes:
+        passages = synthetic_corpus(rng, size)
+        all_tokens = sum(knowledge_base.estimate_tokens(passage['text']) for passage in passages)
+        with tempfile.TemporaryDirectory() as path:
+            store = VectorStore(path)
+            store.rebuild([[
+                SimpleNamespace(id=i + 1, get_vectordb_text=lambda text=passage['text']: text)
+                for i, passage in enumerate(passages)
+            ]])
+            selected_tokens, timings = [], []
+            for prompt, doc_type, discipline in PROMPTS:
+                start = time.perf_counter()
+                results = store.search_ids(prompt, args.candidates)
+                candidates = [(score, passages[doc_id - 1]) for doc_id, score in results]
+                _, tokens = knowledge_base.select_passages(candidates, doc_type, discipline, args.budget)
+                timings.append(time.perf_counter() - start)
+                selected_tokens.append(tokens)
+        selected = statistics.mean(selected_tokens)
+        print(f"{size:>9,}{all_tokens:>12,}{selected:>10,.0f}{all_tokens / selected:>8.0f}x"
+              f"{1000 * statistics.mean(timings):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Load test: end-to-end requests on /api/threads/<id>/ with a fake Gemini client.
+
+Creates --users users with --threads threads each and sends --requests
+prompts from --concurrency concurrent clients on one event loop (a single
+ASGI worker). A share of the requests attach one of a few resumes, some are
+streamed. Gemini is resumax_algo.fake_gemini.FakeClient, selected through
+RESUMAX_GEMINI_CLIENT, so no network access is needed.
+
+Reports requests/sec and the p50/p95/p99 of whole requests and of every
+stage timed by resumax_algo.metrics. For CI, --max-p95 and --min-rps make the
+run exit with status 1 when it is slower.
+
+Usage (from resumax_backend/):
+    python benchmarks/load_test.py --users 20 --threads 3 --requests 200 --concurrency 32 --latency 0.3
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "resumax_backend.settings")
+
+RESUME_LINES = [
+    "Software Engineer, Acme Corp (2022 - present)",
+    "- Built a billing service handling 2M requests a day",
+    "- Led the migration of 40 services to Kubernetes",
+    "Research Assistant, Loeb Lab (2020 - 2022)",
+    "- Analyzed survey data of 3,000 participants with Python",
+    "Education: B.S. Computer Science, 2022",
+    "Skills: Python, Django, SQL, Go, Terraform",
+]
+
+
+def setup_django(tmp_dir, client_options):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = os.path.join(tmp_dir, "load_test.sqlite3")
+    # Uploads are registered from the Gemini executor threads, concurrently with the
+    # request thread: take SQLite's write lock when transactions start and wait for it
+    settings.DATABASES["default"].setdefault("OPTIONS", {}).update(timeout=30, transaction_mode="IMMEDIATE")
+    settings.MEDIA_ROOT = os.path.join(tmp_dir, "user_uploads")
+    settings.ALLOWED_HOSTS = ["testserver"]
+    settings.RESUMAX_GEMINI_CLIENT = {'BACKEND': 'resumax_algo.fake_gemini.FakeClient', 'OPTIONS': client_options}
+    # Quiet the per-request lines and retry warnings; the report summarizes them
+    settings.LOGGING["loggers"]["resumax_algo"]["level"] = "ERROR"
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def resumes(count, seed):
+    """Distinct plain-text resumes; requests pick among them, so repeats are de-duplicated."""
+    rng = random.Random(seed)
+    return [
+        ("\n".join(rng.sample(RESUME_LINES, len(RESUME_LINES))) + f"\nReference {index}\n").encode()
+        for index in range(count)
+    ]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StageSamples:
+    """Collects every stage observation, from any thread, for exact percentiles."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def __call__(self, stage, seconds):
+        with self.lock:
+            self.samples[stage].append(seconds)
+
+
+async def send_request(client, thread_id, prompt, attachment, stream):
+    """Post one prompt and read the whole response; returns whether it succeeded."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    data = {"prompt-text": prompt}
+    if attachment is not None:
+        data["prompt-file"] = SimpleUploadedFile("resume.txt", attachment, content_type="text/plain")
+    path = f"/api/threads/{thread_id}/" + ("?stream=1" if stream else "")
+    response = await client.post(path, data)
+    if stream:
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        return response.status_code == 200 and b"event: done" in body
+    return response.status_code == 200
+
+
+async def run_load(args, workload, clients):
+    """Send the workload from --concurrency workers; returns per-request latencies and failures."""
+    queue = asyncio.Queue()
+    for item in workload:
+        queue.put_nowait(item)
+    latencies = []
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            user_index, thread_id, prompt, attachment, stream = queue.get_nowait()
+            start = time.perf_counter()
+            ok = await send_request(clients[user_index], thread_id, prompt, attachment, stream)
+            latencies.append(time.perf_counter() - start)
+            failures += not ok
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=3, help="threads per user")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--attachment-share", type=float, default=0.5, help="share of requests with a resume")
+    parser.add_argument("--resumes", type=int, default=5, help="distinct resumes to attach")
+    parser.add_argument("--stream-share", type=float, default=0.25, help="share of streamed requests")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Gemini latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency variation, as a fraction")
+    parser.add_argument("--stream-chunks", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--upload-delay", type=float, default=0.05, help="fake file upload delay in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p95", type=float, help="fail if the request p95 exceeds this many seconds")
+    parser.add_argument("--min-rps", type=float, help="fail below this many requests per second")
+    args = parser.parse_args()
+
+    client_options = {
+        'latency': args.latency, 'jitter': args.jitter, 'stream_chunks': args.stream_chunks,
+        'failure_rate': args.failure_rate, 'upload_delay': args.upload_delay, 'seed': args.seed,
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(tmp_dir, client_options)
+        from django.contrib.auth.models import User
+        from django.test import AsyncClient
+        from resumax_algo import gemini_model, metrics
+        from resumax_algo.models import ConversationsThread
+
+        # No base-knowledge documents to upload, as in benchmarks/concurrent_requests.py
+        gemini_model._base_knowledge_uris = []
+        rng = random.Random(args.seed)
+        attachments = resumes(args.resumes, args.seed)
+        clients, threads = [], []
+        for user_index in range(args.users):
+            user = User.objects.create_user(username=f"load{user_index}", password="load")
+            client = AsyncClient()
+            client.force_login(user)
+            clients.append(client)
+            threads.extend(
+                (user_index, ConversationsThread.objects.create(title=f"Thread {i}", user=user).id)
+                for i in range(args.threads)
+            )
+        workload = [
+            (user_index, thread_id, f"Please review my resume, round {n}",
+             rng.choice(attachments) if rng.random() < args.attachment_share else None,
+             rng.random() < args.stream_share)
+            for n, (user_index, thread_id) in zip(range(args.requests), itertools.cycle(threads))
+        ]
+
+        stages = StageSamples()
+        metrics.add_stage_listener(stages)
+        start = time.perf_counter()
+        latencies, failures = asyncio.run(run_load(args, workload, clients))
+        elapsed = time.perf_counter() - start
+        metrics.remove_stage_listener(stages)
+        fake_stats = gemini_model._get_genai_client().stats()
+
+    rps = len(latencies) / elapsed
+    print(f"{len(latencies)} requests from {args.users} users in {elapsed:.2f}s: {rps:.1f} req/s, "
+          f"{failures} failed, concurrency {args.concurrency}, fake latency {args.latency}s")
+    print(f"fake Gemini: {fake_stats['requests']} calls, {fake_stats['failures']} injected failures, "
+          f"{fake_stats['uploads']} uploads, max {fake_stats['max_in_flight']} in flight")
+    print(f"{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    rows = [("request", latencies)] + sorted(stages.samples.items())
+    for name, samples in rows:
+        print(f"{name:<16}{len(samples):>8}" + "".join(
+            f"{value * 1000:>10.1f}" for value in (
+                percentile(samples, 0.50), percentile(samples, 0.95), percentile(samples, 0.99),
+                statistics.fmean(samples),
+            )
+        ))
+
+    p95 = percentile(latencies, 0.95)
+    regressions = []
+    if args.max_p95 is not None and p95 > args.max_p95:
+        regressions.append(f"request p95 {p95:.3f}s > {args.max_p95}s")
+    if args.min_rps is not None and rps < args.min_rps:
+        regressions.append(f"{rps:.1f} req/s < {args.min_rps}")
+    if regressions:
+        print("FAILED: " + "; ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
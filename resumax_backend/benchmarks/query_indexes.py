@@ -0,0 +1,153 @@
+"""
+Benchmark the hot conversation queries with and without the composite indexes.
+
+Builds a throwaway SQLite database at migration 0016 (before the indexes),
+fills it with conversations, times the queries, then applies 0017 and times
+them again.
+
+Usage (from resumax_backend/):
+    python benchmarks/query_indexes.py --conversations 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "resumax_backend.settings")
+
+BATCH_SIZE = 10000
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    django.setup()
+
+
+def populate(connection, users, threads_per_user, conversations):
+    """Insert rows with raw SQL; the ORM would take minutes for a million rows."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, "
+            "email, is_staff, is_active, date_joined) VALUES ('', 0, ?, '', '', '', 0, 1, ?)",
+            [(f"user{i}", start.isoformat()) for i in range(users)],
+        )
+        user_ids = [row[0] for row in cursor.execute("SELECT id FROM auth_user").fetchall()]
+        thread_rows = []
+        for user_id in user_ids:
+            for i in range(threads_per_user):
+                timestamp = (start + timedelta(minutes=random.randrange(500000))).isoformat()
+                thread_rows.append((f"Thread {i}", user_id, timestamp, timestamp))
+        cursor.executemany(
+            "INSERT INTO resumax_algo_conversationsthread (title, user_id, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?)",
+            thread_rows,
+        )
+        thread_ids = [row[0] for row in cursor.execute("SELECT id FROM resumax_algo_conversationsthread").fetchall()]
+
+        for offset in range(0, conversations, BATCH_SIZE):
+            rows = []
+            for i in range(offset, min(offset + BATCH_SIZE, conversations)):
+                timestamp = (start + timedelta(seconds=i)).isoformat()
+                rows.append((random.choice(thread_ids), f"Prompt {i}", f"Response {i}", "", timestamp))
+            cursor.executemany(
+                "INSERT INTO resumax_algo_conversation (thread_id, prompt, response, internal_analysis, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        cursor.execute(
+            "INSERT INTO resumax_algo_attachedfile (conversation_id, original_filename, stored_filename, "
+            "file_path, file_size, file_type, processing_status, error_message, created_at) "
+            "SELECT id, 'resume.pdf', '', '', 0, 'application/pdf', 'completed', '', created_at "
+            "FROM resumax_algo_conversation WHERE id % 10 = 0"
+        )
+        cursor.execute("ANALYZE")
+    return user_ids, thread_ids
+
+
+def time_query(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+# The columns of each table at migration 0017; fields added by later
+# migrations don't exist in this database, so the queries select only these
+CONVERSATION_FIELDS = ("id", "thread_id", "prompt", "response", "internal_analysis", "created_at")
+THREAD_FIELDS = ("id", "title", "user_id", "created_at", "updated_at")
+ATTACHED_FILE_FIELDS = (
+    "id", "conversation_id", "original_filename", "stored_filename", "file_path", "file_size", "file_type",
+    "processing_status", "error_message", "created_at",
+)
+
+
+def run_queries(user_ids, thread_ids, repeat):
+    from django.db.models import Count
+    from resumax_algo.models import AttachedFile, Conversation, ConversationsThread
+
+    # The busiest thread is the worst case for history rebuilds
+    busiest = (
+        Conversation.objects.values("thread_id").order_by()
+        .annotate(n=Count("id")).order_by("-n").first()["thread_id"]
+    )
+    recent_ids = list(
+        Conversation.objects.filter(thread_id=busiest).order_by("-created_at").values_list("id", flat=True)[:50]
+    )
+    queries = {
+        "history (last 15 turns)": lambda: list(
+            Conversation.objects.filter(thread_id=busiest).order_by("-created_at").values(*CONVERSATION_FIELDS)[:15]
+        ),
+        "thread list (50 newest)": lambda: list(
+            ConversationsThread.objects.filter(user_id=user_ids[0]).order_by("-updated_at").values(*THREAD_FIELDS)[:50]
+        ),
+        "attached files (page)": lambda: list(
+            AttachedFile.objects.filter(conversation_id__in=recent_ids).order_by("created_at")
+            .values(*ATTACHED_FILE_FIELDS)
+        ),
+    }
+    return {name: time_query(run, repeat) for name, run in queries.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--threads-per-user", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_django(os.path.join(tmp_dir, "benchmark.sqlite3"))
+        from django.core.management import call_command
+        from django.db import connection
+
+        call_command("migrate", verbosity=0)
+        call_command("migrate", "resumax_algo", "0016", verbosity=0)
+        print(f"Inserting {args.conversations:,} conversations...")
+        user_ids, thread_ids = populate(connection, args.users, args.threads_per_user, args.conversations)
+
+        before = run_queries(user_ids, thread_ids, args.repeat)
+        call_command("migrate", "resumax_algo", "0017", verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        after = run_queries(user_ids, thread_ids, args.repeat)
+
+    print(f"{'query':<28}{'no index (ms)':>15}{'indexed (ms)':>15}")
+    for name in before:
+        print(f"{name:<28}{before[name]:>15.3f}{after[name]:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 from django.contrib import admin
-from .models import AttachedFile, ConversationsThread, Conversation
+from .models import AttachedFile, ConversationsThread, Conversation, CritiqueJob, Document, RemoteFileUpload
 # Register your models here.
 admin.site.register(ConversationsThread)
 admin.site.register(Conversation)
-admin.site.register(AttachedFile)
\ No newline at end of file
+admin.site.register(AttachedFile)
+admin.site.register(RemoteFileUpload)
+admin.site.register(CritiqueJob)
+admin.site.register(Document)
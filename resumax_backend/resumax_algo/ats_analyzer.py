@@ -0,0 +1,247 @@
+"""
+Deterministic PASS 1 (ATS & technical compliance) analysis.
+
+The checks the system prompt asks the model to estimate (page count, font
+consistency, tables and graphics, section order, contact details and
+keyword density) are computed exactly from the PyMuPDF extraction cached by
+``extraction``. The report is stored in ``Conversation.internal_analysis``
+and a compact summary is sent with the prompt, so the model reuses the
+numbers instead of re-deriving them and the score is reproducible.
+"""
+from collections import Counter
+import json
+import pathlib
+import re
+
+from django.conf import settings
+
+from . import bullet_scorer, extraction
+
+REPORT_VERSION = 1
+
+# Points per check; checks that don't apply to a file are left out of the total
+CHECK_POINTS = {
+    'page_count': 15,
+    'font_size': 15,
+    'font_families': 10,
+    'tables': 15,
+    'graphics': 10,
+    'sections': 15,
+    'section_order': 10,
+    'contact': 10,
+    'keywords': 15,
+}
+
+BODY_FONT_RANGE = (10, 12)
+MAX_PAGES = 2
+MAX_FONT_FAMILIES = 2
+# Share of a job description's keywords a resume should mention
+KEYWORD_TARGET = 0.6
+# Prompts shorter than this are questions, not job descriptions
+MIN_JOB_DESCRIPTION_WORDS = 40
+MAX_JOB_KEYWORDS = 30
+
+# Canonical section order; sections with the same rank are interchangeable
+SECTION_RANKS = {
+    'summary': 0,
+    'education': 1,
+    'experience': 1,
+    'projects': 2,
+    'skills': 3,
+    'certifications': 4,
+    'publications': 4,
+    'awards': 4,
+    'activities': 4,
+}
+REQUIRED_SECTIONS = ('education', 'experience', 'skills')
+SECTION_PATTERNS = {
+    'summary': r'(professional )?(summary|profile|objective)',
+    'education': r'education( (and|&) training)?|academic background',
+    'experience': r'((work|professional|relevant|research) )?experience|employment( history)?|work history',
+    'projects': r'((academic|personal|technical) )?projects',
+    'skills': r'((technical|core|key) )?skills( (and|&) (interests|tools))?|technologies',
+    'certifications': r'certifications?( (and|&) licenses)?|licenses',
+    'publications': r'publications|research papers',
+    'awards': r'awards|honors( (and|&) awards)?|achievements',
+    'activities': r'activities|leadership( experience)?|volunteer(ing| experience)?|extracurriculars?',
+}
+_SECTION_RES = [
+    (name, re.compile(rf'^\s*({pattern})\s*:?\s*$', re.IGNORECASE))
+    for name, pattern in SECTION_PATTERNS.items()
+]
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+_PHONE_RE = re.compile(r'(\+?\d[\d\s().-]{7,}\d)')
+_WORD_RE = re.compile(r'[a-z][a-z0-9+#]*(?:\.[a-z0-9]+)*')
+STOPWORDS = frozenset("""
+a about above after all also am an and any are as at be been being both but by can could did do does
+doing each etc for from had has have having he her here his how i if in into is it its just may me
+more most my no not of on or our out over own per same she should so some such than that the their
+them then there these they this those through to too under up us very was we were what when where
+which while who whom why will with within without would you your yours able ability across strong
+work working job role team new including well must preferred required requirements responsibilities
+experience years year candidate candidates position looking plus good great excellent knowledge
+""".split())
+
+
+def _check(check_id, passed, detail, points=None):
+    max_points = CHECK_POINTS[check_id]
+    if points is None:
+        points = max_points if passed else 0
+    return {'id': check_id, 'passed': passed, 'points': points, 'max_points': max_points, 'detail': detail}
+
+
+def _words(text):
+    return [word for word in _WORD_RE.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def _find_sections(extracted):
+    """Return the standard sections whose heading lines appear, in document order."""
+    sections = []
+    for page in extracted['pages']:
+        for line in page.split('\n'):
+            if len(line) > 40:
+                continue
+            for name, regex in _SECTION_RES:
+                if regex.match(line) and name not in sections:
+                    sections.append(name)
+                    break
+    return sections
+
+
+def analyze(extracted, filename='', job_description=''):
+    """
+    Return the PASS 1 report for one extracted document.
+
+    ``job_description`` is the user's prompt; when it is long enough to be a
+    job posting, the resume's coverage of its keywords is scored.
+    """
+    is_pdf = bool(extracted['font_sizes'])
+    text = '\n'.join(extracted['pages'])
+    checks = []
+
+    page_count = extracted['page_count']
+    if is_pdf:
+        checks.append(_check(
+            'page_count', page_count <= MAX_PAGES,
+            f"{page_count} page(s); limit is 1 for undergraduates and {MAX_PAGES} for graduate students",
+        ))
+
+        low, high = BODY_FONT_RANGE
+        total_chars = sum(count for _, count in extracted['font_sizes'])
+        body_chars = sum(count for size, count in extracted['font_sizes'] if size <= high)
+        in_range = sum(count for size, count in extracted['font_sizes'] if low <= size <= high)
+        share = in_range / body_chars if body_chars else 1
+        checks.append(_check(
+            'font_size', low <= extracted['body_font_size'] <= high and share >= 0.9,
+            f"body text {extracted['body_font_size']}pt; {share:.0%} of non-heading text is {low}-{high}pt "
+            f"({total_chars} characters)",
+        ))
+
+        families = extracted['font_families']
+        checks.append(_check(
+            'font_families', len(families) <= MAX_FONT_FAMILIES,
+            f"{len(families)} font famil{'y' if len(families) == 1 else 'ies'}: {', '.join(families)}",
+        ))
+
+        table_count = len(extracted['tables'])
+        checks.append(_check(
+            'tables', table_count == 0,
+            "no tables" if not table_count else f"{table_count} table(s); ATS parsers may scramble table cells",
+        ))
+        checks.append(_check(
+            'graphics', extracted['image_count'] == 0,
+            "no images" if not extracted['image_count'] else f"{extracted['image_count']} image(s); ATS parsers ignore images",
+        ))
+
+    sections = _find_sections(extracted)
+    missing = [name for name in REQUIRED_SECTIONS if name not in sections]
+    checks.append(_check(
+        'sections', not missing,
+        f"found {', '.join(sections) or 'no standard sections'}" + (f"; missing {', '.join(missing)}" if missing else ""),
+    ))
+    ranks = [SECTION_RANKS[name] for name in sections]
+    in_order = all(a <= b for a, b in zip(ranks, ranks[1:]))
+    checks.append(_check(
+        'section_order', in_order,
+        "standard order" if in_order else f"unusual order: {' > '.join(sections)}",
+    ))
+
+    has_email = bool(_EMAIL_RE.search(text))
+    has_phone = bool(_PHONE_RE.search(text))
+    checks.append(_check(
+        'contact', has_email and has_phone,
+        f"email {'found' if has_email else 'missing'}, phone {'found' if has_phone else 'missing'}",
+        points=CHECK_POINTS['contact'] * (has_email + has_phone) // 2,
+    ))
+
+    resume_words = _words(text)
+    keywords = {
+        'word_count': len(resume_words),
+        'top_keywords': [word for word, _ in Counter(resume_words).most_common(15)],
+    }
+    job_words = _words(job_description)
+    if len(job_description.split()) >= MIN_JOB_DESCRIPTION_WORDS and job_words:
+        job_keywords = [word for word, _ in Counter(job_words).most_common(MAX_JOB_KEYWORDS)]
+        present = set(resume_words)
+        matched = [word for word in job_keywords if word in present]
+        coverage = len(matched) / len(job_keywords)
+        keywords.update({
+            'job_keywords': job_keywords,
+            'missing_keywords': [word for word in job_keywords if word not in present],
+            'coverage': round(coverage, 2),
+        })
+        checks.append(_check(
+            'keywords', coverage >= KEYWORD_TARGET,
+            f"{coverage:.0%} of the job description's top keywords appear",
+            points=round(CHECK_POINTS['keywords'] * min(1, coverage / KEYWORD_TARGET)),
+        ))
+
+    max_points = sum(check['max_points'] for check in checks)
+    return {
+        'version': REPORT_VERSION,
+        'file': filename,
+        'score': round(100 * sum(check['points'] for check in checks) / max_points),
+        'page_count': page_count,
+        'sections': sections,
+        'checks': checks,
+        'keywords': keywords,
+    }
+
+
+def summarize(report):
+    """Render a report as the compact text sent to the model."""
+    lines = [
+        f"[Local ATS pre-analysis of {report['file']}, computed exactly from the file: "
+        f"ATS compliance score {report['score']}/100. Use these results for PASS 1 instead of estimating them.]"
+    ]
+    for check in report['checks']:
+        lines.append(f"- {check['id']}: {'pass' if check['passed'] else 'FAIL'} ({check['detail']})")
+    if report['keywords'].get('missing_keywords'):
+        lines.append(f"- missing job keywords: {', '.join(report['keywords']['missing_keywords'][:15])}")
+    if 'bullets' in report:
+        lines.append(bullet_scorer.summarize(report['bullets']))
+    return '\n'.join(lines)
+
+
+def analyze_uploaded_files(uploaded_file_data, job_description=''):
+    """
+    Analyze the extracted files of a request: the PASS 1 report of each file,
+    with its bullet scores for PASS 2 under ``bullets``.
+
+    Returns ``(internal_analysis, summary)``: the JSON stored on the
+    Conversation and the text sent to the model, both empty when no file has
+    an extraction.
+    """
+    reports = []
+    for file_data in uploaded_file_data:
+        if file_data.get('processing_status') != 'completed':
+            continue
+        extracted = extraction.load_extraction(pathlib.Path(settings.MEDIA_ROOT) / file_data['stored_filename'])
+        if extracted:
+            report = analyze(extracted, file_data['original_filename'], job_description)
+            # PASS 2 inputs: quantification and action verbs of every bullet
+            report['bullets'] = bullet_scorer.score_bullets(bullet_scorer.split_bullets(extracted))
+            reports.append(report)
+    if not reports:
+        return '', ''
+    return json.dumps({'ats_reports': reports}), '\n\n'.join(summarize(report) for report in reports)
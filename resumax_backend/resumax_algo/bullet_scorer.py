@@ -0,0 +1,256 @@
+"""
+Batch scoring of resume bullet points for PASS 2 (quantification and action verbs).
+
+Bullets are split out of the cached extraction and scored all at once: the
+bullets are joined into one string that two precompiled patterns scan (one
+for every kind of quantity, one for frequency and passive-voice phrases), the
+matches are mapped back to their bullets with ``numpy.searchsorted``, and the
+leading words are checked against the verb lexicons with ``numpy.isin``.
+Per-bullet flags and the quantified share fall out of the resulting boolean
+feature matrix, for one resume or a whole corpus.
+"""
+import re
+
+import numpy as np
+
+# PASS 2: less than this share of quantified bullets is a high-priority issue
+QUANTIFIED_TARGET = 0.7
+MAX_BULLET_WORDS = 35
+MIN_BULLET_WORDS = 3
+
+_BULLET_MARKER_RE = re.compile(r'^\s*(?:[-*•▪●◦‣–—►✓]|\d{1,2}[.)])\s+')
+_CONTINUATION_ENDINGS = (',', ';', '-', '&', '/', ' and', ' of', ' to', ' for', ' with', ' the')
+
+STRONG_VERBS = """
+accelerated achieved acquired adapted administered advanced advised analyzed architected assembled
+assessed authored automated boosted built calculated championed coached collaborated completed
+conceived conducted consolidated constructed coordinated created cultivated cut debugged decreased
+defined delivered deployed designed developed devised directed discovered doubled drafted drove
+eliminated enabled engineered enhanced established evaluated executed expanded expedited facilitated
+forecasted formulated founded generated grew guided headed identified implemented improved increased
+influenced initiated innovated inspected installed instituted integrated interviewed introduced
+invented launched led leveraged maintained managed maximized mentored migrated minimized modeled
+modernized monitored motivated negotiated optimized orchestrated organized oversaw partnered
+pioneered planned presented prioritized produced programmed proposed prototyped published raised
+ran rebuilt redesigned reduced refactored refined reorganized researched resolved restructured
+revamped reviewed saved scaled secured shipped simplified solved spearheaded standardized
+streamlined strengthened supervised surpassed synthesized taught tested trained transformed
+tripled troubleshot tutored unified upgraded validated won wrote
+""".split()
+
+WEAK_PHRASES = """
+helped|helped with|assisted|assisted in|assisted with|worked on|worked with|responsible for|
+was responsible for|participated in|involved in|was involved in|tasked with|was tasked with|duties included|
+handled|in charge of|contributed to|took part in|familiar with|exposure to|attended|learned
+""".replace('\n', '').split('|')
+
+SCALE_NOUNS = """
+users customers clients people students members employees engineers developers staff teams records
+requests transactions orders projects products stores locations countries downloads subscribers
+followers visitors accounts servers applications services tickets patients participants attendees
+volunteers schools partners vendors reports pages lines files queries
+""".split()
+
+NUMBER_WORDS = r'two|three|four|five|six|seven|eight|nine|ten|twelve|fifteen|twenty|fifty|dozens?|hundreds?|thousands?|millions?|billions?'
+_NUMBER = rf'(?:(?<![\w.])(?!(?:19|20)\d\d\b)\d[\d,]*(?:\.\d+)?|\b(?:{NUMBER_WORDS})\b)'
+TIME_UNITS = r'hours?|days?|weeks?|months?|years?|quarters?|semesters?|minutes?|seconds?|ms'
+FREQUENCY_WORDS = r'daily|weekly|biweekly|monthly|quarterly|annually|yearly|hourly|nightly'
+PERIODS = r'day|week|month|quarter|year|hour|sprint|semester'
+
+# Column order of the feature matrix
+FEATURES = ('metric', 'scale', 'impact', 'frequency', 'time', 'strong_verb', 'weak_verb', 'passive')
+
+# The patterns run on lower-cased text. Every quantity is found in one scan and
+# its groups say what it measures: money, percentages and multipliers are
+# impact, a following unit is time and a following noun is scale.
+_QUANTITY_RE = re.compile(
+    rf'(?P<currency>[$€£]\s?)?{_NUMBER}'
+    r'(?:\s?(?P<percent>%|percent\b)|(?P<multiplier>x\b)|\s*(?:k|m|b|mm|\+)?\b'
+    rf'(?:\s*(?:-\s*)?(?P<time>{TIME_UNITS})\b|\s*(?:\w+\s)?(?P<scale>{"|".join(SCALE_NOUNS)})\b)?)'
+)
+# Word features, named by the group that matched
+_PHRASE_RE = re.compile(
+    rf'(?P<frequency>\b(?:{FREQUENCY_WORDS})\b|\b(?:per|a|each|every)\s(?:{PERIODS})\b|/(?:{PERIODS})\b)'
+    r'|(?P<passive>\b(?:was|were|been|being)\s+\w+ed\b)'
+    r'|(?P<time>\bahead of schedule\b)'
+)
+_METRIC_CATEGORIES = ('scale', 'impact', 'frequency', 'time')
+_LEADING_WORDS = max(len(phrase.split()) for phrase in WEAK_PHRASES)
+_WORD_PUNCTUATION = ',;:.()"\''
+
+
+def split_bullets(extracted):
+    """
+    Return the bullet points of an extracted document.
+
+    A bullet starts at a bullet marker; a following line is joined to it
+    when it clearly continues the sentence (wrapped bullets).
+    """
+    bullets = []
+    current = None
+    for page in extracted['pages']:
+        for line in page.split('\n'):
+            line = line.strip()
+            marker = _BULLET_MARKER_RE.match(line)
+            if marker:
+                if current:
+                    bullets.append(current)
+                current = line[marker.end():]
+            elif current is not None and line and (line[0].islower() or current.endswith(_CONTINUATION_ENDINGS)):
+                current = f"{current} {line}"
+            else:
+                if current:
+                    bullets.append(current)
+                current = None
+    if current:
+        bullets.append(current)
+    return [' '.join(bullet.split()) for bullet in bullets if len(bullet.split()) >= MIN_BULLET_WORDS]
+
+
+def _leading_phrases(lowered):
+    """Return arrays of every bullet's first 1, 2, ... _LEADING_WORDS words."""
+    leading = [
+        [word.strip(_WORD_PUNCTUATION) for word in bullet.split(None, _LEADING_WORDS)[:_LEADING_WORDS]]
+        for bullet in lowered
+    ]
+    return [np.array([' '.join(words[:count]) for words in leading]) for count in range(1, _LEADING_WORDS + 1)]
+
+
+def feature_matrix(bullets):
+    """
+    Return a (bullets x FEATURES) boolean matrix.
+
+    The bullets are joined into one lower-cased string that two regex scans
+    cover, and matches are mapped back to their bullets with searchsorted;
+    action verbs are looked up in the verb lexicons by leading words.
+    """
+    matrix = np.zeros((len(bullets), len(FEATURES)), dtype=bool)
+    if not bullets:
+        return matrix
+    # Bullets can't contain newlines, so joining on them keeps every match inside one bullet
+    lowered = [bullet.replace('\n', ' ').lower() for bullet in bullets]
+    text = '\n'.join(lowered)
+    lengths = np.fromiter((len(bullet) + 1 for bullet in lowered), dtype=np.int64, count=len(lowered))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    positions = {feature: [] for feature in FEATURES}
+    for match in _QUANTITY_RE.finditer(text):
+        start = match.start()
+        positions['metric'].append(start)
+        if match['currency'] or match['percent'] or match['multiplier']:
+            positions['impact'].append(start)
+        if match['time']:
+            positions['time'].append(start)
+        if match['scale']:
+            positions['scale'].append(start)
+    for match in _PHRASE_RE.finditer(text):
+        positions[match.lastgroup].append(match.start())
+    for column, feature in enumerate(FEATURES):
+        if positions[feature]:
+            matrix[np.searchsorted(starts, positions[feature], side='right') - 1, column] = True
+
+    leading = _leading_phrases(lowered)
+    matrix[:, FEATURES.index('strong_verb')] = np.isin(leading[0], STRONG_VERBS)
+    matrix[:, FEATURES.index('weak_verb')] = np.logical_or.reduce([np.isin(phrases, WEAK_PHRASES) for phrases in leading])
+    return matrix
+
+
+def _quantified(matrix):
+    """A bullet is quantified by a number or a frequency ('weekly', 'per sprint')."""
+    return matrix[:, FEATURES.index('metric')] | matrix[:, FEATURES.index('frequency')]
+
+
+def _flags(matrix, word_counts):
+    """Return the boolean flag columns for a feature matrix."""
+    column = {feature: matrix[:, index] for index, feature in enumerate(FEATURES)}
+    return {
+        'no_metric': ~_quantified(matrix),
+        'weak_verb': column['weak_verb'],
+        'no_action_verb': ~column['strong_verb'] & ~column['weak_verb'],
+        'passive_voice': column['passive'],
+        'too_long': word_counts > MAX_BULLET_WORDS,
+    }
+
+
+def score_bullets(bullets):
+    """Score one document's bullets; returns per-bullet flags and the quantified share."""
+    matrix = feature_matrix(bullets)
+    word_counts = np.fromiter((len(bullet.split()) for bullet in bullets), dtype=np.int64, count=len(bullets))
+    flags = _flags(matrix, word_counts)
+    quantified = _quantified(matrix)
+    category_columns = [FEATURES.index(category) for category in _METRIC_CATEGORIES]
+    quantified_share = float(quantified.mean()) if bullets else 0.0
+    return {
+        'bullet_count': len(bullets),
+        'quantified_count': int(quantified.sum()),
+        'quantified_pct': round(100 * quantified_share),
+        'weak_verb_count': int(flags['weak_verb'].sum()),
+        'high_priority': bool(bullets) and quantified_share < QUANTIFIED_TARGET,
+        'bullets': [
+            {
+                'text': bullet,
+                'quantified': bool(quantified[index]),
+                'metrics': [
+                    category for category, column in zip(_METRIC_CATEGORIES, category_columns)
+                    if matrix[index, column]
+                ],
+                'flags': [name for name, values in flags.items() if values[index]],
+            }
+            for index, bullet in enumerate(bullets)
+        ],
+    }
+
+
+def score_corpus(documents):
+    """
+    Score many documents' bullets in one batch.
+
+    ``documents`` is a list of bullet lists. Returns per-document arrays of
+    bullet counts, quantified shares and weak-verb counts.
+    """
+    bullets = [bullet for document in documents for bullet in document]
+    counts = np.fromiter((len(document) for document in documents), dtype=np.int64, count=len(documents))
+    matrix = feature_matrix(bullets)
+    word_counts = np.fromiter((len(bullet.split()) for bullet in bullets), dtype=np.int64, count=len(bullets))
+    flags = _flags(matrix, word_counts)
+    # Sum each document's rows; empty documents get zeros
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    non_empty = counts > 0
+
+    def per_document(values):
+        totals = np.zeros(len(documents), dtype=np.int64)
+        if values.size:
+            totals[non_empty] = np.add.reduceat(values.astype(np.int64), offsets[non_empty])
+        return totals
+
+    quantified = per_document(_quantified(matrix))
+    quantified_share = quantified / np.maximum(counts, 1)
+    return {
+        'bullet_count': counts,
+        'quantified_count': quantified,
+        'quantified_share': quantified_share,
+        'weak_verb_count': per_document(flags['weak_verb']),
+        'high_priority': non_empty & (quantified_share < QUANTIFIED_TARGET),
+    }
+
+
+def summarize(report, max_examples=5):
+    """Render a bullet report as the compact text sent to the model."""
+    if not report['bullet_count']:
+        return "- bullets: none detected"
+    lines = [
+        f"- bullets: {report['bullet_count']}, {report['quantified_pct']}% quantified"
+        + (f" (below {QUANTIFIED_TARGET:.0%}: high priority)" if report['high_priority'] else "")
+        + f", {report['weak_verb_count']} with weak verbs"
+    ]
+    weak = [bullet['text'] for bullet in report['bullets'] if 'weak_verb' in bullet['flags']]
+    unquantified = [bullet['text'] for bullet in report['bullets'] if not bullet['quantified']]
+    if weak:
+        lines.append("- weak-verb bullets: " + " | ".join(_shorten(text) for text in weak[:max_examples]))
+    if unquantified:
+        lines.append("- bullets without metrics: " + " | ".join(_shorten(text) for text in unquantified[:max_examples]))
+    return '\n'.join(lines)
+
+
+def _shorten(text, limit=80):
+    return text if len(text) <= limit else text[:limit - 3] + '...'
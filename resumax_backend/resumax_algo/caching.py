@@ -0,0 +1,111 @@
+"""
+Bounded in-memory caches shared by the Gemini request path.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional idle TTL.
+
+    Entries are kept in an OrderedDict in access order, so lookups, inserts and
+    evictions are O(1). Because the least recently used entry is also the one
+    idle the longest, expired entries always sit at the front and are swept
+    lazily on every access without scanning the rest of the cache.
+    """
+
+    def __init__(self, max_size=1000, ttl=None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, last access time)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _sweep(self, now):
+        """Drop expired entries from the least recently used end."""
+        if self.ttl is None:
+            return
+        while self._entries:
+            _, last_access = next(iter(self._entries.values()))
+            if now - last_access <= self.ttl:
+                break
+            self._entries.popitem(last=False)
+            self.expirations += 1
+
+    def get(self, key, default=None):
+        """Return the cached value and mark it as recently used."""
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries[key] = (entry[0], now)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Insert or refresh a value, evicting the least recently used entry when full."""
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            elif len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = (value, now)
+
+    def pop(self, key, default=None):
+        """Remove a key and return its value."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        """Remove every entry; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def sweep(self):
+        """Drop expired entries now instead of waiting for the next access."""
+        with self._lock:
+            self._sweep(time.time())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._sweep(time.time())
+            return key in self._entries
+
+    def oldest_age(self):
+        """Seconds since the least recently used entry was accessed."""
+        with self._lock:
+            if not self._entries:
+                return 0
+            _, last_access = next(iter(self._entries.values()))
+            return time.time() - last_access
+
+    def stats(self):
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,209 @@
+"""
+Gemini context caching for the system prompt and base knowledge documents.
+
+When ``RESUMAX_CONTEXT_CACHE['ENABLED']`` is set, the system prompt and the
+base knowledge file parts are stored once as an explicit cached-content
+resource, and new chats reference it instead of resending those tokens. The
+cache is refreshed before its TTL runs out; any failure makes callers fall
+back to sending the context with every chat.
+
+Chats in a shared session store may reference a cache another worker
+created. ``ensure_fresh`` looks such a cache up with ``caches.get`` and
+adopts it, so the workers share one cache instead of each paying for its own.
+"""
+from django.conf import settings
+from django.utils import timezone
+from google.genai import errors, types
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# The fingerprint is kept in the display name so other workers can adopt the cache
+DISPLAY_NAME_PREFIX = 'resumax-base-knowledge-'
+
+DEFAULT_CONTEXT_CACHE = {
+    'ENABLED': False,
+    'TTL_SECONDS': 60 * 60,
+    'REFRESH_MARGIN_SECONDS': 5 * 60,
+}
+
+
+def get_context_cache_settings():
+    """Return RESUMAX_CONTEXT_CACHE merged over the defaults."""
+    return {**DEFAULT_CONTEXT_CACHE, **getattr(settings, 'RESUMAX_CONTEXT_CACHE', {})}
+
+
+class ContextCacheManager:
+    """Create, reuse and refresh one cached-content resource per context fingerprint."""
+
+    def __init__(self, ttl_seconds=3600, refresh_margin_seconds=300):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        self._name = None
+        self._fingerprint = None
+        self._expires_at = None
+        # Guards the state above; Gemini calls are made without holding it
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.stats = {'created': 0, 'reused': 0, 'refreshed': 0, 'adopted': 0, 'failures': 0}
+
+    @staticmethod
+    def fingerprint(model, system_instruction, file_uris):
+        """Identify the cached context; new base knowledge URIs need a new cache."""
+        digest = hashlib.sha256(model.encode())
+        digest.update(system_instruction.encode())
+        for uri in file_uris:
+            digest.update(uri.encode())
+        return digest.hexdigest()
+
+    def get_cache_name(self, client, model, system_instruction, context_parts, file_uris):
+        """
+        Return the name of a live cached-content resource for this context, or
+        None if caching failed and the caller should send the context itself.
+        """
+        fingerprint = self.fingerprint(model, system_instruction, file_uris)
+        name = self._reuse(client, fingerprint)
+        if name:
+            return name
+        # One creation at a time; builds that waited for it reuse its cache
+        with self._create_lock:
+            name = self._reuse(client, fingerprint)
+            if name:
+                return name
+            try:
+                cache = client.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        display_name=DISPLAY_NAME_PREFIX + fingerprint,
+                        system_instruction=system_instruction,
+                        contents=[types.Content(role='user', parts=context_parts)],
+                        ttl=f"{int(self.ttl.total_seconds())}s",
+                    ),
+                )
+            except Exception as e:
+                with self._lock:
+                    self.stats['failures'] += 1
+                logger.warning("Context cache creation failed, sending context inline: %s", e)
+                return None
+            with self._lock:
+                self._name = cache.name
+                self._fingerprint = fingerprint
+                self._expires_at = self._expiry_from(cache)
+                self.stats['created'] += 1
+            return cache.name
+
+    def ensure_fresh(self, client, name):
+        """
+        Extend the TTL of ``name`` if it's about to expire, looking it up first
+        if this process didn't create it or thinks it expired.
+        Returns False if the cache is gone and chats using it must be rebuilt.
+        """
+        with self._lock:
+            known = name == self._name and self._is_live()
+        if not known:
+            adopted = self._adopt(client, name)
+            if adopted is not None:
+                return adopted
+        return self._refresh_if_needed(client, name)
+
+    def invalidate(self):
+        """Forget the current cache so the next session build creates a new one."""
+        with self._lock:
+            self._name = None
+            self._fingerprint = None
+            self._expires_at = None
+
+    def _reuse(self, client, fingerprint):
+        """Return the current cache's name if it holds this context and is live, refreshing it if needed."""
+        with self._lock:
+            if self._fingerprint != fingerprint or not self._is_live():
+                return None
+            name = self._name
+        if not self._refresh_if_needed(client, name):
+            return None
+        with self._lock:
+            self.stats['reused'] += 1
+        return name
+
+    def _adopt(self, client, name):
+        """
+        Take over the cache ``name``, e.g. created by another worker. Returns
+        False if Gemini says it's gone or expired, True if it couldn't be
+        checked, and None once it is the current cache.
+        """
+        try:
+            cache = client.caches.get(name=name)
+        except errors.ClientError as e:
+            if e.code in (403, 404):
+                logger.info("Context cache %s is gone: %s", name, e)
+                return False
+            with self._lock:
+                self.stats['failures'] += 1
+            logger.warning("Context cache lookup failed, keeping the chat: %s", e)
+            return True
+        except Exception as e:
+            with self._lock:
+                self.stats['failures'] += 1
+            logger.warning("Context cache lookup failed, keeping the chat: %s", e)
+            return True
+        expires_at = self._expiry_from(cache)
+        if expires_at <= timezone.now():
+            return False
+        display_name = getattr(cache, 'display_name', None) or ''
+        with self._lock:
+            self._name = name
+            self._expires_at = expires_at
+            # Without a recognisable fingerprint, session builds here create their own cache
+            self._fingerprint = (
+                display_name[len(DISPLAY_NAME_PREFIX):] if display_name.startswith(DISPLAY_NAME_PREFIX) else None
+            )
+            self.stats['adopted'] += 1
+        return None
+
+    def _is_live(self):
+        """Whether the current cache hasn't expired; callers hold the lock."""
+        return self._name is not None and self._expires_at > timezone.now()
+
+    def _refresh_if_needed(self, client, name):
+        """
+        Extend the TTL of the current cache ``name`` once inside the refresh
+        margin. Returns False if the refresh failed and the cache has expired.
+        """
+        with self._lock:
+            if name != self._name:
+                # Replaced since the caller looked; the next check looks it up
+                return True
+            expires_at = self._expires_at
+        if expires_at - timezone.now() > self.refresh_margin:
+            return True
+        if not self._refresh_lock.acquire(blocking=False):
+            # Another thread is extending it
+            return expires_at > timezone.now()
+        try:
+            try:
+                cache = client.caches.update(
+                    name=name,
+                    config=types.UpdateCachedContentConfig(ttl=f"{int(self.ttl.total_seconds())}s"),
+                )
+            except Exception as e:
+                with self._lock:
+                    self.stats['failures'] += 1
+                logger.warning("Context cache refresh failed: %s", e)
+                return expires_at > timezone.now()
+            with self._lock:
+                if self._name == name:
+                    self._expires_at = self._expiry_from(cache)
+                self.stats['refreshed'] += 1
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _expiry_from(self, cache):
+        expire_time = getattr(cache, 'expire_time', None)
+        if isinstance(expire_time, datetime):
+            return expire_time
+        return timezone.now() + self.ttl
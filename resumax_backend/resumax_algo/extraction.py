@@ -0,0 +1,271 @@
+"""
+Local text and layout extraction for attached files.
+
+When a file is stored, PyMuPDF pulls its text, page count, fonts, headings
+and tables in a process pool and caches the result in a JSON sidecar next to
+the stored file (``<stored file>.extract.json``). With
+``RESUMAX_EXTRACTION['SEND_EXTRACTED_TEXT']`` set, the compact text is sent to
+Gemini instead of uploading the binary file, which shrinks a resume from
+hundreds of KB to a few KB per turn.
+
+The extraction functions run in child processes, where Django isn't set up,
+so they must not read settings or models.
+"""
+from django.conf import settings
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+import asyncio
+import json
+import multiprocessing
+import os
+import pathlib
+import re
+import threading
+
+import pymupdf
+
+DEFAULT_EXTRACTION = {
+    'ENABLED': True,
+    'SEND_EXTRACTED_TEXT': False,
+    'MAX_WORKERS': 2,
+}
+
+SIDECAR_SUFFIX = '.extract.json'
+# Bump when the sidecar layout changes so old sidecars are extracted again
+EXTRACTION_VERSION = 2
+
+PDF_TYPES = {'application/pdf'}
+TEXT_TYPES = {'text/plain', 'text/markdown', 'text/html', 'text/xml', 'application/xml'}
+
+# Spans this much larger than the body text, or bold, are treated as headings
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_LENGTH = 80
+MAX_HEADINGS = 40
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_extraction_settings():
+    """Return RESUMAX_EXTRACTION merged over the defaults."""
+    return {**DEFAULT_EXTRACTION, **getattr(settings, 'RESUMAX_EXTRACTION', {})}
+
+
+def sidecar_path(file_path):
+    """Path of the extraction sidecar for a stored file."""
+    file_path = pathlib.Path(file_path)
+    return file_path.with_name(file_path.name + SIDECAR_SUFFIX)
+
+
+def _clean_text(text):
+    """Collapse runs of spaces and blank lines."""
+    text = re.sub(r'[ \t ]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def _inside(bbox, outer):
+    x0, y0, x1, y1 = bbox
+    return x0 >= outer[0] - 1 and y0 >= outer[1] - 1 and x1 <= outer[2] + 1 and y1 <= outer[3] + 1
+
+
+def _extract_pdf(path):
+    fonts = Counter()  # (font, size) -> characters
+    heading_spans = []  # (size, bold, text)
+    pages = []
+    tables = []
+    image_count = 0
+    with pymupdf.open(path) as document:
+        page_count = document.page_count
+        for page in document:
+            image_count += len(page.get_images())
+            page_tables = page.find_tables().tables
+            table_boxes = [tuple(table.bbox) for table in page_tables]
+            # Lay the page out top to bottom, with tables as markdown in place
+            items = []
+            for x0, y0, x1, y1, text, _, block_type in page.get_text('blocks', sort=True):
+                if block_type == 0 and not any(_inside((x0, y0, x1, y1), box) for box in table_boxes):
+                    items.append((y0, text))
+            for table, box in zip(page_tables, table_boxes):
+                markdown = table.to_markdown().strip()
+                items.append((box[1], markdown))
+                tables.append({
+                    'page': page.number + 1,
+                    'rows': table.row_count,
+                    'cols': table.col_count,
+                })
+            items.sort(key=lambda item: item[0])
+            pages.append(_clean_text('\n'.join(text for _, text in items)))
+
+            for block in page.get_text('dict')['blocks']:
+                for line in block.get('lines', []):
+                    line_text = ''.join(span['text'] for span in line['spans']).strip()
+                    if not line_text:
+                        continue
+                    for span in line['spans']:
+                        fonts[(span['font'], round(span['size'], 1))] += len(span['text'].strip())
+                    first = line['spans'][0]
+                    heading_spans.append((round(first['size'], 1), bool(first['flags'] & 16), line_text))
+
+    font_sizes = Counter()
+    for (_, size), count in fonts.items():
+        font_sizes[size] += count
+    body_size = max(font_sizes.items(), key=lambda item: item[1], default=(0, 0))[0]
+    headings = [
+        text for size, bold, text in heading_spans
+        if len(text) <= MAX_HEADING_LENGTH and (size >= body_size * HEADING_SIZE_RATIO or (bold and size >= body_size))
+    ][:MAX_HEADINGS]
+    return {
+        'page_count': page_count,
+        'pages': pages,
+        'fonts': [
+            {'name': name, 'size': size, 'chars': count}
+            for (name, size), count in fonts.most_common(10)
+        ],
+        'font_families': sorted({_font_family(name) for name, _ in fonts}),
+        'font_sizes': sorted(font_sizes.items()),
+        'body_font_size': body_size,
+        'headings': headings,
+        'tables': tables,
+        'image_count': image_count,
+    }
+
+
+def _font_family(font_name):
+    """'ABCDEF+Calibri-Bold' -> 'Calibri'; bold and italic faces are one family."""
+    font_name = font_name.split('+', 1)[-1]
+    return re.split(r'[-,]', font_name, maxsplit=1)[0]
+
+
+def _extract_text_file(path):
+    with open(path, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    return {
+        'page_count': 1,
+        'pages': [_clean_text(text)],
+        'fonts': [],
+        'font_families': [],
+        'font_sizes': [],
+        'body_font_size': 0,
+        'headings': [],
+        'tables': [],
+        'image_count': 0,
+    }
+
+
+def compact_text(extraction, filename):
+    """Render an extraction as the text sent to the model in place of the file."""
+    summary = f"{extraction['page_count']} page(s)"
+    if extraction['tables']:
+        summary += f", {len(extraction['tables'])} table(s)"
+    if extraction['headings']:
+        summary += f"; sections: {', '.join(extraction['headings'])}"
+    lines = [f"[Attached file {filename}: {summary}]"]
+    for number, text in enumerate(extraction['pages'], start=1):
+        if len(extraction['pages']) > 1:
+            lines.append(f"--- Page {number} ---")
+        lines.append(text)
+    return '\n'.join(lines)
+
+
+def extract_file(file_path, mime_type, filename=None):
+    """
+    Extract ``file_path`` and write its sidecar. Runs in a worker process.
+
+    Returns ``(processing_status, error_message)`` where the status is
+    'completed', 'skipped' for types without text (images) or 'failed'.
+    """
+    path = pathlib.Path(file_path)
+    try:
+        if mime_type in PDF_TYPES or path.suffix.lower() == '.pdf':
+            extraction = _extract_pdf(path)
+        elif mime_type in TEXT_TYPES:
+            extraction = _extract_text_file(path)
+        else:
+            return 'skipped', ''
+        stat = path.stat()
+        extraction.update({
+            'version': EXTRACTION_VERSION,
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+            'text': compact_text(extraction, filename or path.name),
+        })
+        target = sidecar_path(path)
+        temp = target.with_name(target.name + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(extraction, f)
+        os.replace(temp, target)
+        return 'completed', ''
+    except Exception as e:
+        return 'failed', f"Extraction failed: {e}"
+
+
+def load_extraction(file_path):
+    """Return the cached extraction for ``file_path``, or None if it's missing or stale."""
+    path = pathlib.Path(file_path)
+    try:
+        with open(sidecar_path(path), encoding='utf-8') as f:
+            extraction = json.load(f)
+        stat = path.stat()
+    except (OSError, ValueError):
+        return None
+    if (extraction.get('version') != EXTRACTION_VERSION
+            or extraction.get('source_size') != stat.st_size
+            or extraction.get('source_mtime_ns') != stat.st_mtime_ns):
+        return None
+    return extraction
+
+
+def load_compact_text(file_path):
+    """Return the compact text to send instead of ``file_path``, or None if there is none."""
+    extraction = load_extraction(file_path)
+    return extraction['text'] if extraction and extraction.get('text') else None
+
+
+def send_extracted_text():
+    """Whether extracted text should replace file uploads in Gemini requests."""
+    config = get_extraction_settings()
+    return config['ENABLED'] and config['SEND_EXTRACTED_TEXT']
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                # Spawn rather than fork: the web process runs threads (executors,
+                # database connections) that must not be copied into the children
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=get_extraction_settings()['MAX_WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _process_pool
+
+
+async def extract_uploaded_files(uploaded_file_data):
+    """
+    Extract every stored file in a view's ``uploaded_file_data`` concurrently and
+    set each entry's ``processing_status`` and ``error_message``. Files uploaded
+    before keep their stored extraction.
+    """
+    if not uploaded_file_data or not get_extraction_settings()['ENABLED']:
+        return uploaded_file_data
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    pending = []
+    for file_data in uploaded_file_data:
+        path = pathlib.Path(settings.MEDIA_ROOT) / file_data['stored_filename']
+        if file_data.get('deduplicated') and load_extraction(path) is not None:
+            file_data['processing_status'], file_data['error_message'] = 'completed', ''
+        else:
+            pending.append((file_data, path))
+    results = await asyncio.gather(*(
+        loop.run_in_executor(pool, extract_file, str(path), file_data['file_type'], file_data['original_filename'])
+        for file_data, path in pending
+    ), return_exceptions=True)
+    for (file_data, _), result in zip(pending, results):
+        if isinstance(result, Exception):
+            # The worker process itself failed (e.g. it was killed)
+            result = ('failed', f"Extraction failed: {result}")
+        file_data['processing_status'], file_data['error_message'] = result
+    return uploaded_file_data
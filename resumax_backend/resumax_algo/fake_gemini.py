@@ -0,0 +1,206 @@
+"""
+Offline stand-in for ``google.genai.Client``.
+
+Implements the parts of the client resumax uses (chats with history,
+blocking and streamed messages, file uploads, context caches and
+``models.generate_content``) with configurable latency, so the request path
+can be load tested without network access. Select it with:
+
+    RESUMAX_GEMINI_CLIENT = {
+        'BACKEND': 'resumax_algo.fake_gemini.FakeClient',
+        'OPTIONS': {'latency': 0.5, 'stream_chunks': 8, 'failure_rate': 0.01},
+    }
+
+Responses carry usage metadata estimated like ``token_budget`` does, and
+injected failures raise ``FakeGeminiError`` before any text is produced, so
+the retry path runs as it does against the API.
+"""
+from django.utils import timezone
+from google.genai import errors, types
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+import hashlib
+import itertools
+import random
+import threading
+import time
+
+from .token_budget import content_tokens, estimate_tokens
+
+DEFAULT_RESPONSE_TEXT = (
+    "Overall this is a solid draft. Lead each bullet with an action verb, quantify the results "
+    "you achieved, and move your most relevant experience to the top of the page."
+)
+
+
+class FakeGeminiError(Exception):
+    """An injected failure, like a 503 from the Gemini API."""
+
+
+def _content(message):
+    """A history message as a types.Content, whether given as a dict or a Content."""
+    return message if isinstance(message, types.Content) else types.Content.model_validate(message)
+
+
+def _part(part):
+    if isinstance(part, types.Part):
+        return part
+    if isinstance(part, str):
+        return types.Part.from_text(text=part)
+    return types.Part.model_validate(part)
+
+
+class FakeChat:
+    """A chat session that records its history like the SDK's chats."""
+
+    def __init__(self, client, history):
+        self.client = client
+        self.history = [_content(message) for message in history or []]
+
+    def get_history(self, curated=False):
+        return list(self.history)
+
+    def _response(self, message_parts, text):
+        user = types.Content(role='user', parts=[_part(part) for part in message_parts])
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=content_tokens(self.history + [user]),
+            candidates_token_count=estimate_tokens(text),
+            thoughts_token_count=0,
+        )
+        self.history += [user, types.Content(role='model', parts=[types.Part.from_text(text=text)])]
+        return usage
+
+    def send_message(self, message_parts):
+        with self.client.request() as text:
+            time.sleep(self.client.latency_sample())
+            usage = self._response(message_parts, text)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def send_message_stream(self, message_parts):
+        with self.client.request() as text:
+            chunk_count = max(1, self.client.stream_chunks)
+            chunk_size = -(-len(text) // chunk_count)
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            delay = self.client.latency_sample() / len(chunks)
+            usage = None
+            for index, chunk in enumerate(chunks):
+                time.sleep(delay)
+                if index == len(chunks) - 1:
+                    # Like the API, only the last chunk carries the usage metadata
+                    usage = self._response(message_parts, text)
+                yield SimpleNamespace(text=chunk, usage_metadata=usage)
+
+
+class FakeChats:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model=None, config=None, history=None):
+        return FakeChat(self.client, history)
+
+
+class FakeFiles:
+    def __init__(self, client):
+        self.client = client
+
+    def upload(self, file=None, config=None):
+        time.sleep(self.client.upload_delay)
+        with self.client.lock:
+            self.client.uploads += 1
+        digest = hashlib.sha256(str(file).encode()).hexdigest()[:16]
+        return SimpleNamespace(
+            uri=f"https://generativelanguage.googleapis.com/v1beta/files/fake-{digest}",
+            mime_type=None,
+            expiration_time=timezone.now() + timedelta(hours=48),
+        )
+
+
+class FakeCaches:
+    def __init__(self, client):
+        self._names = itertools.count(1)
+        self._display_names = {}
+
+    def create(self, model=None, config=None):
+        name = f"cachedContents/fake-{next(self._names)}"
+        self._display_names[name] = getattr(config, 'display_name', None)
+        return SimpleNamespace(name=name, display_name=self._display_names[name], expire_time=None)
+
+    def get(self, name=None, config=None):
+        if name not in self._display_names:
+            raise errors.ClientError(404, {'error': {'code': 404, 'message': f"{name} not found", 'status': 'NOT_FOUND'}})
+        return SimpleNamespace(name=name, display_name=self._display_names[name], expire_time=None)
+
+    def update(self, name=None, config=None):
+        return SimpleNamespace(name=name, display_name=self._display_names.get(name), expire_time=None)
+
+
+class FakeModels:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model=None, contents=None, config=None):
+        with self.client.request() as text:
+            time.sleep(self.client.latency_sample())
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+
+class FakeClient:
+    """
+    Fake ``genai.Client``. Every call that generates text waits ``latency``
+    seconds, varied by up to ``jitter`` of it either way, and fails with
+    probability ``failure_rate``; uploads wait ``upload_delay`` seconds.
+    Streamed responses arrive in ``stream_chunks`` chunks spread over the
+    latency. ``seed`` makes the jitter and failures reproducible.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, stream_chunks=8, failure_rate=0.0, upload_delay=0.1,
+                 response_text=DEFAULT_RESPONSE_TEXT, seed=None, api_key=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunks = stream_chunks
+        self.failure_rate = failure_rate
+        self.upload_delay = upload_delay
+        self.response_text = response_text
+        self._random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.uploads = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chats = FakeChats(self)
+        self.files = FakeFiles(self)
+        self.caches = FakeCaches(self)
+        self.models = FakeModels(self)
+
+    def latency_sample(self):
+        with self.lock:
+            spread = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency * (1 + spread))
+
+    @contextmanager
+    def request(self):
+        """Count one generation, injecting a failure with probability failure_rate."""
+        with self.lock:
+            self.requests += 1
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.failures += 1
+                raise FakeGeminiError("503 UNAVAILABLE: injected failure")
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            yield self.response_text
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'failures': self.failures,
+                'uploads': self.uploads,
+                'max_in_flight': self.max_in_flight,
+            }
+
@@ -0,0 +1,81 @@
+"""
+Content-addressed storage of uploaded files.
+
+Uploads are streamed in chunks to a temporary file in the user's upload
+directory while their SHA-256 is computed, then moved to
+``user_<id>/<sha256><ext>``. When the user has uploaded the same content
+before, the temporary copy is dropped and the stored file is reused, along
+with its text extraction and its Gemini upload.
+
+Several ``AttachedFile`` rows can therefore share a stored file; it is
+deleted with the last row that references it (see
+``models.delete_file_on_model_delete``). A request reusing a file holds no
+reference until its conversation is saved; if the user deletes the last
+earlier reference in the meantime, the request goes on without the file,
+like any attachment missing on disk.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+import hashlib
+import os
+import pathlib
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of binary types, so a file is not stored under a type it isn't
+FILE_SIGNATURES = {
+    'application/pdf': (b'%PDF-',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/webp': (b'RIFF',),
+}
+
+
+def _check_signature(content_type, first_chunk):
+    signatures = FILE_SIGNATURES.get(content_type)
+    if signatures and not first_chunk.startswith(signatures):
+        raise ValidationError(f"File content doesn't match its type {content_type}.")
+
+
+def ingest_upload(uploaded_file, user_id):
+    """
+    Store an uploaded file under its content hash in the user's directory.
+
+    Returns ``(stored_filename, content_hash, deduplicated)``, where
+    ``deduplicated`` is True when an identical file was already stored.
+    Raises ValidationError if the content doesn't match the declared type.
+    """
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    user_dir = pathlib.Path(settings.MEDIA_ROOT) / f"user_{user_id}"
+    user_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=user_dir, prefix='.upload-', suffix=extension)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for index, chunk in enumerate(uploaded_file.chunks(CHUNK_SIZE)):
+                if index == 0:
+                    _check_signature(uploaded_file.content_type, chunk)
+                digest.update(chunk)
+                out.write(chunk)
+        content_hash = digest.hexdigest()
+        stored_filename = f"user_{user_id}/{content_hash}{extension}"
+        target = pathlib.Path(settings.MEDIA_ROOT) / stored_filename
+        if target.exists():
+            os.unlink(temp_path)
+            return stored_filename, content_hash, True
+        # Atomic, so concurrent uploads of the same content both end with a complete file
+        os.replace(temp_path, target)
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(target, settings.FILE_UPLOAD_PERMISSIONS)
+        return stored_filename, content_hash, False
+    except BaseException:
+        pathlib.Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def file_url(stored_filename):
+    """Media URL of a stored file."""
+    return FileSystemStorage().url(stored_filename)
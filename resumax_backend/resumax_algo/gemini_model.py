@@ -1,47 +1,100 @@
 from google import genai
 from google.genai import types
 from django.conf import settings
+from django.utils.module_loading import import_string
 import pathlib
 import asyncio
+import hashlib
 import mimetypes
 from asgiref.sync import sync_to_async
-from . import system_instructions
+from . import (
+    extraction, knowledge_base, metrics, response_cache, retrieval, summarizer, system_instructions, token_budget,
+    upload_registry, vector_store,
+)
+from .session_store import create_chat_session_store
+from .single_flight import SingleFlight
+from .context_cache import ContextCacheManager, get_context_cache_settings
 from .models import ConversationsThread, Conversation
 from pathlib import Path
 import threading
+import logging
 import os
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 import time
 
+logger = logging.getLogger(__name__)
+
 # Module-level client instance for reuse across functions
 _client = None
 
-# Thread-safe in-memory store for chat sessions (per user, per thread)
-_chat_sessions = {}
-_chat_sessions_lock = threading.Lock()
-_chat_access_times = {}  # Track access times for better LRU
+# The Gemini client class, or a stand-in such as resumax_algo.fake_gemini.FakeClient
+DEFAULT_GEMINI_CLIENT = {
+    'BACKEND': 'google.genai.Client',
+    'OPTIONS': {},
+}
+
+# Store for chat sessions (per user, per thread), configured by RESUMAX_CHAT_SESSION_STORE
+_chat_session_store = None
+_chat_session_store_lock = threading.Lock()
 
 # Cache for base knowledge file URIs to avoid re-uploading
 _base_knowledge_uris = None
 _base_knowledge_lock = threading.Lock()
+# Held while uploading so concurrent cold starts upload the folder only once
+_base_knowledge_load_lock = threading.Lock()
+
+# Explicit Gemini cache for the system prompt and base knowledge (optional)
+_context_cache_manager = None
+_context_cache_manager_lock = threading.Lock()
+
+# Concurrent requests for the same session (or base knowledge) await one build
+_session_flight = SingleFlight()
+_base_knowledge_flight = SingleFlight()
+
+# Dedicated pool for blocking Gemini SDK calls. asyncio.to_thread shares the loop's
+# default executor (min(32, cpu + 4) threads), which would cap how many requests
+# one ASGI worker can keep in flight.
+_gemini_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'RESUMAX_GEMINI_MAX_WORKERS', 64),
+    thread_name_prefix='gemini',
+)
 
 # Cache constants at module level instead of using @lru_cache
 _SYSTEM_INSTRUCTION = system_instructions.SYSTEM_PROMPT
+_MODEL_NAME = 'models/gemini-2.5-flash'
 _MODEL_CONFIG = {
     "temperature": 0.7,
     "top_p": 0.9,
-    "max_output_tokens": 2048
 }
 
+def get_gemini_client_settings():
+    """Return RESUMAX_GEMINI_CLIENT merged over the defaults."""
+    return {**DEFAULT_GEMINI_CLIENT, **getattr(settings, 'RESUMAX_GEMINI_CLIENT', {})}
+
 def _get_genai_client():
-    """Get or create a shared GenAI client instance"""
+    """Get or create a shared GenAI client instance of the configured backend"""
     global _client
     if _client is None:
-        if not settings.GEMINI_API_KEY:
+        config = get_gemini_client_settings()
+        if config['BACKEND'] != DEFAULT_GEMINI_CLIENT['BACKEND']:
+            _client = import_string(config['BACKEND'])(**config['OPTIONS'])
+        elif not settings.GEMINI_API_KEY:
             raise Exception("GEMINI_API_KEY not configured")
-        _client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        else:
+            _client = genai.Client(api_key=settings.GEMINI_API_KEY, **config['OPTIONS'])
     return _client
 
+def reset_genai_client():
+    """Drop the client so the next call re-reads the settings."""
+    global _client
+    _client = None
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking Gemini SDK call on the dedicated executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_gemini_executor, partial(func, *args, **kwargs))
+
 @lru_cache(maxsize=100)
 def _get_mime_type_by_extension(file_extension):
     """Cached MIME type detection by file extension - much more efficient"""
@@ -59,77 +112,155 @@ def _get_session_key(thread_id, user_id):
     """Return a unique key for the chat session store."""
     return (user_id, thread_id)
 
+def get_chat_session_store():
+    """Get or create the configured chat session store"""
+    global _chat_session_store
+    with _chat_session_store_lock:
+        if _chat_session_store is None:
+            _chat_session_store = create_chat_session_store()
+        return _chat_session_store
+
+def reset_chat_session_store():
+    """Drop the current store so the next call re-reads the settings."""
+    global _chat_session_store
+    with _chat_session_store_lock:
+        _chat_session_store = None
+
+def _get_context_cache_manager():
+    """Return the context cache manager, or None when context caching is disabled."""
+    global _context_cache_manager
+    cache_settings = get_context_cache_settings()
+    if not cache_settings['ENABLED']:
+        return None
+    with _context_cache_manager_lock:
+        if _context_cache_manager is None:
+            _context_cache_manager = ContextCacheManager(
+                ttl_seconds=cache_settings['TTL_SECONDS'],
+                refresh_margin_seconds=cache_settings['REFRESH_MARGIN_SECONDS'],
+            )
+        return _context_cache_manager
+
+def _create_chat(history, cached_content=None):
+    """Create a Gemini chat with the standard model config and the given history.
+    With cached_content the system prompt and base knowledge come from the cache."""
+    client = _get_genai_client()
+    config = {**_MODEL_CONFIG, "max_output_tokens": token_budget.get_token_budget_settings()['MAX_OUTPUT_TOKENS']}
+    if cached_content:
+        config["cached_content"] = cached_content
+    else:
+        config["system_instruction"] = _SYSTEM_INSTRUCTION
+    chat = client.chats.create(
+        model=_MODEL_NAME,
+        config=config,
+        history=history
+    )
+    # Remember the cache so session stores can rehydrate the chat against it
+    chat.cached_content = cached_content
+    return chat
+
 async def _get_or_create_chat_session(thread_id=None, user_id=None):
-    """Get or create a persistent Gemini chat session with improved LRU management."""
+    """Get or create a persistent Gemini chat session from the configured store."""
     if not thread_id or not user_id:
         raise Exception("Both thread_id and user_id are required for session persistence.")
     
+    if retrieval.retrieval_enabled():
+        # The chat holds only the recent window; older turns are retrieved per prompt
+        recent_turns = retrieval.get_retrieval_settings()['RECENT_TURNS']
+        return await _build_chat_session(thread_id, user_id, max_history=recent_turns, store=False)
+    
     key = _get_session_key(thread_id, user_id)
-    current_time = time.time()
+    store = get_chat_session_store()
     
-    with _chat_sessions_lock:
-        if key in _chat_sessions:
-            _chat_access_times[key] = current_time  # Update access time
-            return _chat_sessions[key]
+    with metrics.stage('session_lookup'):
+        chat = await _run_blocking(store.get, key, _create_chat)
+    if chat is not None and chat.cached_content:
+        # Keep the context cache alive; rebuild the chat if it has expired
+        manager = _get_context_cache_manager()
+        if manager and await _run_blocking(manager.ensure_fresh, _get_genai_client(), chat.cached_content):
+            return chat
+        await _run_blocking(store.delete, key)
+    elif chat is not None:
+        return chat
     
-    client = _get_genai_client()
-    # Use direct module variable instead of cached function
-    system_content = _SYSTEM_INSTRUCTION
-    history = await _get_conversation_history(thread_id, max_history=15) if thread_id else []
+    return await _session_flight.do(key, lambda: _build_chat_session(thread_id, user_id))
+
+async def _build_chat_session(thread_id, user_id, max_history=None, store=True):
+    """Build a chat from the thread's history and base knowledge, and store it.
+    Without `max_history`, the last 15 turns are used, or with the token budget
+    enabled as many of the last MAX_HISTORY_TURNS as fit in HISTORY_TOKENS."""
+    if max_history is None:
+        budget = token_budget.get_token_budget_settings()
+        max_history = budget['MAX_HISTORY_TURNS'] if budget['ENABLED'] else 15
+    with metrics.stage('history_load'):
+        history = await _get_conversation_history(thread_id, max_history=max_history) if thread_id else []
     
-    # Load base knowledge files (keep sync for now, but optimize)
-    context_file_uris = await asyncio.to_thread(upload_base_knowledge_files)
-    context_parts = [
-        types.Part.from_uri(file_uri=uri, mime_type="application/pdf")
-        for uri in context_file_uris
-    ]
-    context_parts.append(types.Part.from_text(
-        text="These are reference documents from Loeb center, always refer to them while responding. They also contains few shots, and other information regarding what we care about"
-    ))
+    if vector_store.vector_store_enabled():
+        # Only the passages relevant to each prompt are sent, with the prompt
+        context_file_uris = []
+        context_parts = []
+    else:
+        # Load base knowledge files (keep sync for now, but optimize)
+        with metrics.stage('base_knowledge'):
+            context_file_uris = await _base_knowledge_flight.do(
+                'base_knowledge', lambda: _run_blocking(upload_base_knowledge_files)
+            )
+        context_parts = [
+            types.Part.from_uri(file_uri=uri, mime_type="application/pdf")
+            for uri in context_file_uris
+        ]
+        context_parts.append(types.Part.from_text(
+            text="These are reference documents from Loeb center, always refer to them while responding. They also contains few shots, and other information regarding what we care about"
+        ))
     
-    context_message = {'role': 'model', 'parts': context_parts}
-    history = [context_message] + history
-    
-    # Create chat with direct config access
-    chat = client.chats.create(
-        model='models/gemini-2.5-flash',
-        config={
-            "system_instruction": system_content,
-            **_MODEL_CONFIG  # Use direct module variable
-        },
-        history=history
-    )
-    
-    with _chat_sessions_lock:
-        # Improved LRU cleanup - remove least recently used
-        if len(_chat_sessions) >= 20:
-            if _chat_access_times:  # Safety check
-                oldest_key = min(_chat_access_times.keys(), 
-                               key=lambda k: _chat_access_times[k])
-                del _chat_sessions[oldest_key]
-                del _chat_access_times[oldest_key]
-                print(f"🧹 Removed LRU session: {oldest_key}")
-        
-        _chat_sessions[key] = chat
-        _chat_access_times[key] = current_time
+    cached_content = None
+    manager = _get_context_cache_manager()
+    if manager:
+        with metrics.stage('context_cache'):
+            cached_content = await _run_blocking(
+                manager.get_cache_name, _get_genai_client(), _MODEL_NAME, _SYSTEM_INSTRUCTION,
+                context_parts, context_file_uris
+            )
+    if not cached_content and context_parts:
+        # No context cache: send the reference documents as part of the history
+        context_message = {'role': 'model', 'parts': context_parts}
+        history = [context_message] + history
     
+    chat = _create_chat(history, cached_content)
+    if store:
+        await _run_blocking(get_chat_session_store().put, _get_session_key(thread_id, user_id), chat)
     return chat
 
+async def _save_chat_session(thread_id, user_id, chat):
+    """Write the chat back to the store after it has recorded a new turn."""
+    if retrieval.retrieval_enabled():
+        return
+    store = get_chat_session_store()
+    with metrics.stage('session_save'):
+        await _run_blocking(store.put, _get_session_key(thread_id, user_id), chat)
+
 @sync_to_async
 def _get_conversation_history(thread_id, max_history=20):
-    """Get conversation history from database for chat session with optimizations"""
+    """Get conversation history from database for chat session with optimizations.
+    With the token budget enabled, older turns past HISTORY_TOKENS are left out. With
+    summaries enabled, the thread's summary replaces the turns it covers."""
     try:        
         thread = ConversationsThread.objects.filter(id=thread_id).first()
         if not thread:
             return []
         
-        conversations = Conversation.objects.filter(
-            thread=thread
-        ).select_related('thread').prefetch_related('attachedfile_set').order_by('-created_at')[:max_history]
+        conversations = Conversation.objects.filter(thread=thread)
+        summary = thread.summary if summarizer.summary_enabled() else ""
+        if summary:
+            conversations = conversations.filter(id__gt=thread.summarized_through)
+        conversations = conversations.select_related('thread').prefetch_related(
+            'attachedfile_set'
+        ).order_by('-created_at')[:max_history]
         
-        conversations = list(reversed(conversations))
-        
-        history = []
+        budget = token_budget.get_token_budget_settings()
+        send_text = extraction.send_extracted_text()
+        turns = []
+        history_tokens = 0
+        # Newest first, so the token budget keeps the latest turns
         for conv in conversations:
             if conv.prompt and conv.response:
                 user_parts = [{'text': conv.prompt}]
@@ -140,21 +271,29 @@ def _get_conversation_history(thread_id, max_history=20):
                         client = _get_genai_client()
                         try:
                             full_path = pathlib.Path(settings.MEDIA_ROOT) / file.stored_filename
-                            if full_path.exists():
-                                uploaded = client.files.upload(file=full_path)
-                                file_part = {'file_data': {'file_uri': uploaded.uri, 'mime_type': file.file_type}}
+                            extracted_text = extraction.load_compact_text(full_path) if send_text else None
+                            if extracted_text:
+                                user_parts.append({'text': extracted_text})
+                            elif full_path.exists():
+                                file_uri, mime_type = upload_registry.get_or_upload(client, full_path, file.file_type)
+                                file_part = {'file_data': {'file_uri': file_uri, 'mime_type': mime_type}}
                                 user_parts.append(file_part)
-                                print(f"📎 Added file {file.original_filename} to history")
+                                logger.debug("Added file %s to history", file.original_filename)
                         except Exception as e:
-                            print(f"⚠️ Failed to add file {file.original_filename} to history: {e}")
+                            logger.warning("Failed to add file %s to history: %s", file.original_filename, e)
                 
-                history.append({'role': 'user', 'parts': user_parts})
-                history.append({'role': 'model', 'parts': [{'text': conv.response}]})
+                turn = [{'role': 'user', 'parts': user_parts}, {'role': 'model', 'parts': [{'text': conv.response}]}]
+                if budget['ENABLED']:
+                    history_tokens += token_budget.content_tokens(turn, budget['FILE_TOKENS'])
+                    if history_tokens > budget['HISTORY_TOKENS']:
+                        break
+                turns.append(turn)
                 
-        return history
+        history = [message for turn in reversed(turns) for message in turn]
+        return summarizer.summary_messages(summary) + history if summary else history
         
     except Exception as e:
-        print(f"Error getting conversation history: {e}")
+        logger.error("Error getting conversation history: %s", e)
         return []
 
 def _process_file_url_sync(file_url):
@@ -168,46 +307,219 @@ def _process_file_url_sync(file_url):
             mime_type = _get_mime_type_by_extension(extension)  # Cache by extension
             return (full_path, mime_type)
     except Exception as e:
-        print(f"Error checking file {full_path}: {e}")
+        logger.warning("Error checking file %s: %s", full_path, e)
     
     return None
 
-async def generate_response(promptText, fileUrls=None, thread_id=None, user_id=None):
-    """Generate content using Gemini Chat API with persistent chat session and optimizations."""
+async def _prepare_chat_message(promptText, fileUrls, thread_id, user_id, analysis=None):
+    """Return the chat session and the message parts for a prompt, its local
+    analysis summary, the retrieved thread context and reference passages,
+    and its files."""
+    chat = await _get_or_create_chat_session(thread_id, user_id)
+    message_parts = [types.Part.from_text(text=promptText)]
+    if analysis:
+        message_parts.append(types.Part.from_text(text=analysis))
+    if retrieval.retrieval_enabled():
+        with metrics.stage('retrieval'):
+            context = await sync_to_async(retrieval.build_context)(thread_id, promptText)
+        if context:
+            message_parts.append(types.Part.from_text(text=context))
+    if vector_store.vector_store_enabled():
+        with metrics.stage('base_knowledge'):
+            passages = await sync_to_async(_reference_context)(promptText, fileUrls, thread_id)
+        if passages:
+            message_parts.append(types.Part.from_text(text=passages))
+    
+    # Process file uploads concurrently if provided
+    if fileUrls:
+        with metrics.stage('file_upload'):
+            file_parts = await _process_file_uploads(fileUrls)
+        message_parts.extend(file_parts)
+    
+    return chat, message_parts
+
+def _media_paths(fileUrls):
+    """Local paths of uploaded files from their media URLs."""
+    return [
+        pathlib.Path(settings.MEDIA_ROOT) / file_url.replace(settings.MEDIA_URL, '')
+        for file_url in fileUrls or []
+    ]
+
+def _reference_context(promptText, fileUrls, thread_id):
+    """Select the base-knowledge passages for a prompt, its thread and its files."""
+    return knowledge_base.build_context(
+        promptText, thread_id, knowledge_base.attached_file_texts(_media_paths(fileUrls))
+    )
+
+async def _get_cached_response(promptText, fileUrls, thread_id, user_id, analysis):
+    """Look the request up in the response cache. Returns the cache, the request's
+    key and the cached text, or (None, None, None) when the cache is disabled.
+    On a hit the turn is appended to the stored chat, so the next prompt
+    continues it instead of rebuilding it from the database."""
+    cache = response_cache.get_response_cache()
+    if cache is None:
+        return None, None, None
+    model_config = {
+        'model': _MODEL_NAME,
+        **_MODEL_CONFIG,
+        'max_output_tokens': token_budget.get_token_budget_settings()['MAX_OUTPUT_TOKENS'],
+        'system_instruction': hashlib.sha256(_SYSTEM_INSTRUCTION.encode()).hexdigest(),
+    }
+    with metrics.stage('cache_lookup'):
+        key = await sync_to_async(response_cache.request_key)(
+            promptText, _media_paths(fileUrls), thread_id, user_id, analysis, model_config
+        )
+        text = await _run_blocking(cache.get, key)
+    if text is not None and thread_id and user_id and not retrieval.retrieval_enabled():
+        with metrics.stage('session_save'):
+            await _run_blocking(_append_cached_turn, thread_id, user_id, promptText, analysis, text)
+    return cache, key, text
+
+def _append_cached_turn(thread_id, user_id, promptText, analysis, text):
+    """Add a turn answered from the response cache to the stored chat, if there is one.
+    Its files are left out, as they weren't uploaded; a rebuild from the database
+    brings them back."""
+    store = get_chat_session_store()
+    key = _get_session_key(thread_id, user_id)
+    chat = store.get(key, _create_chat)
+    if chat is None:
+        return
+    user_parts = [types.Part.from_text(text=promptText)]
+    if analysis:
+        user_parts.append(types.Part.from_text(text=analysis))
+    history = chat.get_history(curated=True) + [
+        types.Content(role='user', parts=user_parts),
+        types.Content(role='model', parts=[types.Part.from_text(text=text)]),
+    ]
+    store.put(key, _create_chat(history, chat.cached_content))
+
+def _fit_token_budget(chat, message_parts):
+    """Estimate the tokens of sending message_parts on the chat. With the token
+    budget enabled, a chat whose history is over budget is replaced by one with
+    only the newest turns that fit. Returns the chat and the estimate."""
+    history, estimate = token_budget.fit_request(_SYSTEM_INSTRUCTION, chat.get_history(curated=True), message_parts)
+    if estimate['dropped_messages']:
+        chat = _create_chat(history, chat.cached_content)
+    return chat, estimate
+
+def _record_usage(usage, estimate, response, response_text, request):
+    """Record the request's token counts in the metrics and its `request` record,
+    and copy them into the caller's usage dict."""
+    counted = token_budget.response_usage(response, estimate, response_text)
+    thoughts_tokens = getattr(getattr(response, 'usage_metadata', None), 'thoughts_token_count', None)
+    thoughts_tokens = thoughts_tokens if isinstance(thoughts_tokens, int) else None
+    metrics.observe_tokens(counted['input_tokens'], counted['output_tokens'], thoughts_tokens)
+    request.update(
+        counted, estimated_input_tokens=estimate['estimated_input_tokens'], history_tokens=estimate['history_tokens']
+    )
+    if usage is not None:
+        usage.update(estimate, **counted)
+
+def _record_cached_usage(usage, request):
+    """A response from the response cache costs no tokens."""
+    request['outcome'] = 'cached'
+    if usage is not None:
+        usage.update(input_tokens=0, output_tokens=0, cached=True)
+
+async def generate_response(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+    """Generate content using Gemini Chat API with persistent chat session and optimizations.
+    `analysis` is the local pre-analysis summary sent along with the prompt. A `usage`
+    dict is filled with the request's input and output tokens (see token_budget).
+    Repeated identical requests are answered from the response cache when enabled."""
     if not promptText or not promptText.strip():
         raise Exception("Prompt text cannot be empty")
     
-    try:
-        chat = await _get_or_create_chat_session(thread_id, user_id)
-        message_parts = [types.Part.from_text(text=promptText)]
-        
-        # Process file uploads concurrently if provided
-        if fileUrls:
-            file_parts = await _process_file_uploads(fileUrls)
-            message_parts.extend(file_parts)
-        
-        # Add timeout and retry logic for better reliability
-        max_retries = 3
-        last_error = None
-        
-        for attempt in range(max_retries):
-            try:
-                response = await asyncio.to_thread(chat.send_message, message_parts)
-                if response and response.text:
-                    return response.text
-                else:
-                    last_error = Exception("Empty response from Gemini API")
+    with metrics.track_request('sync') as request:
+        try:
+            cache, cache_key, cached_text = await _get_cached_response(
+                promptText, fileUrls, thread_id, user_id, analysis
+            )
+            if cached_text is not None:
+                _record_cached_usage(usage, request)
+                return cached_text
+            start = time.perf_counter()
+            chat, message_parts = await _prepare_chat_message(promptText, fileUrls, thread_id, user_id, analysis)
+            chat, estimate = _fit_token_budget(chat, message_parts)
+            
+            # Add timeout and retry logic for better reliability
+            max_retries = 3
+            last_error = None
+            
+            for attempt in range(max_retries):
+                try:
+                    with metrics.stage('send_message'):
+                        response = await _run_blocking(chat.send_message, message_parts)
+                    if response and response.text:
+                        await _save_chat_session(thread_id, user_id, chat)
+                        _record_usage(usage, estimate, response, response.text, request)
+                        if cache:
+                            await _run_blocking(cache.put, cache_key, response.text, time.perf_counter() - start)
+                        return response.text
+                    else:
+                        last_error = Exception("Empty response from Gemini API")
+                        if attempt == max_retries - 1:
+                            raise last_error
+                except Exception as e:
+                    last_error = e
                     if attempt == max_retries - 1:
-                        raise last_error
-            except Exception as e:
-                last_error = e
-                if attempt == max_retries - 1:
-                    raise e
-                print(f"Attempt {attempt + 1} failed, retrying: {e}")
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                
-    except Exception as e:
-        raise Exception(f"Content generation failed: {e}")
+                        raise e
+                    logger.warning("Attempt %d failed, retrying: %s", attempt + 1, e)
+                    metrics.RETRIES.inc()
+                    request['retries'] = attempt + 1
+                    with metrics.stage('retry_backoff'):
+                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    
+        except Exception as e:
+            raise Exception(f"Content generation failed: {e}")
+
+async def generate_response_stream(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None,
+                                   usage=None):
+    """Generate content like generate_response, yielding text chunks as Gemini produces them.
+    The chat session records the full reply, and `usage` its token counts, once the
+    stream is exhausted. A cached response is yielded as a single chunk."""
+    if not promptText or not promptText.strip():
+        raise Exception("Prompt text cannot be empty")
+    
+    with metrics.track_request('stream') as request:
+        try:
+            cache, cache_key, cached_text = await _get_cached_response(
+                promptText, fileUrls, thread_id, user_id, analysis
+            )
+            if cached_text is not None:
+                _record_cached_usage(usage, request)
+                yield cached_text
+                return
+            start = time.perf_counter()
+            chat, message_parts = await _prepare_chat_message(promptText, fileUrls, thread_id, user_id, analysis)
+            chat, estimate = _fit_token_budget(chat, message_parts)
+            stream = chat.send_message_stream(message_parts)
+            
+            # The SDK stream is blocking, so pull each chunk from a worker thread.
+            # send_message counts the time waiting for chunks, not the time the
+            # client takes to read them.
+            texts = []
+            last_chunk = None
+            waiting = 0.0
+            while True:
+                wait_start = time.perf_counter()
+                chunk = await _run_blocking(next, stream, None)
+                waiting += time.perf_counter() - wait_start
+                if last_chunk is None:
+                    metrics.observe_stage('first_chunk', waiting)
+                if chunk is None:
+                    break
+                # The last chunk carries the usage metadata for the whole response
+                last_chunk = chunk
+                if chunk.text:
+                    texts.append(chunk.text)
+                    yield chunk.text
+            metrics.observe_stage('send_message', waiting)
+            await _save_chat_session(thread_id, user_id, chat)
+            _record_usage(usage, estimate, last_chunk, "".join(texts), request)
+            if cache and texts:
+                await _run_blocking(cache.put, cache_key, "".join(texts), time.perf_counter() - start)
+        except Exception as e:
+            raise Exception(f"Content generation failed: {e}")
 
 async def _process_file_uploads(fileUrls):
     """Process file uploads with concurrent processing"""
@@ -237,62 +549,81 @@ async def _process_file_uploads(fileUrls):
             if isinstance(result, types.Part):
                 file_parts.append(result)
             elif isinstance(result, Exception):
-                print(f"Error in file upload: {result}")
+                logger.error("Error in file upload: %s", result)
         return file_parts
     
     return []
 
 async def _upload_single_file(client, file_data):
-    """Upload a single file"""
+    """Upload a single file, reusing a previous upload of the same content.
+    Returns a text part instead when extracted text is sent in place of files."""
     file_path, mime_type = file_data
     
+    # Send the locally extracted text instead of the file when configured
+    if extraction.send_extracted_text():
+        extracted_text = await asyncio.to_thread(extraction.load_compact_text, file_path)
+        if extracted_text:
+            return types.Part.from_text(text=extracted_text)
+    
     try:
-        uploaded = await asyncio.to_thread(client.files.upload, file=file_path)
-        return types.Part.from_uri(file_uri=uploaded.uri, mime_type=mime_type)
+        file_uri, mime_type = await _run_blocking(upload_registry.get_or_upload, client, file_path, mime_type)
+        return types.Part.from_uri(file_uri=file_uri, mime_type=mime_type)
     except Exception as e:
         raise Exception(f"Failed to upload {file_path.name}: {e}")
 
 def upload_base_knowledge_files():
     """Upload all files in the base_knowledge folder to Gemini and return their URIs.
-    Uses caching to avoid re-uploading the same files multiple times."""
+    Uses caching to avoid re-uploading the same files multiple times, both within
+    this process and across restarts through the upload registry."""
     global _base_knowledge_uris
     
     with _base_knowledge_lock:
         if _base_knowledge_uris is not None:
-            print("📚 Using cached base knowledge files")
+            logger.debug("Using cached base knowledge files")
             return _base_knowledge_uris
     
+    with _base_knowledge_load_lock:
+        # Another thread may have finished uploading while we waited
+        with _base_knowledge_lock:
+            if _base_knowledge_uris is not None:
+                return _base_knowledge_uris
+        return _upload_base_knowledge_files()
+
+def _upload_base_knowledge_files():
+    """Upload the base_knowledge folder and cache the URIs; callers hold the load lock."""
+    global _base_knowledge_uris
+    
     base_knowledge_dir = os.path.join(settings.BASE_DIR, 'base_knowledge')
     client = _get_genai_client()
     context_file_uris = []
     
     try:
         if not os.path.exists(base_knowledge_dir):
-            print(f"❌ Base knowledge directory not found: {base_knowledge_dir}")
+            logger.error("Base knowledge directory not found: %s", base_knowledge_dir)
             return []
             
-        print("📚 Uploading base knowledge files to Gemini (first time only)...")
+        logger.info("Uploading base knowledge files to Gemini (first time only)")
         files = [f for f in os.listdir(base_knowledge_dir) 
                 if os.path.isfile(os.path.join(base_knowledge_dir, f))]
         
         for filename in files:
             file_path = os.path.join(base_knowledge_dir, filename)
             try:
-                uploaded = client.files.upload(file=pathlib.Path(file_path))
-                context_file_uris.append(uploaded.uri)
-                print(f"✅ Uploaded {filename}")
+                file_uri, _ = upload_registry.get_or_upload(client, pathlib.Path(file_path), "application/pdf")
+                context_file_uris.append(file_uri)
+                logger.info("Uploaded %s", filename)
             except Exception as e:
-                print(f"❌ Error uploading {filename}: {e}")
+                logger.error("Error uploading %s: %s", filename, e)
         
         # Cache the URIs
         with _base_knowledge_lock:
             _base_knowledge_uris = context_file_uris
         
-        print(f"📚 Base knowledge files cached ({len(context_file_uris)} files)")
+        logger.info("Base knowledge files cached (%d files)", len(context_file_uris))
         return context_file_uris
         
     except Exception as e:
-        print(f"❌ Error in base knowledge upload: {e}")
+        logger.error("Error in base knowledge upload: %s", e)
         return []
 
 def clear_base_knowledge_cache():
@@ -300,25 +631,25 @@ def clear_base_knowledge_cache():
     global _base_knowledge_uris
     with _base_knowledge_lock:
         _base_knowledge_uris = None
-    print("🗑️ Base knowledge cache cleared")
+    logger.info("Base knowledge cache cleared")
 
 def get_cache_stats():
     """Get statistics about current cache usage with enhanced info."""
     with _base_knowledge_lock:
         base_knowledge_count = len(_base_knowledge_uris) if _base_knowledge_uris else 0
     
-    with _chat_sessions_lock:
-        active_sessions = len(_chat_sessions)
-        oldest_session_age = 0
-        if _chat_access_times:
-            current_time = time.time()
-            oldest_access = min(_chat_access_times.values())
-            oldest_session_age = current_time - oldest_access
+    chat_session_stats = get_chat_session_store().stats()
     
     return {
         'base_knowledge_files': base_knowledge_count,
-        'active_chat_sessions': active_sessions,
-        'oldest_session_age_seconds': round(oldest_session_age, 2),
+        'active_chat_sessions': chat_session_stats.get('active_chat_sessions'),
+        'oldest_session_age_seconds': chat_session_stats.get('oldest_session_age_seconds'),
+        'chat_session_store': chat_session_stats,
+        'upload_registry': upload_registry.get_stats(),
+        'context_cache': _context_cache_manager.stats if _context_cache_manager else None,
+        'response_cache': response_cache.get_stats(),
+        'shared_session_builds': _session_flight.shared,
+        'shared_base_knowledge_loads': _base_knowledge_flight.shared,
         'mime_type_cache_info': _get_mime_type_by_extension.cache_info(),
         # Removed unnecessary cache_info calls for module constants
     }
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Background queue for critique jobs.
+
+Instead of holding an HTTP worker while Gemini generates a critique, the API
+can store a ``CritiqueJob`` and return immediately; a ``JobWorkerPool`` (run
+with ``manage.py run_job_workers``) claims jobs and runs them. The backend is
+selected with the ``RESUMAX_JOB_QUEUE`` setting, in the same shape as
+``RESUMAX_CHAT_SESSION_STORE``:
+
+    RESUMAX_JOB_QUEUE = {
+        'BACKEND': 'resumax_algo.job_queue.DatabaseJobQueue',
+        'OPTIONS': {'stale_after': 600, 'max_attempts': 3},
+    }
+
+The job row is always the source of truth for status and results; backends
+only decide how workers find the next job. ``DatabaseJobQueue`` uses the job
+table itself, so no outside service is needed.
+"""
+from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+import asyncio
+import logging
+import threading
+
+from .models import CritiqueJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_QUEUE = {
+    'BACKEND': 'resumax_algo.job_queue.DatabaseJobQueue',
+    'OPTIONS': {},
+}
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+class JobQueue:
+    """Interface for job queue backends."""
+
+    def enqueue(self, job):
+        """Make a saved, queued ``job`` available to workers."""
+        raise NotImplementedError
+
+    def claim(self):
+        """Mark the next queued job as running and return it, or None if there is none."""
+        raise NotImplementedError
+
+    def complete(self, job, conversation):
+        """Record that ``job`` succeeded and produced ``conversation``."""
+        job.status = CritiqueJob.SUCCEEDED
+        job.conversation = conversation
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'conversation', 'finished_at'])
+
+    def fail(self, job, error):
+        """Record that ``job`` failed with ``error``."""
+        job.status = CritiqueJob.FAILED
+        job.error_message = str(error)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'finished_at'])
+
+    def stats(self):
+        """Return the number of jobs in each status."""
+        counts = {status: 0 for status, _ in CritiqueJob.STATUS_CHOICES}
+        for row in CritiqueJob.objects.order_by().values('status').annotate(count=Count('id')):
+            counts[row['status']] = row['count']
+        return {'backend': type(self).__name__, **counts}
+
+
+class DatabaseJobQueue(JobQueue):
+    """
+    Use the CritiqueJob table as the queue.
+
+    A job is claimed with a conditional UPDATE from queued to running, so two
+    workers can never take the same job, on any database. Jobs left running
+    longer than ``stale_after`` seconds (a worker died mid-job) are queued again
+    until they reach ``max_attempts``.
+    """
+
+    def __init__(self, stale_after=600, max_attempts=3):
+        self.stale_after = timedelta(seconds=stale_after)
+        self.max_attempts = max_attempts
+
+    def enqueue(self, job):
+        # The queued row is already visible to workers polling the table
+        pass
+
+    def claim(self):
+        self.requeue_stale()
+        while True:
+            job_id = (
+                CritiqueJob.objects.filter(status=CritiqueJob.QUEUED)
+                .order_by('created_at', 'id')
+                .values_list('id', flat=True)
+                .first()
+            )
+            if job_id is None:
+                return None
+            claimed = CritiqueJob.objects.filter(id=job_id, status=CritiqueJob.QUEUED).update(
+                status=CritiqueJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+            )
+            if claimed:
+                return CritiqueJob.objects.get(id=job_id)
+            # Another worker claimed it first; try the next one
+
+    def requeue_stale(self):
+        """Queue abandoned running jobs again, or fail them once they're out of attempts."""
+        stale = CritiqueJob.objects.filter(
+            status=CritiqueJob.RUNNING, started_at__lt=timezone.now() - self.stale_after
+        )
+        stale.filter(attempts__gte=self.max_attempts).update(
+            status=CritiqueJob.FAILED,
+            error_message="Job timed out",
+            finished_at=timezone.now(),
+        )
+        stale.update(status=CritiqueJob.QUEUED)
+
+
+class JobWorkerPool:
+    """
+    Run jobs from ``queue`` with ``concurrency`` async workers in one process.
+
+    ``handler(job)`` is an async function that does the work and returns the
+    saved Conversation; any exception marks the job as failed. Workers poll the
+    queue every ``poll_interval`` seconds while it's empty.
+    """
+
+    def __init__(self, queue, handler, concurrency=4, poll_interval=1.0):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stats = {'succeeded': 0, 'failed': 0}
+
+    async def run(self, stop_event=None, drain=False):
+        """
+        Run the workers until ``stop_event`` is set, or with ``drain`` until the
+        queue is empty.
+        """
+        stop_event = stop_event or asyncio.Event()
+        await asyncio.gather(*(self._worker(stop_event, drain) for _ in range(self.concurrency)))
+
+    async def _worker(self, stop_event, drain):
+        while not stop_event.is_set():
+            job = await sync_to_async(self.queue.claim)()
+            if job is None:
+                if drain:
+                    return
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+
+    async def run_job(self, job):
+        """Run one claimed job and record its outcome."""
+        try:
+            conversation = await self.handler(job)
+        except Exception as e:
+            logger.error("Critique job %s failed: %s", job.id, e)
+            await sync_to_async(self.queue.fail)(job, e)
+            self.stats['failed'] += 1
+        else:
+            await sync_to_async(self.queue.complete)(job, conversation)
+            self.stats['succeeded'] += 1
+
+
+def create_job_queue():
+    """Instantiate the queue configured by RESUMAX_JOB_QUEUE."""
+    config = getattr(settings, 'RESUMAX_JOB_QUEUE', DEFAULT_JOB_QUEUE)
+    backend = import_string(config.get('BACKEND', DEFAULT_JOB_QUEUE['BACKEND']))
+    return backend(**config.get('OPTIONS', {}))
+
+
+def get_job_queue():
+    """Return the process-wide job queue, creating it on first use."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = create_job_queue()
+    return _job_queue
+
+
+def reset_job_queue():
+    """Drop the job queue so the next call picks up changed settings."""
+    global _job_queue
+    with _job_queue_lock:
+        _job_queue = None
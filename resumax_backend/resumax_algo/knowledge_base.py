@@ -0,0 +1,282 @@
+"""
+Chunked Loeb center base-knowledge corpus and per-prompt passage selection.
+
+``python manage.py build_knowledge_base`` reads every file in
+``base_knowledge/`` with PyMuPDF, splits each page into passages anchored to
+their file and page, tags them with the document types and disciplines they
+are written for, stores them as ``Document`` rows and indexes them in the
+vector store.
+
+For each prompt, the document type and target discipline are taken from the
+model's INITIAL_DIAGNOSTIC in the thread ("Document Type: ... Target
+Discipline: ..."), or guessed from the prompt and attached files on the
+first turn. The vector store's candidates written for another type or
+discipline are dropped, passages tagged for this exact context are ranked
+up, and the best ones are packed into a token budget, so the context sent
+with a prompt stays the same size however large the corpus grows.
+"""
+from django.conf import settings
+from collections import Counter
+import logging
+import os
+import pathlib
+import re
+
+import pymupdf
+
+from . import extraction
+from .retrieval import chunk_text
+from .token_budget import estimate_tokens
+from .vector_store import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KNOWLEDGE_BASE = {
+    'DIRECTORY': None,  # defaults to BASE_DIR / 'base_knowledge'
+    'CHUNK_CHARS': 1500,
+    # Vector store candidates considered for each prompt
+    'CANDIDATES': 40,
+    'TOKEN_BUDGET': 2000,
+}
+
+TEXT_SUFFIXES = {'.txt', '.md'}
+# Score added per matching tag, so tailored passages beat general ones of similar relevance
+TAG_BONUS = 0.1
+# Keyword hits a passage needs before it is tagged from its own text
+MIN_TAG_HITS = 2
+
+DOC_TYPE_KEYWORDS = {
+    'resume': ['resume', 'résumé', 'resumes', 'bullet points?', 'ats'],
+    'academic_cv': ['academic cv', 'curriculum vitae', 'cv', 'publications', 'research statement', 'teaching statement'],
+    'cover_letter': ['cover letters?', 'dear', 'sincerely', 'hiring manager', 'letter of interest'],
+}
+DISCIPLINE_KEYWORDS = {
+    'stem': ['stem', 'engineering', 'computer science', 'software', 'data science', 'biology', 'chemistry',
+             'physics', 'mathematics', 'math', 'neuroscience', 'statistics', 'laboratory', 'lab'],
+    'business': ['business', 'finance', 'financial', 'consulting', 'marketing', 'banking', 'sales',
+                 'accounting', 'investment', 'management'],
+    'humanities': ['humanities', 'english', 'history', 'philosophy', 'literature', 'classics', 'religion',
+                   'languages', 'writing'],
+    'social_sciences': ['social sciences?', 'soc sci', 'economics', 'psychology', 'sociology', 'political science',
+                        'anthropology', 'public policy'],
+    'arts': ['arts', 'theater', 'theatre', 'music', 'studio art', 'film', 'dance', 'design portfolio'],
+}
+
+
+def _keyword_res(keywords):
+    return {
+        name: re.compile(rf"\b(?:{'|'.join(words)})\b", re.IGNORECASE)
+        for name, words in keywords.items()
+    }
+
+
+_DOC_TYPE_RES = _keyword_res(DOC_TYPE_KEYWORDS)
+_DISCIPLINE_RES = _keyword_res(DISCIPLINE_KEYWORDS)
+_DIAGNOSTIC_RES = {
+    'doc_type': re.compile(r'document type\W*?:\W*([^\n]+)', re.IGNORECASE),
+    'discipline': re.compile(r'target discipline\W*?:\W*([^\n]+)', re.IGNORECASE),
+}
+
+
+def get_knowledge_base_settings():
+    """Return RESUMAX_KNOWLEDGE_BASE merged over the defaults."""
+    config = {**DEFAULT_KNOWLEDGE_BASE, **getattr(settings, 'RESUMAX_KNOWLEDGE_BASE', {})}
+    if not config['DIRECTORY']:
+        config['DIRECTORY'] = os.path.join(settings.BASE_DIR, 'base_knowledge')
+    return config
+
+
+def _hits(text, regexes):
+    """Keyword hits per category."""
+    return Counter({name: len(regex.findall(text)) for name, regex in regexes.items()})
+
+
+def _tags(text, regexes, min_hits=1):
+    return sorted(name for name, count in _hits(text, regexes).items() if count >= min_hits)
+
+
+def classify(text, regexes):
+    """The category with the most keyword hits in ``text``, or None."""
+    (name, count), = _hits(text, regexes).most_common(1)
+    return name if count else None
+
+
+# Corpus build
+
+def _file_pages(path):
+    """The text of each page of a base-knowledge file."""
+    if path.suffix.lower() in TEXT_SUFFIXES:
+        return [path.read_text(errors='replace')]
+    with pymupdf.open(path) as document:
+        return [page.get_text() for page in document]
+
+
+def build_corpus(directory, chunk_chars=1500):
+    """
+    Return the passages of every file in ``directory`` as dicts with
+    ``source``, ``page``, ``text``, ``doc_types`` and ``disciplines``.
+
+    Files whose name names a document type or discipline ("Cover Letter
+    Guide.pdf") tag every passage; otherwise each passage is tagged from its
+    own text. Untagged passages are general and match every prompt.
+    """
+    passages = []
+    for path in sorted(pathlib.Path(directory).iterdir()):
+        if not path.is_file():
+            continue
+        try:
+            pages = _file_pages(path)
+        except Exception as e:
+            logger.warning("Error reading %s: %s", path.name, e)
+            continue
+        name = path.stem.replace('_', ' ').replace('-', ' ')
+        file_doc_types = _tags(name, _DOC_TYPE_RES)
+        file_disciplines = _tags(name, _DISCIPLINE_RES)
+        for number, page in enumerate(pages, start=1):
+            for text in chunk_text(page, chunk_chars):
+                passages.append({
+                    'source': path.name,
+                    'page': number if len(pages) > 1 else None,
+                    'text': text,
+                    'doc_types': file_doc_types or _tags(text, _DOC_TYPE_RES, MIN_TAG_HITS),
+                    'disciplines': file_disciplines or _tags(text, _DISCIPLINE_RES, MIN_TAG_HITS),
+                })
+    return passages
+
+
+def store_corpus(passages, batch_size=256):
+    """
+    Replace the knowledge-base Documents with ``passages`` and re-index the
+    vector store; returns the number of indexed documents.
+    """
+    from .models import Document
+    from .vector_store import rebuild_index
+
+    # Empty the index first so the per-row delete signals have nothing to do
+    get_vector_store().rebuild([])
+    Document.objects.exclude(source='').delete()
+    Document.objects.bulk_create(
+        [
+            Document(
+                title=passage['source'] if passage['page'] is None else f"{passage['source']}, page {passage['page']}",
+                content=passage['text'],
+                source=passage['source'],
+                page=passage['page'],
+                doc_types=passage['doc_types'],
+                disciplines=passage['disciplines'],
+            )
+            for passage in passages
+        ],
+        batch_size=batch_size,
+    )
+    return rebuild_index(batch_size)
+
+
+# Per-prompt selection
+
+def parse_diagnostic(response):
+    """Return ``(doc_type, discipline)`` declared in a model response, None where missing."""
+    found = {}
+    for key, regex in _DIAGNOSTIC_RES.items():
+        match = regex.search(response)
+        value = match.group(1).replace('_', ' ') if match else ''
+        found[key] = classify(value, _DOC_TYPE_RES if key == 'doc_type' else _DISCIPLINE_RES) if value else None
+    return found['doc_type'], found['discipline']
+
+
+def detect_context(prompt, file_texts=(), thread_id=None):
+    """
+    Return the ``(doc_type, discipline)`` of a request, None where unknown.
+
+    The model's latest diagnostic in the thread wins; otherwise the prompt
+    and the attached files' text are classified by keywords.
+    """
+    from .models import Conversation
+
+    doc_type = discipline = None
+    if thread_id:
+        response = (
+            Conversation.objects.filter(thread_id=thread_id, response__icontains='document type')
+            .order_by('-id').values_list('response', flat=True).first()
+        )
+        if response:
+            doc_type, discipline = parse_diagnostic(response)
+    text = '\n'.join([prompt, *file_texts])
+    return doc_type or classify(text, _DOC_TYPE_RES), discipline or classify(text, _DISCIPLINE_RES)
+
+
+def _render(passage):
+    anchor = passage['source'] or passage['title']
+    if passage['page']:
+        anchor = f"{anchor}, p. {passage['page']}"
+    return f"--- {anchor} ---\n{passage['text']}"
+
+
+def select_passages(candidates, doc_type=None, discipline=None, token_budget=2000):
+    """
+    Pick passages from ``(score, passage)`` candidates for a document type
+    and discipline, best first, within ``token_budget`` tokens.
+
+    Passages tagged for another type or discipline are dropped and passages
+    tagged for this one get TAG_BONUS per matching tag. Returns the rendered
+    passages and their token count.
+    """
+    ranked = []
+    for score, passage in candidates:
+        if doc_type and passage['doc_types'] and doc_type not in passage['doc_types']:
+            continue
+        if discipline and passage['disciplines'] and discipline not in passage['disciplines']:
+            continue
+        bonus = TAG_BONUS * ((doc_type in passage['doc_types']) + (discipline in passage['disciplines']))
+        ranked.append((score + bonus, passage))
+    ranked.sort(key=lambda item: -item[0])
+
+    selected, used = [], 0
+    for _, passage in ranked:
+        rendered = _render(passage)
+        tokens = estimate_tokens(rendered)
+        # Skip passages that don't fit; a shorter one further down may
+        if used + tokens <= token_budget:
+            selected.append(rendered)
+            used += tokens
+    return selected, used
+
+
+def build_context(prompt, thread_id=None, file_texts=()):
+    """Return the text part with the reference passages selected for a prompt, or ''."""
+    from .models import Document
+
+    config = get_knowledge_base_settings()
+    doc_type, discipline = detect_context(prompt, file_texts, thread_id)
+    results = get_vector_store().search_ids(prompt, config['CANDIDATES'])
+    documents = Document.objects.in_bulk([doc_id for doc_id, _ in results])
+    candidates = [
+        (score, {
+            'title': documents[doc_id].title,
+            'source': documents[doc_id].source,
+            'page': documents[doc_id].page,
+            'text': documents[doc_id].content,
+            'doc_types': documents[doc_id].doc_types,
+            'disciplines': documents[doc_id].disciplines,
+        })
+        for doc_id, score in results if doc_id in documents
+    ]
+    selected, _ = select_passages(candidates, doc_type, discipline, config['TOKEN_BUDGET'])
+    if not selected:
+        return ''
+    header = "[Relevant passages from the Loeb center reference documents"
+    if doc_type:
+        header += f" for a {doc_type.replace('_', ' ')}"
+    if discipline:
+        header += f" in {discipline.replace('_', ' ')}"
+    return '\n'.join([f"{header}, retrieved for this prompt:]", *selected])
+
+
+def attached_file_texts(file_paths):
+    """The extracted text of attached files, for detecting the document type."""
+    texts = []
+    for path in file_paths:
+        text = extraction.load_compact_text(path)
+        if text:
+            texts.append(text)
+    return texts
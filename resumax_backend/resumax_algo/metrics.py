@@ -0,0 +1,276 @@
+"""
+Request metrics for the Gemini request path.
+
+A small process-wide registry of counters and histograms, rendered in the
+Prometheus text format by the ``/metrics`` endpoint (see ``views.metrics``):
+
+- ``resumax_gemini_stage_seconds{stage}``: time in each stage of a request
+  (``history_load``, ``base_knowledge``, ``file_upload``, ``send_message``,
+  ``retry_backoff``, ``db_save``, ...);
+- ``resumax_gemini_request_seconds{mode,outcome}``: whole requests;
+- ``resumax_gemini_tokens{kind}``: input, output and thinking tokens per
+  request, as reported by the SDK;
+- ``resumax_gemini_retries_total`` and ``resumax_gemini_requests_total``.
+
+Stages are timed with ``with metrics.stage('history_load'):``. Inside
+``metrics.track_request()`` the timings are also collected for the request
+and logged in one ``key=value`` line when it ends, with the record attached
+as ``request_metrics`` for structured log handlers. Each worker process has its own
+registry; scrape every worker, as with any multi-process Prometheus target.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import bisect
+import logging
+import threading
+import time
+
+# Upper bounds in seconds, from a cache lookup to a long Gemini response
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+logger = logging.getLogger(__name__)
+
+_current_request = ContextVar('resumax_request_timings', default=None)
+
+# Callables getting every (stage, seconds) observation, e.g. a load test
+# computing exact percentiles; they may be called from any thread
+_stage_listeners = []
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric with one series per combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def samples(self):
+        """Return the metric's ``(suffix, label string, value)`` samples."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return [("", _format_labels(self.labelnames, key), value) for key, value in series]
+
+
+class Histogram(Metric):
+    """Observations counted in cumulative buckets, with their sum."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series['counts']) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(data['counts']), data['sum']) for key, data in self._series.items())
+        samples = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                samples.append(("_bucket", labels, cumulative))
+            samples.append(("_sum", _format_labels(self.labelnames, key), total))
+            samples.append(("_count", _format_labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class Registry:
+    """The metrics of a process, by name."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def clear(self):
+        """Reset every series, keeping the metrics registered."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def render(self):
+        """Return the registry in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'resumax_gemini_stage_seconds', "Time spent in each stage of a Gemini request.", ['stage']
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'resumax_gemini_request_seconds', "Duration of Gemini requests.", ['mode', 'outcome']
+)
+REQUESTS = REGISTRY.counter('resumax_gemini_requests_total', "Gemini requests by outcome.", ['mode', 'outcome'])
+TOKENS = REGISTRY.histogram(
+    'resumax_gemini_tokens', "Tokens per Gemini request, as reported by the SDK.", ['kind'], buckets=TOKEN_BUCKETS
+)
+RETRIES = REGISTRY.counter('resumax_gemini_retries_total', "Gemini calls retried after an error.")
+
+
+def observe_stage(name, seconds):
+    """Record time spent in a stage, for the current request too if one is tracked."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    for listener in list(_stage_listeners):
+        listener(name, seconds)
+    timings = _current_request.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def add_stage_listener(listener):
+    """Call ``listener(stage, seconds)`` for every stage observation."""
+    _stage_listeners.append(listener)
+
+
+def remove_stage_listener(listener):
+    _stage_listeners.remove(listener)
+
+
+@contextmanager
+def stage(name):
+    """Time the block as stage ``name``; it is recorded even if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def observe_tokens(input_tokens=None, output_tokens=None, thoughts_tokens=None):
+    """Record a request's token counts; counts that are None are skipped."""
+    for kind, count in (('input', input_tokens), ('output', output_tokens), ('thoughts', thoughts_tokens)):
+        if count is not None:
+            TOKENS.observe(count, kind=kind)
+
+
+@contextmanager
+def track_request(mode):
+    """
+    Collect the stage timings of one request and record its duration by
+    ``outcome`` (``ok``, ``cached``, ``error`` or ``cancelled``). Yields the request's
+    record: stage timings in seconds, plus anything the caller adds to it,
+    e.g. its ``outcome`` or token counts.
+    """
+    record = {}
+    token = _current_request.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except (GeneratorExit, asyncio.CancelledError):
+        # The client went away, e.g. in the middle of a stream
+        record['outcome'] = 'cancelled'
+        raise
+    except BaseException:
+        record['outcome'] = 'error'
+        raise
+    finally:
+        try:
+            _current_request.reset(token)
+        except ValueError:
+            # A stream closed from another context; that context had its own copy
+            pass
+        outcome = record.setdefault('outcome', 'ok')
+        record['total'] = time.perf_counter() - start
+        REQUEST_SECONDS.observe(record['total'], mode=mode, outcome=outcome)
+        REQUESTS.inc(mode=mode, outcome=outcome)
+        logger.info("gemini_request mode=%s %s", mode, format_record(record), extra={'request_metrics': record})
+
+
+def format_record(record):
+    """Render a request record as ``key=value`` pairs, with seconds in milliseconds."""
+    pairs = []
+    for key, value in sorted(record.items()):
+        if isinstance(value, float):
+            pairs.append(f"{key}_ms={value * 1000:.1f}")
+        else:
+            pairs.append(f"{key}={value}")
+    return " ".join(pairs)
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumax_algo", "0015_remove_attachedfile_filename_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RemoteFileUpload",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the file content",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "file_uri",
+                    models.CharField(help_text="Remote file URI", max_length=500),
+                ),
+                (
+                    "mime_type",
+                    models.CharField(
+                        default="", help_text="File type/MIME type", max_length=100
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(help_text="When the remote file expires"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
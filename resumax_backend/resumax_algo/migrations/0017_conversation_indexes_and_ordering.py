@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumax_algo", "0016_remotefileupload"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="attachedfile",
+            options={"ordering": ["created_at"]},
+        ),
+        migrations.AlterModelOptions(
+            name="conversation",
+            options={"ordering": ["created_at"]},
+        ),
+        migrations.AlterModelOptions(
+            name="conversationsthread",
+            options={"ordering": ["-updated_at"]},
+        ),
+        migrations.AddIndex(
+            model_name="attachedfile",
+            index=models.Index(
+                fields=["conversation", "created_at"], name="file_conv_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["thread", "created_at"], name="conv_thread_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversationsthread",
+            index=models.Index(
+                fields=["user", "updated_at"], name="thread_user_updated_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumax_algo", "0018_critiquejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="disciplines",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Disciplines the passage is written for; empty means all",
+            ),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="doc_types",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Document types the passage is written for; empty means all",
+            ),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="page",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Page of the source file", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="source",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Base knowledge file the passage was cut from",
+                max_length=255,
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumax_algo", "0019_document_passages"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="input_tokens",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Prompt tokens of the request, as counted by Gemini or estimated",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="output_tokens",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Response tokens, including thinking tokens",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumax_algo", "0020_conversation_tokens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversationsthread",
+            name="summarized_through",
+            field=models.PositiveBigIntegerField(
+                default=0,
+                help_text="Id of the last conversation included in the summary",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversationsthread",
+            name="summary",
+            field=models.TextField(
+                blank=True, default="", help_text="Running summary of the older turns"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumax_algo", "0021_thread_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachedfile",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="SHA-256 of the file content",
+                max_length=64,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attachedfile",
+            index=models.Index(fields=["stored_filename"], name="file_stored_name_idx"),
+        ),
+    ]
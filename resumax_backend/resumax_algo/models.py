@@ -1,44 +1,47 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_delete, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+import logging
 import os
+import pathlib
+
+from .extraction import sidecar_path
+
+logger = logging.getLogger(__name__)
 
 class Document(models.Model):
     '''
     Document model to store text content in the vector database for retrieval.
     
-    This model provides the structure for storing documents that will be embedded
-    in a vector database for RAG (Retrieval Augmented Generation) operations.
+    Documents are embedded into the local vector store (see `vector_store`)
+    when they are saved and removed from it when they are deleted, while
+    RESUMAX_VECTOR_STORE['ENABLED'] is set:
 
-    To use this model:
-    1. Create document instances:
         doc = Document.objects.create(
             title="Sample Document",
             content="Your document content here"
         )
 
-    2. Load into vector database:
-        from langchain.vectorstores import FAISS
-        from langchain.embeddings import OpenAIEmbeddings
-        
-        # Get all documents
-        documents = Document.objects.all()
-        
-        # Create text/metadata pairs
-        texts = [doc.get_vectordb_text() for doc in documents]
-        
-        # Initialize vector store
-        vectorstore = FAISS.from_texts(
-            texts,
-            OpenAIEmbeddings()
-        )
+        from resumax_algo import vector_store
+        results = vector_store.search("your query here", k=5)
 
-    3. Query the vector store:
-        results = vectorstore.similarity_search("your query here")
+    `python manage.py rebuild_vector_store` re-embeds every document, e.g.
+    after bulk imports, which skip the signals. Passages of the base knowledge
+    files are created by `python manage.py build_knowledge_base`, with their
+    `source` file, `page` and the document types and disciplines they cover.
     '''
     content = models.TextField(help_text="The main text content to be vectorized")
     title = models.CharField(max_length=200, blank=True)
+    source = models.CharField(max_length=255, blank=True, default="",
+                              help_text="Base knowledge file the passage was cut from")
+    page = models.PositiveIntegerField(null=True, blank=True, help_text="Page of the source file")
+    doc_types = models.JSONField(default=list, blank=True,
+                                 help_text="Document types the passage is written for; empty means all")
+    disciplines = models.JSONField(default=list, blank=True,
+                                   help_text="Disciplines the passage is written for; empty means all")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def get_vectordb_text(self):
@@ -51,12 +54,27 @@ class Document(models.Model):
 class ConversationsThread(models.Model):
     '''
     ChatThread model to store chat messages in the database for retrieval.
+
+    With RESUMAX_SUMMARY enabled, `summary` holds a running summary of the
+    thread's older turns, up to the conversation `summarized_through`; see
+    `resumax_algo.summarizer`.
     '''
     title = models.CharField(max_length=200, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    summary = models.TextField(blank=True, default="", help_text="Running summary of the older turns")
+    summarized_through = models.PositiveBigIntegerField(
+        default=0, help_text="Id of the last conversation included in the summary"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            # Thread list: a user's threads, most recently active first
+            models.Index(fields=['user', 'updated_at'], name='thread_user_updated_idx'),
+        ]
+
     def __str__(self):
         return self.title or f"ChatThread {self.id}"
 
@@ -68,11 +86,30 @@ class Conversation(models.Model):
     prompt = models.TextField(max_length=8000,help_text="The user's prompt",default="")
     response = models.TextField(max_length=20000,help_text="The bot's response",default="")
     internal_analysis = models.TextField(help_text="Internal analysis for the conversation",default="")
+    input_tokens = models.PositiveIntegerField(null=True, blank=True,
+                                               help_text="Prompt tokens of the request, as counted by Gemini or estimated")
+    output_tokens = models.PositiveIntegerField(null=True, blank=True,
+                                                help_text="Response tokens, including thinking tokens")
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # History rebuilds: a thread's latest turns
+            models.Index(fields=['thread', 'created_at'], name='conv_thread_created_idx'),
+        ]
+
     def __str__(self):
         return f"Conversation {self.id}"
 
 class AttachedFile(models.Model):
+    '''
+    A file attached to a conversation.
+
+    Stored files are content-addressed per user (`resumax_algo.file_store`),
+    so rows for repeated uploads share `stored_filename`; the file is deleted
+    with the last of them.
+    '''
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE)
     original_filename = models.CharField(max_length=255, help_text="Original file name", default="")
     stored_filename = models.CharField(max_length=255, help_text="Stored file name", default="")
@@ -81,10 +118,32 @@ class AttachedFile(models.Model):
     file_type = models.CharField(max_length=100, help_text="File type/MIME type", default="")
     processing_status = models.CharField(max_length=20, help_text="Processing status", default="pending")
     error_message = models.TextField(help_text="Error message if any", default="")
+    content_hash = models.CharField(max_length=64, blank=True, default="", help_text="SHA-256 of the file content")
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at'], name='file_conv_created_idx'),
+            # Reference counts of shared stored files
+            models.Index(fields=['stored_filename'], name='file_stored_name_idx'),
+        ]
     
     def __str__(self):
         return self.original_filename or f"file {self.id}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets `delete_file_on_change` see the stored file without a query
+        if 'stored_filename' in field_names:
+            instance._loaded_stored_filename = instance.stored_filename
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'stored_filename' in fields:
+            self._loaded_stored_filename = self.stored_filename
     
     def get_full_file_path(self):
         """Get the full filesystem path to the file"""
@@ -94,39 +153,173 @@ class AttachedFile(models.Model):
             return pathlib.Path(settings.MEDIA_ROOT) / self.stored_filename
         return None
 
+class RemoteFileUpload(models.Model):
+    '''
+    Registry of files already uploaded to the Gemini Files API, keyed by content hash.
+
+    Gemini keeps uploaded files for a limited time, so the record stores the remote
+    URI together with its expiry and is reused until it is about to expire.
+    '''
+    content_hash = models.CharField(max_length=64, unique=True, help_text="SHA-256 of the file content")
+    file_uri = models.CharField(max_length=500, help_text="Remote file URI")
+    mime_type = models.CharField(max_length=100, help_text="File type/MIME type", default="")
+    expires_at = models.DateTimeField(help_text="When the remote file expires")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} -> {self.file_uri}"
+
+class CritiqueJob(models.Model):
+    '''
+    A queued critique request, generated by a job worker instead of inside the HTTP request.
+
+    The row holds everything needed to run `generate_response` and save the
+    conversation, and is polled by the client for the result.
+    '''
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    thread = models.ForeignKey(ConversationsThread, on_delete=models.CASCADE)
+    prompt = models.TextField(max_length=8000, help_text="The user's prompt", default="")
+    file_data = models.JSONField(default=list, help_text="Stored files attached to the prompt")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    conversation = models.ForeignKey(Conversation, null=True, blank=True, on_delete=models.SET_NULL,
+                                     help_text="The saved conversation once the job succeeds")
+    error_message = models.TextField(help_text="Error message if any", default="")
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"CritiqueJob {self.id} ({self.status})"
+
 # Signal handlers for automatic file deletion
+def delete_extraction_sidecar(file_path):
+    """Delete the cached text extraction stored next to a file, if any."""
+    sidecar = sidecar_path(file_path)
+    try:
+        sidecar.unlink(missing_ok=True)
+    except Exception as e:
+        logger.error("Error deleting extraction %s: %s", sidecar, e)
+
+def stored_file_in_use(stored_filename, exclude_pk=None):
+    """Whether an `AttachedFile` (other than `exclude_pk`) references the stored file."""
+    if not stored_filename:
+        return False
+    references = AttachedFile.objects.filter(stored_filename=stored_filename)
+    if exclude_pk is not None:
+        references = references.exclude(pk=exclude_pk)
+    return references.exists()
+
+@receiver(post_save, sender=Document)
+def index_document_on_save(sender, instance, **kwargs):
+    """
+    Embeds the saved `Document` into the vector store.
+    """
+    from .vector_store import get_vector_store, vector_store_enabled
+    if vector_store_enabled():
+        get_vector_store().upsert([instance])
+
+@receiver(post_delete, sender=Document)
+def unindex_document_on_delete(sender, instance, **kwargs):
+    """
+    Removes the deleted `Document` from the vector store.
+    """
+    from .vector_store import get_vector_store, vector_store_enabled
+    if vector_store_enabled():
+        get_vector_store().delete([instance.id])
+
+@receiver(post_save, sender=Conversation)
+def summarize_thread_on_save(sender, instance, created, **kwargs):
+    """
+    Updates the thread's running summary in the background once the new
+    conversation is committed.
+    """
+    from .summarizer import schedule_summary_update, summary_enabled
+    if created and summary_enabled():
+        transaction.on_commit(lambda: schedule_summary_update(instance.thread_id))
+
+@receiver(post_delete, sender=Conversation)
+def drop_thread_index_on_delete(sender, instance, **kwargs):
+    """
+    Drops the thread's retrieval index so deleted turns aren't retrieved again.
+    """
+    from .retrieval import forget_thread
+    forget_thread(instance.thread_id)
+
 @receiver(post_delete, sender=AttachedFile)
 def delete_file_on_model_delete(sender, instance, **kwargs):
     """
-    Deletes file from filesystem when corresponding `AttachedFile` object is deleted.
+    Deletes file from filesystem when the last `AttachedFile` object referencing it is deleted.
     """
+    if stored_file_in_use(instance.stored_filename):
+        return
     file_path = instance.get_full_file_path()
     if file_path and file_path.exists():
         try:
             file_path.unlink()
-            print(f"Successfully deleted file: {file_path}")
+            logger.info("Deleted file %s", file_path)
         except Exception as e:
-            print(f"Error deleting file {file_path}: {e}")
+            logger.error("Error deleting file %s: %s", file_path, e)
     elif file_path:
-        print(f"File not found for deletion: {file_path}")
+        logger.warning("File not found for deletion: %s", file_path)
+    if file_path:
+        delete_extraction_sidecar(file_path)
 
 @receiver(pre_save, sender=AttachedFile)
 def delete_file_on_change(sender, instance, **kwargs):
     """
     Deletes old file from filesystem when corresponding `AttachedFile` object is updated
     with new file.
+
+    The old file name is the one the row was loaded with, so saves don't
+    query the row again; it is only read from the database for rows that
+    weren't loaded with it (e.g. `only()` querysets).
     """
-    if not instance.pk:
+    new_stored_filename = instance.stored_filename
+    update_fields = kwargs.get('update_fields')
+    if not instance.pk or (update_fields is not None and 'stored_filename' not in update_fields):
         return False
 
     try:
-        old_instance = AttachedFile.objects.get(pk=instance.pk)
-        old_file_path = old_instance.get_full_file_path()
-        new_file_path = instance.get_full_file_path()
-        
-        if old_file_path != new_file_path and old_file_path and old_file_path.exists():
+        if hasattr(instance, '_loaded_stored_filename'):
+            old_stored_filename = instance._loaded_stored_filename
+        else:
+            old_stored_filename = AttachedFile.objects.values_list('stored_filename', flat=True).get(pk=instance.pk)
+        if old_stored_filename == new_stored_filename or not old_stored_filename:
+            return
+        old_file_path = pathlib.Path(settings.MEDIA_ROOT) / old_stored_filename
+
+        if old_file_path.exists() and not stored_file_in_use(old_stored_filename, exclude_pk=instance.pk):
             old_file_path.unlink()
+            delete_extraction_sidecar(old_file_path)
     except AttachedFile.DoesNotExist:
         pass
     except Exception as e:
-        print(f"Error deleting old file: {e}")
\ No newline at end of file
+        logger.error("Error deleting old file: %s", e)
+
+@receiver(post_save, sender=AttachedFile)
+def track_saved_stored_filename(sender, instance, update_fields=None, **kwargs):
+    """
+    Records the stored file the row now has, for `delete_file_on_change`,
+    once the save has gone through.
+    """
+    if update_fields is None or 'stored_filename' in update_fields:
+        instance._loaded_stored_filename = instance.stored_filename
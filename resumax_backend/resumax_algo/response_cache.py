@@ -0,0 +1,255 @@
+"""
+Cache of Gemini responses for repeated identical requests.
+
+Students often send the same resume with the same prompt again, after
+refreshing the page or retrying after a timeout. With
+``RESUMAX_RESPONSE_CACHE['ENABLED']`` such a request returns the earlier
+response instead of calling Gemini again. Requests are keyed by a hash of:
+
+- the prompt, with whitespace collapsed and case folded;
+- the SHA-256 of every attached file;
+- the ids of the thread's recent conversations, skipping the newest ones
+  that are earlier submissions of this same request, so a retry after the
+  first answer was saved still hits;
+- the model name, config and system prompt, and the user.
+
+The backend follows the shape of ``RESUMAX_CHAT_SESSION_STORE``:
+
+    RESUMAX_RESPONSE_CACHE = {
+        'ENABLED': True,
+        'BACKEND': 'resumax_algo.response_cache.CacheResponseCache',
+        'OPTIONS': {'cache_alias': 'default', 'ttl': 3600},
+    }
+
+``InMemoryResponseCache`` is a per-process LRU cache; ``CacheResponseCache``
+shares entries between workers through a Django cache, which bounds its size
+with its own ``MAX_ENTRIES``.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+import hashlib
+import json
+import pathlib
+import threading
+import time
+
+from .caching import LRUCache
+from .models import Conversation
+from .upload_registry import hash_file
+
+DEFAULT_RESPONSE_CACHE = {
+    'ENABLED': False,
+    'BACKEND': 'resumax_algo.response_cache.InMemoryResponseCache',
+    'OPTIONS': {},
+    # Recent conversations of the thread that are part of the key
+    'HISTORY_TURNS': 3,
+}
+
+# Newest repeats of the same request skipped when fingerprinting the history
+_MAX_REPEATS = 5
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache_settings():
+    """Return RESUMAX_RESPONSE_CACHE merged over the defaults."""
+    return {**DEFAULT_RESPONSE_CACHE, **getattr(settings, 'RESUMAX_RESPONSE_CACHE', {})}
+
+
+class ResponseCache:
+    """Interface for response cache backends, with hit and saved-latency counters."""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, entry):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return the cached response text for ``key``, or None."""
+        entry = self._get(key)
+        if entry is not None and time.time() - entry['created_at'] > self.ttl:
+            self.delete(key)
+            entry = None
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # What generating the response took the first time
+            self.saved_seconds += entry['latency']
+        return entry['text']
+
+    def put(self, key, text, latency):
+        """Cache a response that took ``latency`` seconds to generate."""
+        self._set(key, {'text': text, 'latency': latency, 'created_at': time.time()})
+
+    def stats(self):
+        """Return backend statistics for get_cache_stats()."""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'saved_seconds': round(self.saved_seconds, 2),
+            }
+
+
+class InMemoryResponseCache(ResponseCache):
+    """Process-local LRU cache of responses."""
+
+    def __init__(self, max_size=500, ttl=3600):
+        super().__init__(ttl)
+        self._entries = LRUCache(max_size=max_size, ttl=ttl)
+
+    def _get(self, key):
+        return self._entries.get(key)
+
+    def _set(self, key, entry):
+        self._entries.put(key, entry)
+
+    def delete(self, key):
+        self._entries.pop(key)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        cache_stats = self._entries.stats()
+        return {
+            **super().stats(),
+            'size': cache_stats['size'],
+            'max_size': cache_stats['max_size'],
+            'evictions': cache_stats['evictions'],
+        }
+
+
+class CacheResponseCache(ResponseCache):
+    """Responses in a Django cache shared by all workers."""
+
+    def __init__(self, cache_alias='default', ttl=3600, key_prefix='resumax:response'):
+        super().__init__(ttl)
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _cache_key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    def _get(self, key):
+        return self.cache.get(self._cache_key(key))
+
+    def _set(self, key, entry):
+        self.cache.set(self._cache_key(key), entry, timeout=self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(self._cache_key(key))
+
+    def clear(self):
+        # As with CacheChatSessionStore, this clears the whole alias
+        self.cache.clear()
+
+    def stats(self):
+        return {**super().stats(), 'cache_alias': self.cache_alias, 'ttl_seconds': self.ttl}
+
+
+def create_response_cache():
+    """Instantiate the cache configured by RESUMAX_RESPONSE_CACHE."""
+    config = get_response_cache_settings()
+    return import_string(config['BACKEND'])(**config['OPTIONS'])
+
+
+def get_response_cache():
+    """Return the process-wide response cache, or None when it is disabled."""
+    global _response_cache
+    if not get_response_cache_settings()['ENABLED']:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = create_response_cache()
+        return _response_cache
+
+
+def reset_response_cache():
+    """Drop the response cache so the next call re-reads the settings."""
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = None
+
+
+def get_stats():
+    """Return the response cache statistics, or None if it hasn't been used."""
+    with _response_cache_lock:
+        return _response_cache.stats() if _response_cache else None
+
+
+def normalize_prompt(prompt):
+    return ' '.join(prompt.split()).casefold()
+
+
+def _file_hashes(file_paths):
+    hashes = []
+    for path in file_paths:
+        try:
+            hashes.append(hash_file(path))
+        except OSError:
+            hashes.append(f"missing:{pathlib.Path(path).name}")
+    return hashes
+
+
+def _history_fingerprint(thread_id, prompt, file_hashes, turns):
+    """Ids of the thread's newest ``turns`` conversations that aren't repeats of this request."""
+    if not thread_id:
+        return []
+    conversations = (
+        Conversation.objects.filter(thread_id=thread_id).order_by('-id')
+        .prefetch_related('attachedfile_set')[:turns + _MAX_REPEATS]
+    )
+    ids = []
+    repeats = True
+    for conversation in conversations:
+        if repeats and normalize_prompt(conversation.prompt) == prompt and _file_hashes(
+            pathlib.Path(settings.MEDIA_ROOT) / file.stored_filename
+            for file in conversation.attachedfile_set.all()
+        ) == file_hashes:
+            continue
+        repeats = False
+        ids.append(conversation.id)
+        if len(ids) == turns:
+            break
+    return ids
+
+
+def request_key(prompt, file_paths=(), thread_id=None, user_id=None, analysis=None, model_config=None):
+    """Return the cache key of a request."""
+    prompt = normalize_prompt(prompt)
+    file_hashes = _file_hashes(file_paths)
+    fingerprint = {
+        'prompt': prompt,
+        'files': file_hashes,
+        'history': _history_fingerprint(thread_id, prompt, file_hashes, get_response_cache_settings()['HISTORY_TURNS']),
+        'analysis': analysis or '',
+        'model': model_config or {},
+        'user': user_id,
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()
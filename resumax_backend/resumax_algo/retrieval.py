@@ -0,0 +1,260 @@
+"""
+Local retrieval over a thread's earlier turns and attached documents.
+
+Instead of replaying the last 15 turns verbatim, a chat is rebuilt for every
+prompt from a short window of recent turns, and the earlier turns and file
+passages most similar to the prompt are attached as one text part. Text is
+embedded offline with a signed hashing embedder (no model download, no
+vocabulary to fit) and searched exactly with a matrix-vector product, which
+is fast enough for the few hundred chunks a thread holds.
+
+Each thread's index is built once and then extended with the conversations
+added since, and kept in an LRU cache of thread indexes.
+"""
+from django.conf import settings
+from collections import Counter
+import math
+import pathlib
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from . import extraction
+from .caching import LRUCache
+
+DEFAULT_RETRIEVAL = {
+    'ENABLED': False,
+    # Turns replayed verbatim before the new prompt
+    'RECENT_TURNS': 3,
+    # Earlier turn and file chunks attached to the prompt
+    'TOP_K': 6,
+    'MAX_CONTEXT_CHARS': 8000,
+    'CHUNK_CHARS': 1200,
+    'DIMENSIONS': 4096,
+    # Thread indexes kept in memory
+    'MAX_THREADS': 256,
+}
+
+# Chunks scoring below this are unrelated to the prompt
+MIN_SCORE = 0.05
+
+_TOKEN_RE = re.compile(r'[a-z0-9][a-z0-9+#]*')
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have he her his how i if in
+into is it its me my no not of on or our she so than that the their them then there these they this
+to too was we were what when where which who why will with would you your
+""".split())
+
+_indexes = None
+_indexes_lock = threading.Lock()
+
+
+def get_retrieval_settings():
+    """Return RESUMAX_RETRIEVAL merged over the defaults."""
+    return {**DEFAULT_RETRIEVAL, **getattr(settings, 'RESUMAX_RETRIEVAL', {})}
+
+
+def retrieval_enabled():
+    """Whether prompts are sent with retrieved context instead of the replayed history."""
+    return get_retrieval_settings()['ENABLED']
+
+
+def tokenize(text):
+    """Lower-cased word tokens without stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class HashingEmbedder:
+    """
+    Embed text as L2-normalized vectors with the signed hashing trick.
+
+    Words and word bigrams are hashed into ``dimensions`` buckets with a
+    random sign from the same hash, weighted by sublinear term frequency.
+    The vectors are stable across processes (CRC32, not ``hash()``), so they
+    can be stored.
+    """
+
+    def __init__(self, dimensions=4096):
+        self.dimensions = dimensions
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+    def embed(self, texts):
+        """Return a (len(texts) x dimensions) float32 matrix."""
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = zlib.crc32(feature.encode())
+                rows.append(row)
+                columns.append(digest % self.dimensions)
+                # The top bit picks the sign so colliding features tend to cancel out
+                values.append((1 + math.log(count)) * (1 if digest & 0x80000000 else -1))
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (rows, columns), values)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+def chunk_text(text, max_chars):
+    """
+    Split text into chunks of at most ``max_chars``, on paragraph and then
+    line boundaries; a single longer line is cut at a space.
+    """
+    chunks = []
+    current = ''
+    for block in re.split(r'\n\s*\n', text):
+        pieces = [block] if len(block) <= max_chars else block.split('\n')
+        for piece in pieces:
+            piece = piece.strip()
+            while len(piece) > max_chars:
+                cut = piece.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                head, piece = piece[:cut].strip(), piece[cut:].strip()
+                if current:
+                    chunks.append(current)
+                    current = ''
+                chunks.append(head)
+            if not piece:
+                continue
+            if current and len(current) + len(piece) + 2 > max_chars:
+                chunks.append(current)
+                current = ''
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ThreadIndex:
+    """
+    The embedded chunks of one thread, in conversation order.
+
+    ``chunks`` are dicts with the ``conversation_id``, a ``label`` saying
+    where the text came from and the ``text``; ``vectors`` holds their
+    embeddings row by row.
+    """
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.chunks = []
+        self.vectors = np.zeros((0, embedder.dimensions), dtype=np.float32)
+        self.conversation_ids = []
+        self.lock = threading.Lock()
+
+    @property
+    def last_conversation_id(self):
+        return self.conversation_ids[-1] if self.conversation_ids else 0
+
+    def add(self, conversation_ids, chunks):
+        """Append the chunks of newly indexed conversations."""
+        if chunks:
+            self.vectors = np.vstack([self.vectors, self.embedder.embed([chunk['text'] for chunk in chunks])])
+            self.chunks.extend(chunks)
+        self.conversation_ids.extend(conversation_ids)
+
+    def search(self, query, k, exclude_conversations=()):
+        """Return up to ``k`` ``(score, chunk)`` pairs, best first."""
+        if not self.chunks or k < 1:
+            return []
+        scores = self.vectors @ self.embedder.embed([query])[0]
+        if exclude_conversations:
+            excluded = np.isin([chunk['conversation_id'] for chunk in self.chunks], list(exclude_conversations))
+            scores[excluded] = -1
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.chunks[i]) for i in top if scores[i] >= MIN_SCORE]
+
+
+def _get_indexes():
+    global _indexes
+    with _indexes_lock:
+        if _indexes is None:
+            _indexes = LRUCache(max_size=get_retrieval_settings()['MAX_THREADS'])
+        return _indexes
+
+
+def forget_thread(thread_id):
+    """Drop a thread's index, e.g. after one of its conversations was deleted."""
+    if _indexes is not None:
+        _indexes.pop(thread_id)
+
+
+def reset_indexes():
+    """Drop every thread index so the next lookup re-reads the settings."""
+    global _indexes
+    with _indexes_lock:
+        _indexes = None
+
+
+def _conversation_chunks(conversation, max_chars):
+    """Chunks of one turn: the exchange itself and the text of its attached files."""
+    when = conversation.created_at.strftime('%Y-%m-%d')
+    chunks = [
+        {'conversation_id': conversation.id, 'label': f"earlier turn ({when})", 'text': text}
+        for text in chunk_text(f"User: {conversation.prompt}\n\nAssistant: {conversation.response}", max_chars)
+    ]
+    for file in conversation.attachedfile_set.all():
+        if not file.stored_filename:
+            continue
+        extracted = extraction.load_extraction(pathlib.Path(settings.MEDIA_ROOT) / file.stored_filename)
+        if not extracted:
+            continue
+        for number, page in enumerate(extracted['pages'], start=1):
+            label = f"{file.original_filename}, page {number}" if len(extracted['pages']) > 1 else file.original_filename
+            chunks.extend(
+                {'conversation_id': conversation.id, 'label': label, 'text': text}
+                for text in chunk_text(page, max_chars)
+            )
+    return chunks
+
+
+def get_thread_index(thread_id):
+    """Return the thread's index, updated with the conversations added since it was built."""
+    from .models import Conversation
+
+    config = get_retrieval_settings()
+    indexes = _get_indexes()
+    index = indexes.get(thread_id)
+    if index is None:
+        index = ThreadIndex(HashingEmbedder(config['DIMENSIONS']))
+        indexes.put(thread_id, index)
+    with index.lock:
+        new_conversations = list(
+            Conversation.objects.filter(thread_id=thread_id, id__gt=index.last_conversation_id)
+            .prefetch_related('attachedfile_set').order_by('id')
+        )
+        if new_conversations:
+            chunks = [
+                chunk for conversation in new_conversations
+                for chunk in _conversation_chunks(conversation, config['CHUNK_CHARS'])
+            ]
+            index.add([conversation.id for conversation in new_conversations], chunks)
+    return index
+
+
+def build_context(thread_id, query):
+    """
+    Return the text part attached to a prompt: the earlier turns and file
+    passages most similar to ``query``, skipping the recent turns that are
+    replayed verbatim. Empty when nothing relevant was found.
+    """
+    config = get_retrieval_settings()
+    index = get_thread_index(thread_id)
+    recent = index.conversation_ids[-config['RECENT_TURNS']:] if config['RECENT_TURNS'] else []
+    results = index.search(query, config['TOP_K'], exclude_conversations=recent)
+    if not results:
+        return ''
+    parts = ["[Relevant excerpts from earlier in this conversation, retrieved for this prompt:]"]
+    remaining = config['MAX_CONTEXT_CHARS']
+    for _, chunk in results:
+        passage = f"--- {chunk['label']} ---\n{chunk['text']}"
+        if len(passage) > remaining:
+            break
+        parts.append(passage)
+        remaining -= len(passage)
+    return '\n'.join(parts) if len(parts) > 1 else ''
@@ -0,0 +1,140 @@
+"""
+Pluggable storage for Gemini chat sessions.
+
+The backend is selected with the ``RESUMAX_CHAT_SESSION_STORE`` setting, which
+follows the shape of Django's ``CACHES`` setting:
+
+    RESUMAX_CHAT_SESSION_STORE = {
+        'BACKEND': 'resumax_algo.session_store.CacheChatSessionStore',
+        'OPTIONS': {'cache_alias': 'default', 'ttl': 3600},
+    }
+
+``InMemoryChatSessionStore`` keeps live chat objects in the current process.
+``CacheChatSessionStore`` keeps only the serialized chat history (text and
+remote file URIs) in a Django cache, so any worker sharing that cache (Redis,
+database, memcached) can rehydrate a chat without touching the conversation
+tables or re-uploading files.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .caching import LRUCache
+
+DEFAULT_CHAT_SESSION_STORE = {
+    'BACKEND': 'resumax_algo.session_store.InMemoryChatSessionStore',
+    'OPTIONS': {},
+}
+
+
+class ChatSessionStore:
+    """Interface for chat session backends, keyed by ``(user_id, thread_id)``."""
+
+    def get(self, key, create_chat):
+        """
+        Return the chat stored under ``key`` or None.
+
+        ``create_chat(history, cached_content)`` builds a chat from a serialized
+        history, for backends that don't keep live chat objects.
+        """
+        raise NotImplementedError
+
+    def put(self, key, chat):
+        """Store ``chat`` under ``key``; called again after every new message."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Forget the chat stored under ``key``."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Forget all chats."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Return backend statistics for get_cache_stats()."""
+        return {'backend': type(self).__name__}
+
+
+class InMemoryChatSessionStore(ChatSessionStore):
+    """Process-local store of live chat objects with O(1) LRU eviction and idle TTL."""
+
+    def __init__(self, max_size=1000, ttl=None):
+        self._sessions = LRUCache(max_size=max_size, ttl=ttl)
+
+    def get(self, key, create_chat):
+        return self._sessions.get(key)
+
+    def put(self, key, chat):
+        self._sessions.put(key, chat)
+
+    def delete(self, key):
+        self._sessions.pop(key)
+
+    def clear(self):
+        self._sessions.clear()
+
+    def stats(self):
+        cache_stats = self._sessions.stats()
+        return {
+            **super().stats(),
+            **cache_stats,
+            'active_chat_sessions': cache_stats['size'],
+            'oldest_session_age_seconds': round(self._sessions.oldest_age(), 2),
+        }
+
+
+class CacheChatSessionStore(ChatSessionStore):
+    """Store serialized chat histories in a Django cache shared by all workers."""
+
+    def __init__(self, cache_alias='default', ttl=3600, key_prefix='resumax:chat'):
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _cache_key(self, key):
+        user_id, thread_id = key
+        return f"{self.key_prefix}:{user_id}:{thread_id}"
+
+    def get(self, key, create_chat):
+        state = self.cache.get(self._cache_key(key))
+        if state is None:
+            return None
+        return create_chat(state['history'], state.get('cached_content'))
+
+    def put(self, key, chat):
+        self.cache.set(self._cache_key(key), serialize_chat(chat), timeout=self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(self._cache_key(key))
+
+    def clear(self):
+        # Most cache backends can't delete by prefix, so this clears the whole
+        # alias; point the store at a dedicated cache if that matters.
+        self.cache.clear()
+
+    def stats(self):
+        return {**super().stats(), 'cache_alias': self.cache_alias, 'ttl_seconds': self.ttl}
+
+
+def serialize_chat(chat):
+    """Return the minimal JSON-compatible state needed to rebuild a chat."""
+    return {
+        'history': [
+            content.model_dump(mode='json', exclude_none=True)
+            for content in chat.get_history(curated=True)
+        ],
+        # Set by gemini_model when the chat references a Gemini context cache
+        'cached_content': getattr(chat, 'cached_content', None),
+    }
+
+
+def create_chat_session_store():
+    """Instantiate the store configured by RESUMAX_CHAT_SESSION_STORE."""
+    config = getattr(settings, 'RESUMAX_CHAT_SESSION_STORE', DEFAULT_CHAT_SESSION_STORE)
+    backend = import_string(config.get('BACKEND', DEFAULT_CHAT_SESSION_STORE['BACKEND']))
+    return backend(**config.get('OPTIONS', {}))
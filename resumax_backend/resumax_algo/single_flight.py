@@ -0,0 +1,60 @@
+"""
+Single-flight deduplication of concurrent async work.
+
+When several coroutines ask for the same key at once, only the first one runs
+the work; the others await its result instead of repeating it.
+"""
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """Run at most one in-progress call per key and share its result."""
+
+    def __init__(self):
+        # Futures belong to one event loop, so calls are tracked per loop
+        self._calls = {}  # (loop, key) -> asyncio.Future
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    async def do(self, key, func):
+        """
+        Await ``func()`` for the first caller of ``key``; concurrent callers of
+        the same key get the same result (or exception) without calling it.
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        with self._lock:
+            future = self._calls.get(call_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._calls[call_key] = future
+            else:
+                self.shared += 1
+
+        if not leader:
+            # Shield so a cancelled follower doesn't cancel the shared call
+            return await asyncio.shield(future)
+
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[call_key]
+
+    def in_flight(self):
+        """Number of calls currently running."""
+        with self._lock:
+            return len(self._calls)
@@ -12,6 +12,22 @@ const sidePanelBackdrop = document.getElementById("side-panel-backdrop");
 const inputFilesPreviewContainer = document.getElementById("input-files-preview-container");
 const chatHistoryRangeContainer = document.getElementById("chat-history-range-container");
 const MAX_FILENAME_LENGTH = 10;
+// cursor for the previous page of the current thread (null when there is none)
+let olderConversationsCursor = null;
+let loadingOlderConversations = false;
+const THREADS_PAGE_SIZE = 50;
+// cursor for the next page of threads in the side panel (null when there is none)
+let threadsCursor = null;
+let loadingThreads = false;
+// side panel sections, threads go in the first one their last activity fits
+const THREAD_DATE_RANGES = [
+  { days: 1, title: "Today"},
+  { days: 2, title: "Yesterday"},
+  { days: 7, title: "This week"},
+  { days: 30, title: "This month"},
+  { days: 365, title: "This year"},
+  { days: 730, title: "Older"},
+];
 const CSRFTOKEN = getCookie('csrftoken') || document.querySelector('meta[name="csrf-token"]').getAttribute('content');
 
 // Simple formatting function (alternative to markdown-it)
@@ -53,6 +69,14 @@ closeSidePanelBtn.addEventListener("click", handleSideBarToggleEffect);
 sidePanelBackdrop.addEventListener("click", handleSideBarToggleEffect);
 textarea.addEventListener("input", resizeTextarea);
 createThreadBtn.addEventListener("click", createThread);
+chatBox.addEventListener("scroll", () => {
+  if (chatBox.scrollTop === 0) loadOlderConversations();
+});
+chatHistoryRangeContainer.addEventListener("scroll", () => {
+  // start loading a little before the bottom is reached
+  const remaining = chatHistoryRangeContainer.scrollHeight - chatHistoryRangeContainer.scrollTop - chatHistoryRangeContainer.clientHeight;
+  if (remaining < 100) loadMoreThreads();
+});
 
 // resize the textarea to fit the content
 function resizeTextarea() {
@@ -74,7 +98,8 @@ function sendPrompt(promptData) {
     },
     body:promptData,
     };
-  fetch("../api/threads/"+currentThreadId+"/", requestOptions)
+  // request a streamed response so the reply renders as it is generated
+  fetch("../api/threads/"+currentThreadId+"/?stream=1", requestOptions)
   .then((response) => {
     if (!response.ok) {
       return response.json().then(err => {
@@ -82,17 +107,26 @@ function sendPrompt(promptData) {
         throw new Error(`HTTP ${response.status}: ${JSON.stringify(err)}`);
       });
     }
-    return response.json();
-  })
-  .then((response) => {
-    /* if the current thread is 0, reload the threads
-    to get the newly created thread and set currentThreadId to the new it's id
-    */
-    if(currentThreadId == 0){
-      loadThreads();
-    }
-    // add the bot response to the chat box
-    addBotMessage(response.response);
+    const botMessageElement = addBotMessage("");
+    let botResponse = "";
+    return readEventStream(response, (event, data) => {
+      if (event === "error") {
+        botMessageElement.remove();
+        throw new Error(data.error);
+      }
+      if (event === "done") {
+        /* if the current thread is 0, reload the threads
+        to get the newly created thread and set currentThreadId to the new it's id
+        */
+        if(currentThreadId == 0){
+          loadThreads();
+        }
+        return;
+      }
+      // add the streamed text to the bot message
+      botResponse += data.text;
+      renderBotMessage(botMessageElement, botResponse);
+    });
   })
   .catch((error) => {
     console.error("Error fetching data:", error);
@@ -101,6 +135,31 @@ function sendPrompt(promptData) {
   });
 }
 
+// reads a server-sent event stream from a fetch response
+// calls onEvent(event, data) for every event as soon as it arrives
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    // events are separated by a blank line
+    const events = buffer.split("\n\n");
+    buffer = events.pop();
+    events.forEach((rawEvent) => {
+      let event = "message";
+      let data = "";
+      rawEvent.split("\n").forEach((line) => {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      });
+      if (data) onEvent(event, JSON.parse(data));
+    });
+  }
+}
+
 // handle the textarea formatting on enter key, shift+enter keys, or submitBtn press
 // if the textarea is not empty, send the prompt to the server on enter key press or submitBtn press
 function handleTextareaFormatting(event){
@@ -246,80 +305,91 @@ function handleOnFocusThread(threadId) {
     handleSideBarToggleEffect();
   }
 }
-// loads threads from the server api
+// loads the first page of threads from the server api
 // adds the threads to the side panel
 // set the first thread as the current thread
 function loadThreads(focusFirstThread=true) {
+  threadsCursor = null;
+  loadingThreads = true;
+  // fetch the threads from the server
+  fetch("../api/threads/?limit="+THREADS_PAGE_SIZE)
+    .then((response) => response.json())
+    .then((data) => {
+      // store the threads count in the session storage
+      sessionStorage.setItem("threadsCount", data.total);
+      chatHistoryRangeContainer.innerHTML = "";
+      addThreads(data.threads, focusFirstThread);
+      threadsCursor = data.next_cursor;
+    })
+    .then(() =>loadConversations())
+    .catch(error => console.error('Error fetching data:', error))
+    .finally(() => {loadingThreads = false;});
+}
 
-// fetch the threads from the server
-fetch("../api/threads")
-  .then((response) => response.json())
-  .then((data) => {
-    // add the chat history to the side panel
-    const dateRanges = [
-      { days: 1, title: "Today",threads:[]},
-      { days: 2, title: "Yesterday",threads:[]},
-      { days: 7, title: "This week",threads:[]},
-      { days: 30, title: "This month",threads:[]},
-      { days: 365, title: "This year",threads:[]},
-      { days: 730, title: "Older",threads:[]},
-    ]
-    // store the threads count in the session storage
-    sessionStorage.setItem("threadsCount", data.threads.length);
-    // categorize the threads based on when they were created
-    const today = new Date();
-    const boundaries = dateRanges.map(range => today - range.days * 86400000);
-    dateRanges.forEach((dateRange, index) => {
-      const upperBound = boundaries[index];
-      const lowerBound = boundaries[index - 1] || 0;
-      dateRange.threads = data.threads.filter(thread => {
-        const threadTime = new Date(thread.created_at).getTime();
-        return threadTime >= upperBound && (index === 0 || threadTime < lowerBound);
-      });
-    });
-    // add the threads to the side panel
-    chatHistoryRangeContainer.innerHTML = "";
-    dateRanges.forEach((dateRange) => {
-      if (dateRange.threads.length > 0) {
-        const dateRangeElement = document.createElement("div");
-        const dateRangeTitle = document.createElement("h3");
-        dateRangeElement.classList.add("history-range");
-        dateRangeTitle.classList.add("history-range-title");
-        dateRangeTitle.textContent = dateRange.title;
-        dateRangeElement.appendChild(dateRangeTitle);
-        chatHistoryRangeContainer.appendChild(dateRangeElement);
-        dateRange.threads.forEach((thread) => {
-          const chatTitleElement = document.createElement("p");
-          const deleteThreadBtn = document.createElement("span");
-          const icon = document.createElement('i');
-          chatTitleElement.classList.add("thread-title");
-          chatTitleElement.setAttribute("id", `thread-${thread.id}`);
-          chatTitleElement.textContent = thread.title;
-          chatTitleElement.addEventListener("click", ()=>{loadConversations(thread.id)});
-          deleteThreadBtn.addEventListener("click", ()=>{deleteThread(thread.id)});
-          icon.classList.add("bi","bi-trash3-fill");
-          deleteThreadBtn.appendChild(icon);
-          chatTitleElement.innerHTML = thread.title; // Added thread title
-          chatTitleElement.onmouseover = () =>{
-            deleteThreadBtn.style.display = "flex";
-          }
-          chatTitleElement.onmouseout = () =>{
-            deleteThreadBtn.style.display = "none";
-          }
-          chatTitleElement.appendChild(deleteThreadBtn);
-          dateRangeElement.appendChild(chatTitleElement);
-          if (focusFirstThread) {
-            // set the first thread as the current thread
-            sessionStorage.setItem("currentThreadId",thread.id);
-            handleOnFocusThread(thread.id);
-            focusFirstThread = false;
-          }
-      });
+// loads the next page of threads when the side panel is scrolled to the bottom
+function loadMoreThreads() {
+  if (!threadsCursor || loadingThreads) return;
+  loadingThreads = true;
+  fetch("../api/threads/?limit="+THREADS_PAGE_SIZE+"&cursor="+threadsCursor)
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error("couldn't load more threads " + response.statusText);
       }
-    });
-  })
-  .then(() =>loadConversations())
-  .catch(error => console.error('Error fetching data:', error));
+      return response.json();
+    })
+    .then((data) => {
+      addThreads(data.threads, false);
+      threadsCursor = data.next_cursor;
+    })
+    .catch(error => console.error('Error fetching data:', error))
+    .finally(() => {loadingThreads = false;});
+}
+
+// adds threads to the side panel under the date range of their last activity
+// threads arrive most recently active first, so ranges are only ever appended
+function addThreads(threads, focusFirstThread) {
+  const today = new Date();
+  threads.forEach((thread) => {
+    const threadTime = new Date(thread.updated_at).getTime();
+    const dateRange = THREAD_DATE_RANGES.find(range => threadTime >= today - range.days * 86400000)
+      || THREAD_DATE_RANGES[THREAD_DATE_RANGES.length - 1];
+    let dateRangeElement = document.getElementById(`history-range-${dateRange.days}`);
+    if (!dateRangeElement) {
+      const dateRangeTitle = document.createElement("h3");
+      dateRangeElement = document.createElement("div");
+      dateRangeElement.classList.add("history-range");
+      dateRangeElement.setAttribute("id", `history-range-${dateRange.days}`);
+      dateRangeTitle.classList.add("history-range-title");
+      dateRangeTitle.textContent = dateRange.title;
+      dateRangeElement.appendChild(dateRangeTitle);
+      chatHistoryRangeContainer.appendChild(dateRangeElement);
+    }
+    const chatTitleElement = document.createElement("p");
+    const deleteThreadBtn = document.createElement("span");
+    const icon = document.createElement('i');
+    chatTitleElement.classList.add("thread-title");
+    chatTitleElement.setAttribute("id", `thread-${thread.id}`);
+    chatTitleElement.textContent = thread.title;
+    chatTitleElement.addEventListener("click", ()=>{loadConversations(thread.id)});
+    deleteThreadBtn.addEventListener("click", ()=>{deleteThread(thread.id)});
+    icon.classList.add("bi","bi-trash3-fill");
+    deleteThreadBtn.appendChild(icon);
+    chatTitleElement.innerHTML = thread.title; // Added thread title
+    chatTitleElement.onmouseover = () =>{
+      deleteThreadBtn.style.display = "flex";
+    }
+    chatTitleElement.onmouseout = () =>{
+      deleteThreadBtn.style.display = "none";
+    }
+    chatTitleElement.appendChild(deleteThreadBtn);
+    dateRangeElement.appendChild(chatTitleElement);
+    if (focusFirstThread) {
+      // set the first thread as the current thread
+      sessionStorage.setItem("currentThreadId",thread.id);
+      handleOnFocusThread(thread.id);
+      focusFirstThread = false;
+    }
+  });
 }
 // loads the conversation in the thread with certain ID from the server api
 // if no threadId is provided, it loads the currentThreadId(recently created thread)
@@ -331,13 +401,14 @@ function loadConversations(threadId) {
       threadId = sessionStorage.getItem("currentThreadId");
     }
   handleOnFocusThread(threadId)
+  olderConversationsCursor = null;
   // if the threadId is 0, don't load the conversations
   if (threadId == 0){
     chatBox.innerHTML = "";
     promptInputForm.classList.add("new-chat");
     return;
   }
-  //fetch the conversations from the server
+  //fetch the latest page of conversations from the server
   fetch("../api/threads/"+threadId+"/")
     .then((response) => {
       if (!response.ok) {
@@ -351,9 +422,44 @@ function loadConversations(threadId) {
         addUserMessage(message.prompt, message.attachedFiles);
         addBotMessage(message.response);
       });
+      olderConversationsCursor = response.next_before;
     }).catch(error => console.error('Error fetching data:', error));
 }
 
+// loads the previous page of the current thread when the chat box is scrolled to the top
+function loadOlderConversations() {
+  if (!olderConversationsCursor || loadingOlderConversations) return;
+  const threadId = sessionStorage.getItem("currentThreadId");
+  loadingOlderConversations = true;
+  fetch("../api/threads/"+threadId+"/?before="+olderConversationsCursor)
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error("couldn't load older messages " + response.statusText);
+      }
+      return response.json();
+    })
+    .then((response) => {
+      // the thread may have changed while the page was loading
+      if (threadId != sessionStorage.getItem("currentThreadId")) return;
+      const firstMessage = chatBox.firstChild;
+      const previousScrollHeight = chatBox.scrollHeight;
+      const previousCount = chatBox.childNodes.length;
+      response.conversations.forEach((message) => {
+        addUserMessage(message.prompt, message.attachedFiles);
+        addBotMessage(message.response);
+      });
+      // move the newly added messages above the ones already shown
+      Array.from(chatBox.childNodes).slice(previousCount).forEach((node) => {
+        chatBox.insertBefore(node, firstMessage);
+      });
+      // keep the currently visible message in place
+      chatBox.scrollTop = chatBox.scrollHeight - previousScrollHeight;
+      olderConversationsCursor = response.next_before;
+    })
+    .catch(error => console.error('Error fetching data:', error))
+    .finally(() => {loadingOlderConversations = false;});
+}
+
 // gets the cookie with the certain name
 function getCookie(name) {
   let cookieValue = null;
@@ -397,6 +503,13 @@ if(attachedFiles != null && attachedFiles.length > 0 && attachedFiles[0] != ''){
 function addBotMessage(message) {
   const messageElement = document.createElement("div");
   messageElement.classList.add("message", "bot-message");
+  renderBotMessage(messageElement, message);
+  chatBox.appendChild(messageElement);
+  chatBox.scrollTop = chatBox.scrollHeight;
+  return messageElement;
+}
+// render the (possibly partial) bot message as markdown
+function renderBotMessage(messageElement, message) {
   // Use simple formatting instead of markdown-it
   // messageElement.innerHTML = formatText(message);
   
@@ -411,7 +524,6 @@ function addBotMessage(message) {
   
   // Convert markdown to HTML and set as innerHTML
   messageElement.innerHTML = md.render(message);
-  chatBox.appendChild(messageElement);
   chatBox.scrollTop = chatBox.scrollHeight;
 }
 
@@ -0,0 +1,254 @@
+"""
+Rolling summaries of long conversation threads.
+
+Replaying a thread's turns verbatim makes every new prompt carry up to 15
+critiques of up to 20,000 characters. With ``RESUMAX_SUMMARY['ENABLED']``,
+each thread keeps a compact running summary of its older turns instead:
+after a conversation is saved, a background worker folds the turns that
+have dropped out of the newest RECENT_TURNS into ``ConversationsThread.summary``
+once BATCH_TURNS of them are waiting, and history rebuilds send the summary
+followed by the turns it doesn't cover yet. A stored chat is kept until its
+history grows past the token budget's HISTORY_TOKENS; only then is it dropped
+and rebuilt from the summary.
+
+The model writing the summaries is selected like the other backends:
+
+    RESUMAX_SUMMARY = {
+        'ENABLED': True,
+        'RECENT_TURNS': 3,
+        'BACKEND': 'resumax_algo.summarizer.GeminiSummarizer',
+        'OPTIONS': {'model': 'models/gemini-2.5-flash-lite', 'max_chars': 4000},
+    }
+
+``StubSummarizer`` needs no API key, for tests and offline development.
+"""
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import re
+import threading
+
+from . import token_budget
+from .models import Conversation, ConversationsThread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUMMARY = {
+    'ENABLED': False,
+    # Newest turns always replayed verbatim, never folded into the summary
+    'RECENT_TURNS': 3,
+    # Turns folded into the summary per model call; fewer wait for the next update
+    'BATCH_TURNS': 5,
+    'MAX_WORKERS': 2,
+    'BACKEND': 'resumax_algo.summarizer.GeminiSummarizer',
+    'OPTIONS': {},
+}
+
+SUMMARY_HEADER = "[Summary of the earlier conversation in this thread:]"
+SUMMARY_ACK = "Understood. I'll keep the earlier conversation in mind."
+
+
+def get_summary_settings():
+    """Return RESUMAX_SUMMARY merged over the defaults."""
+    return {**DEFAULT_SUMMARY, **getattr(settings, 'RESUMAX_SUMMARY', {})}
+
+
+def summary_enabled():
+    return get_summary_settings()['ENABLED']
+
+
+class Summarizer:
+    """Interface for summary backends."""
+
+    def __init__(self, max_chars=4000):
+        self.max_chars = max_chars
+
+    def summarize(self, summary, turns):
+        """
+        Return ``summary`` updated with ``turns``, a list of ``(prompt,
+        response)`` pairs, oldest first, in at most ``max_chars`` characters.
+        """
+        raise NotImplementedError
+
+
+class GeminiSummarizer(Summarizer):
+    """Summarizes with a (small) Gemini model."""
+
+    INSTRUCTION = (
+        "You maintain the running summary of a conversation between a student and a career advisor "
+        "about the student's resume, academic CV or cover letter. Rewrite the summary so it also covers "
+        "the new turns. Keep the document type and target discipline, the student's background and "
+        "goals, the feedback already given, which issues were fixed and which remain, and any preferences "
+        "the student stated. Leave out greetings and advice repeated from earlier. Answer with the summary "
+        "only, as plain text of at most {max_chars} characters."
+    )
+
+    def __init__(self, model='models/gemini-2.5-flash-lite', max_chars=4000, max_turn_chars=6000):
+        super().__init__(max_chars)
+        self.model = model
+        # Long critiques are cut before summarizing; their opening carries the verdict
+        self.max_turn_chars = max_turn_chars
+
+    def summarize(self, summary, turns):
+        from .gemini_model import _get_genai_client
+
+        lines = [f"Current summary:\n{summary or '(none yet)'}", "New turns:"]
+        for prompt, response in turns:
+            lines.append(f"Student: {prompt[:self.max_turn_chars]}")
+            lines.append(f"Advisor: {response[:self.max_turn_chars]}")
+        response = _get_genai_client().models.generate_content(
+            model=self.model,
+            contents='\n\n'.join(lines),
+            config={
+                'system_instruction': self.INSTRUCTION.format(max_chars=self.max_chars),
+                'temperature': 0.2,
+                # About four characters per token
+                'max_output_tokens': self.max_chars // 4 + 64,
+            },
+        )
+        return (response.text or summary).strip()[:self.max_chars]
+
+
+class StubSummarizer(Summarizer):
+    """
+    Extractive summaries without a model call: one line per turn with the
+    start of the prompt and the first sentence of the response, keeping the
+    newest lines when the summary is over ``max_chars``.
+    """
+
+    _SENTENCE_RE = re.compile(r'(.+?[.!?])(?:\s|$)', re.DOTALL)
+
+    def summarize(self, summary, turns):
+        lines = summary.splitlines() if summary else []
+        for prompt, response in turns:
+            match = self._SENTENCE_RE.match(response.strip())
+            first_sentence = match.group(1) if match else response.strip()
+            lines.append(f"- Asked: {' '.join(prompt.split())[:120]} Advised: {' '.join(first_sentence.split())[:200]}")
+        while lines and len('\n'.join(lines)) > self.max_chars:
+            lines.pop(0)
+        return '\n'.join(lines)
+
+
+def create_summarizer():
+    """Instantiate the summarizer configured by RESUMAX_SUMMARY."""
+    config = get_summary_settings()
+    return import_string(config['BACKEND'])(**config['OPTIONS'])
+
+
+def update_thread_summary(thread_id, summarizer=None):
+    """
+    Fold the thread's turns older than the newest RECENT_TURNS that the
+    summary doesn't cover yet into it, BATCH_TURNS at a time; a last batch
+    of fewer turns waits for more. Returns the number of turns folded.
+    """
+    config = get_summary_settings()
+    summarizer = summarizer or create_summarizer()
+    thread = ConversationsThread.objects.filter(id=thread_id).values('summary', 'summarized_through').first()
+    if thread is None:
+        return 0
+    summary, through = thread['summary'], thread['summarized_through']
+    conversations = Conversation.objects.filter(thread_id=thread_id)
+    if config['RECENT_TURNS']:
+        recent_ids = list(conversations.order_by('-id').values_list('id', flat=True)[:config['RECENT_TURNS']])
+        if len(recent_ids) < config['RECENT_TURNS']:
+            return 0
+        conversations = conversations.filter(id__lt=recent_ids[-1])
+    pending = list(conversations.filter(id__gt=through).order_by('id').values_list('id', 'prompt', 'response'))
+    pending = pending[:len(pending) - len(pending) % config['BATCH_TURNS']]
+    for start in range(0, len(pending), config['BATCH_TURNS']):
+        batch = pending[start:start + config['BATCH_TURNS']]
+        summary = summarizer.summarize(summary, [(prompt, response) for _, prompt, response in batch])
+        # Only advance from the state we read; a concurrent update of the same turns loses
+        updated = ConversationsThread.objects.filter(id=thread_id, summarized_through=through).update(
+            summary=summary, summarized_through=batch[-1][0]
+        )
+        if not updated:
+            return start
+        through = batch[-1][0]
+    if pending:
+        _drop_long_chat_session(thread_id)
+    return len(pending)
+
+
+def _drop_long_chat_session(thread_id):
+    """
+    Drop the thread's stored chat if its history is over HISTORY_TOKENS, so
+    the next prompt rebuilds it from the new summary. Shorter chats are kept:
+    rebuilding them would cost more than replaying their turns.
+    """
+    from .gemini_model import _create_chat, _get_session_key, get_chat_session_store
+
+    user_id = ConversationsThread.objects.filter(id=thread_id).values_list('user_id', flat=True).first()
+    if user_id is None:
+        return
+    store = get_chat_session_store()
+    key = _get_session_key(thread_id, user_id)
+    chat = store.get(key, _create_chat)
+    if chat is None:
+        return
+    budget = token_budget.get_token_budget_settings()
+    _, turns = token_budget.split_context(chat.get_history(curated=True))
+    if token_budget.content_tokens(turns, budget['FILE_TOKENS']) > budget['HISTORY_TOKENS']:
+        store.delete(key)
+
+
+def summary_messages(summary):
+    """The history messages that stand in for the summarized turns."""
+    return [
+        {'role': 'user', 'parts': [{'text': f"{SUMMARY_HEADER}\n{summary}"}]},
+        {'role': 'model', 'parts': [{'text': SUMMARY_ACK}]},
+    ]
+
+
+class SummaryScheduler:
+    """
+    Runs summary updates on a small thread pool, at most one per thread at a
+    time; a turn saved while its thread is being summarized reruns the
+    update once the current one finishes.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary')
+        self._lock = threading.Lock()
+        self._running = set()
+        self._rerun = set()
+
+    def schedule(self, thread_id):
+        """Queue an update of the thread's summary; returns its future, or None if one is running."""
+        with self._lock:
+            if thread_id in self._running:
+                self._rerun.add(thread_id)
+                return None
+            self._running.add(thread_id)
+        return self._executor.submit(self._run, thread_id)
+
+    def _run(self, thread_id):
+        try:
+            while True:
+                try:
+                    update_thread_summary(thread_id)
+                except Exception as e:
+                    logger.warning("Failed to update the summary of thread %s: %s", thread_id, e)
+                with self._lock:
+                    if thread_id not in self._rerun:
+                        self._running.discard(thread_id)
+                        return
+                    self._rerun.discard(thread_id)
+        finally:
+            # Worker threads are reused; don't leave their connection open
+            connection.close()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def schedule_summary_update(thread_id):
+    """Update the thread's summary in the background."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SummaryScheduler(get_summary_settings()['MAX_WORKERS'])
+    return _scheduler.schedule(thread_id)
@@ -0,0 +1,109 @@
+"""
+Bulk deletion of conversation threads.
+
+``thread.delete()`` collects every conversation and attached file of the
+thread, deletes them row by row and unlinks each file from a ``post_delete``
+signal, inside the request. ``delete_threads`` deletes any number of threads
+in a fixed number of queries instead: the rows are removed with one
+``DELETE ... WHERE ... IN (...)`` per table (no collection, no signals), and
+the stored files no other ``AttachedFile`` references are unlinked, with
+their extraction sidecars, in one background batch.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import pathlib
+
+from .models import AttachedFile, Conversation, ConversationsThread, CritiqueJob, delete_extraction_sidecar
+
+logger = logging.getLogger(__name__)
+
+_file_cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-cleanup')
+
+
+def _delete_in(model, field_name, values):
+    """
+    Delete the rows of ``model`` whose ``field_name`` is in ``values``, a list
+    or a ``values()`` queryset of another table, with a single DELETE.
+    Returns the number of rows deleted.
+    """
+    quote_name = connection.ops.quote_name
+    if isinstance(values, QuerySet):
+        in_sql, params = values.order_by().query.sql_with_params()
+    else:
+        in_sql, params = ', '.join(['%s'] * len(values)), list(values)
+    column = model._meta.get_field(field_name).column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote_name(model._meta.db_table)} WHERE {quote_name(column)} IN ({in_sql})", params
+        )
+        return cursor.rowcount
+
+
+def delete_threads(user_id, thread_ids):
+    """
+    Delete the user's threads among ``thread_ids`` with their conversations,
+    attached files and critique jobs, in at most eight queries however large
+    they are.
+
+    Returns the ids of the deleted threads and the future of the background
+    batch that unlinks their files (None when there are none).
+    """
+    from .retrieval import forget_thread
+
+    with transaction.atomic():
+        deleted_ids = list(
+            ConversationsThread.objects.filter(user_id=user_id, id__in=thread_ids).order_by('id')
+            .values_list('id', flat=True)
+        )
+        if not deleted_ids:
+            return [], None
+        conversations = Conversation.objects.filter(thread_id__in=deleted_ids).values('id')
+        files = AttachedFile.objects.filter(conversation_id__in=conversations)
+        stored_filenames = set(files.exclude(stored_filename='').values_list('stored_filename', flat=True))
+
+        # Jobs of other threads never point at these conversations, but the FK is SET_NULL
+        CritiqueJob.objects.filter(conversation_id__in=conversations).exclude(thread_id__in=deleted_ids).update(
+            conversation=None
+        )
+        # QuerySet.delete() would collect every row and send post_delete for each,
+        # which unlinks files one at a time and forgets the retrieval index once
+        # per conversation. The rows go in one DELETE per table instead, and
+        # what the signals do is done below for the whole batch: the stored
+        # files are counted against the remaining references, and each
+        # thread's retrieval index is forgotten once after the transaction.
+        _delete_in(CritiqueJob, 'thread', deleted_ids)
+        _delete_in(AttachedFile, 'conversation', conversations)
+        _delete_in(Conversation, 'thread', deleted_ids)
+        _delete_in(ConversationsThread, 'id', deleted_ids)
+
+        # Repeated uploads share stored files; keep those other conversations still use
+        orphaned = stored_filenames - set(
+            AttachedFile.objects.filter(stored_filename__in=stored_filenames)
+            .values_list('stored_filename', flat=True)
+        )
+
+    for thread_id in deleted_ids:
+        forget_thread(thread_id)
+    if not orphaned:
+        return deleted_ids, None
+    paths = [pathlib.Path(settings.MEDIA_ROOT) / stored_filename for stored_filename in orphaned]
+    return deleted_ids, _file_cleanup_executor.submit(unlink_files, paths)
+
+
+def unlink_files(paths):
+    """Delete stored files and their extraction sidecars; returns how many files were deleted."""
+    deleted = 0
+    for path in paths:
+        try:
+            path.unlink()
+            deleted += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error("Error deleting file %s: %s", path, e)
+        delete_extraction_sidecar(path)
+    logger.info("Deleted %d of %d stored files", deleted, len(paths))
+    return deleted
@@ -0,0 +1,151 @@
+"""
+Token accounting for Gemini requests.
+
+Before a prompt is sent, the tokens of the system prompt, the reference
+context, the chat history and the new message are estimated. With
+RESUMAX_TOKEN_BUDGET['ENABLED'], the oldest turns of the history are dropped
+until it fits HISTORY_TOKENS and the whole request fits MAX_INPUT_TOKENS, so
+every request has a known ceiling whatever the length of its thread.
+
+After the response, the counts Gemini reports in its usage metadata (or the
+estimates, when it reports none) are returned for storing on the
+``Conversation``.
+"""
+from django.conf import settings
+
+DEFAULT_TOKEN_BUDGET = {
+    'ENABLED': False,
+    'HISTORY_TOKENS': 8000,
+    'MAX_INPUT_TOKENS': 32000,
+    'MAX_OUTPUT_TOKENS': 2048,
+    # Turns read from the database before trimming to HISTORY_TOKENS
+    'MAX_HISTORY_TURNS': 50,
+    # Gemini counts 258 tokens per PDF page; assume two-page documents
+    'FILE_TOKENS': 516,
+}
+
+
+def get_token_budget_settings():
+    """Return RESUMAX_TOKEN_BUDGET merged over the defaults."""
+    return {**DEFAULT_TOKEN_BUDGET, **getattr(settings, 'RESUMAX_TOKEN_BUDGET', {})}
+
+
+def token_budget_enabled():
+    return get_token_budget_settings()['ENABLED']
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _field(obj, name):
+    """Read a field of a history entry, which is a dict or a google.genai type."""
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def part_tokens(part, file_tokens=DEFAULT_TOKEN_BUDGET['FILE_TOKENS']):
+    """Estimated tokens of one message part: its text, or FILE_TOKENS for a file."""
+    text = _field(part, 'text')
+    if isinstance(text, str):
+        return estimate_tokens(text)
+    if _field(part, 'file_data') or _field(part, 'inline_data'):
+        return file_tokens
+    return 0
+
+
+def content_tokens(contents, file_tokens=DEFAULT_TOKEN_BUDGET['FILE_TOKENS']):
+    """Estimated tokens of a list of messages (with ``parts``) or of bare parts."""
+    total = 0
+    for content in contents:
+        parts = _field(content, 'parts')
+        if isinstance(parts, list):
+            total += sum(part_tokens(part, file_tokens) for part in parts)
+        else:
+            total += part_tokens(content, file_tokens)
+    return total
+
+
+def split_context(history):
+    """
+    Split the pinned messages off the front of the history.
+
+    Without a context cache the reference documents are sent as the first,
+    model-role message of the history, and with summaries enabled the
+    thread's summary and its acknowledgement follow. They are context, not
+    turns, and are never trimmed: the summary is the only record of the
+    turns it covers.
+    """
+    from .summarizer import SUMMARY_HEADER
+
+    start = 1 if history and _field(history[0], 'role') == 'model' else 0
+    if len(history) >= start + 2 and _field(history[start], 'role') == 'user':
+        parts = _field(history[start], 'parts') or []
+        text = _field(parts[0], 'text') if parts else None
+        if isinstance(text, str) and text.startswith(SUMMARY_HEADER):
+            start += 2
+    return history[:start], history[start:]
+
+
+def trim_history(turns, budget, file_tokens=DEFAULT_TOKEN_BUDGET['FILE_TOKENS']):
+    """
+    Return the newest whole turns of ``turns`` that fit in ``budget`` tokens,
+    and their token count. A turn starts at a user message and runs up to
+    the next one.
+    """
+    start, used, pending = len(turns), 0, 0
+    for index in range(len(turns) - 1, -1, -1):
+        pending += content_tokens([turns[index]], file_tokens)
+        if _field(turns[index], 'role') == 'user':
+            if used + pending > budget:
+                break
+            used, pending, start = used + pending, 0, index
+    return turns[start:], used
+
+
+def fit_request(system_instruction, history, message_parts):
+    """
+    Estimate the tokens of a request and trim its history to the budget.
+
+    Returns the history to send and the estimate: the system, context,
+    history and message tokens, how many history messages were dropped and
+    ``estimated_input_tokens``. The history is only trimmed while the budget
+    is enabled.
+    """
+    config = get_token_budget_settings()
+    file_tokens = config['FILE_TOKENS']
+    context, turns = split_context(history)
+    usage = {
+        'system_tokens': estimate_tokens(system_instruction),
+        'context_tokens': content_tokens(context, file_tokens),
+        'message_tokens': content_tokens(message_parts, file_tokens),
+    }
+    if config['ENABLED']:
+        room = config['MAX_INPUT_TOKENS'] - sum(usage.values())
+        kept, usage['history_tokens'] = trim_history(turns, max(0, min(config['HISTORY_TOKENS'], room)), file_tokens)
+    else:
+        kept, usage['history_tokens'] = turns, content_tokens(turns, file_tokens)
+    usage['dropped_messages'] = len(turns) - len(kept)
+    usage['estimated_input_tokens'] = (
+        usage['system_tokens'] + usage['context_tokens'] + usage['history_tokens'] + usage['message_tokens']
+    )
+    return context + kept, usage
+
+
+def response_usage(response, estimate, response_text=''):
+    """
+    Return the ``input_tokens`` and ``output_tokens`` of a request: Gemini's
+    usage metadata when the response carries it, else the estimate and the
+    response text's estimated tokens. Thinking tokens count as output.
+    """
+    metadata = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(metadata, 'prompt_token_count', None)
+    output_tokens = getattr(metadata, 'candidates_token_count', None)
+    thoughts_tokens = getattr(metadata, 'thoughts_token_count', None)
+    return {
+        'input_tokens': prompt_tokens if isinstance(prompt_tokens, int) else estimate['estimated_input_tokens'],
+        'output_tokens': (
+            output_tokens + (thoughts_tokens if isinstance(thoughts_tokens, int) else 0)
+            if isinstance(output_tokens, int) else estimate_tokens(response_text)
+        ),
+    }
@@ -0,0 +1,103 @@
+"""
+Content-addressed registry of files uploaded to the Gemini Files API.
+
+Files are identified by the SHA-256 of their content, so the same resume or
+base knowledge document is only uploaded again once its remote copy expires.
+"""
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+from datetime import datetime, timedelta
+from functools import lru_cache
+import hashlib
+import pathlib
+import threading
+
+from .models import RemoteFileUpload
+
+# Gemini deletes uploaded files after 48 hours
+_DEFAULT_UPLOAD_TTL = timedelta(hours=48)
+# Stop reusing a URI slightly before it expires so in-flight requests don't break
+_EXPIRY_MARGIN = timedelta(minutes=30)
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1024)
+def _hash_file_cached(path, size, mtime_ns):
+    """Hash file content; keyed by stat info so unchanged files are hashed once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(file_path):
+    """Return the SHA-256 hex digest of a file's content."""
+    stat = pathlib.Path(file_path).stat()
+    return _hash_file_cached(str(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def _record_stat(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_or_upload(client, file_path, mime_type=None):
+    """
+    Return ``(file_uri, mime_type)`` for a local file, uploading it only when the
+    registry has no unexpired URI for its content.
+    """
+    file_path = pathlib.Path(file_path)
+    content_hash = hash_file(file_path)
+    now = timezone.now()
+
+    record = RemoteFileUpload.objects.filter(
+        content_hash=content_hash,
+        expires_at__gt=now + _EXPIRY_MARGIN,
+    ).first()
+    if record:
+        _record_stat('hits')
+        return record.file_uri, record.mime_type or mime_type
+
+    _record_stat('misses')
+    uploaded = client.files.upload(file=file_path)
+    ttl = getattr(settings, 'RESUMAX_UPLOAD_TTL', _DEFAULT_UPLOAD_TTL)
+    expires_at = getattr(uploaded, 'expiration_time', None)
+    if not isinstance(expires_at, datetime):
+        expires_at = now + ttl
+    remote_mime_type = getattr(uploaded, 'mime_type', None)
+    if not mime_type and isinstance(remote_mime_type, str):
+        mime_type = remote_mime_type
+
+    try:
+        RemoteFileUpload.objects.update_or_create(
+            content_hash=content_hash,
+            defaults={
+                'file_uri': uploaded.uri,
+                'mime_type': mime_type or '',
+                'expires_at': expires_at,
+            },
+        )
+    except IntegrityError:
+        # Another worker uploaded the same content meanwhile and registered it
+        # first; use its URI so every request shares one remote copy
+        record = RemoteFileUpload.objects.get(content_hash=content_hash)
+        return record.file_uri, record.mime_type or mime_type
+    return uploaded.uri, mime_type
+
+
+def get_stats():
+    """Return upload registry hit/miss counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    """Reset the hit/miss counters."""
+    with _stats_lock:
+        _stats['hits'] = 0
+        _stats['misses'] = 0
@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('', views.index, name='home'),
     path('conversations/', views.index, name='conversations'),  # Add missing conversations URL
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+Local on-disk vector store for ``Document`` rows.
+
+Each document is embedded with the retrieval module's hashing embedder and
+stored as one row of a float32 matrix memory-mapped from disk, next to an
+array of the document ids of each row:
+
+    <PATH>/meta.json                 dimensions, row count, capacity, generation
+                                     and the data directory in use
+    <PATH>/data-<n>/vectors.f32      rows x DIMENSIONS float32 (memmap, grown by doubling)
+    <PATH>/data-<n>/ids.npy          document id of each row; 0 marks a deleted row
+    <PATH>/lock                      held by the process changing the index
+
+Saving or deleting a ``Document`` upserts or tombstones its row through the
+model signals, ``python manage.py rebuild_vector_store`` re-embeds every
+document in batches and compacts the files, and ``search(query, k)`` returns
+the most similar documents by exact cosine similarity.
+
+Every change holds an exclusive ``flock`` on ``lock`` and reloads the index
+first, so processes don't overwrite each other's rows. A rebuild writes a new
+data directory and swaps it in by replacing ``meta.json``; searches never
+lock and reopen the files when the generation in ``meta.json`` changes.
+
+With ``RESUMAX_VECTOR_STORE['ENABLED']`` the passages relevant to a prompt
+are attached to it (see ``knowledge_base``) instead of uploading every
+base-knowledge PDF with each chat session.
+"""
+from django.conf import settings
+from contextlib import contextmanager
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+import numpy as np
+
+from .retrieval import HashingEmbedder
+
+DEFAULT_VECTOR_STORE = {
+    'ENABLED': False,
+    'PATH': None,  # defaults to BASE_DIR / 'vector_store'
+    'DIMENSIONS': 4096,
+    'TOP_K': 5,
+    'BATCH_SIZE': 256,
+}
+
+# Documents scoring below this are unrelated to the query
+MIN_SCORE = 0.05
+INITIAL_CAPACITY = 1024
+STORE_VERSION = 2
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store_settings():
+    """Return RESUMAX_VECTOR_STORE merged over the defaults."""
+    config = {**DEFAULT_VECTOR_STORE, **getattr(settings, 'RESUMAX_VECTOR_STORE', {})}
+    if not config['PATH']:
+        config['PATH'] = os.path.join(settings.BASE_DIR, 'vector_store')
+    return config
+
+
+def vector_store_enabled():
+    """Whether documents are indexed on save and searched for every prompt."""
+    return get_vector_store_settings()['ENABLED']
+
+
+class VectorStore:
+    """An exact cosine-similarity index of document ids, stored in ``path``."""
+
+    def __init__(self, path, dimensions=4096):
+        self.path = pathlib.Path(path)
+        self.embedder = HashingEmbedder(dimensions)
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._generation = None
+        self._data_dir = None
+        self._vectors = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._rows = {}
+        self.count = 0
+
+    @property
+    def _vectors_path(self):
+        return self._data_dir / 'vectors.f32'
+
+    @property
+    def _ids_path(self):
+        return self._data_dir / 'ids.npy'
+
+    @property
+    def _meta_path(self):
+        return self.path / 'meta.json'
+
+    @contextmanager
+    def _writing(self, load=True):
+        """
+        Hold the thread lock and the cross-process file lock while changing
+        the index, reloading it first so other processes' changes are kept.
+        """
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self.path / 'lock', 'a+b') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    if load:
+                        self._load()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reset(self, data_dir=None):
+        self._vectors, self._ids, self._rows, self.count = None, np.zeros(0, dtype=np.int64), {}, 0
+        self._data_dir = data_dir
+
+    def _load(self):
+        """(Re)open the files when another process or a rebuild changed them."""
+        # A rebuild may remove the data directory between reading meta.json and
+        # opening it; the meta.json read next names the new one
+        for _ in range(3):
+            meta = self._read_meta()
+            if meta is None:
+                self._generation = None
+                self._reset()
+                return
+            if meta.get('version') != STORE_VERSION or meta['dimensions'] != self.dimensions:
+                raise ValueError(f"Vector store at {self.path} has a different layout; run rebuild_vector_store")
+            if meta['generation'] == self._generation and self._vectors is not None:
+                return
+            data_dir = self.path / meta['data']
+            try:
+                vectors = np.memmap(data_dir / 'vectors.f32', dtype=np.float32, mode='r+',
+                                    shape=(meta['capacity'], self.dimensions))
+                ids = np.load(data_dir / 'ids.npy')
+            except FileNotFoundError:
+                continue
+            self._generation = meta['generation']
+            self._data_dir = data_dir
+            self._vectors, self._ids, self.count = vectors, ids, meta['count']
+            self._rows = {int(doc_id): row for row, doc_id in enumerate(self._ids[:self.count]) if doc_id}
+            return
+        raise RuntimeError(f"Vector store at {self.path} kept changing while it was opened")
+
+    def _read_meta(self):
+        try:
+            return json.loads(self._meta_path.read_text())
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, capacity):
+        """Persist the ids and row count under a new generation; readers reload when it changes."""
+        self._vectors.flush()
+        self._atomic_write(self._ids_path, lambda f: np.save(f, self._ids))
+        generation = (self._generation or 0) + 1
+        meta = {
+            'version': STORE_VERSION, 'dimensions': self.dimensions, 'count': self.count, 'capacity': capacity,
+            'generation': generation, 'data': self._data_dir.name,
+        }
+        self._atomic_write(self._meta_path, lambda f: f.write(json.dumps(meta).encode()))
+        self._generation = generation
+
+    def _atomic_write(self, path, write):
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def _allocate(self, capacity):
+        """Create or grow the vectors file to ``capacity`` rows, keeping the current rows."""
+        if self._data_dir is None:
+            self._data_dir = self.path / 'data-0'
+        self._data_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._vectors_path, 'ab') as f:
+            f.truncate(capacity * self.dimensions * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dimensions))
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self.count] = self._ids[:self.count]
+        self._ids = ids
+
+    def _add(self, documents):
+        """Embed ``documents`` into their rows, growing the files as needed; returns the capacity."""
+        vectors = self.embedder.embed([document.get_vectordb_text() for document in documents])
+        new_rows = sum(1 for document in documents if document.id not in self._rows)
+        capacity = len(self._ids)
+        if self._vectors is None or self.count + new_rows > capacity:
+            capacity = max(INITIAL_CAPACITY, capacity)
+            while self.count + new_rows > capacity:
+                capacity *= 2
+            self._allocate(capacity)
+        for document, vector in zip(documents, vectors):
+            row = self._rows.get(document.id)
+            if row is None:
+                row = self._rows[document.id] = self.count
+                self.count += 1
+            self._vectors[row] = vector
+            self._ids[row] = document.id
+        return capacity
+
+    def upsert(self, documents):
+        """Embed and store ``documents``, replacing the rows of documents already indexed."""
+        documents = list(documents)
+        if not documents:
+            return
+        with self._writing():
+            self._write_meta(self._add(documents))
+
+    def delete(self, document_ids):
+        """Tombstone the rows of ``document_ids``; a rebuild reclaims them."""
+        with self._writing():
+            rows = [self._rows.pop(doc_id) for doc_id in document_ids if doc_id in self._rows]
+            if not rows:
+                return
+            self._vectors[rows] = 0
+            self._ids[rows] = 0
+            self._write_meta(len(self._ids))
+
+    def rebuild(self, batches):
+        """
+        Replace the whole index with the documents of ``batches`` (an
+        iterable of document lists), e.g. to compact it or after changing
+        DIMENSIONS. Searches keep using the old files until the new ones are complete.
+        """
+        # The current files may have an older layout, so they are not loaded
+        with self._writing(load=False):
+            generation = (self._read_meta() or {}).get('generation', 0)
+            self._reset(pathlib.Path(tempfile.mkdtemp(dir=self.path, prefix='.rebuild-')))
+            try:
+                capacity = INITIAL_CAPACITY
+                self._allocate(capacity)
+                for batch in batches:
+                    if batch:
+                        capacity = self._add(list(batch))
+                self._vectors.flush()
+                data_dir = self.path / f'data-{generation + 1}'
+                shutil.rmtree(data_dir, ignore_errors=True)
+                os.replace(self._data_dir, data_dir)
+                self._data_dir = data_dir
+                self._generation = generation
+                self._write_meta(capacity)
+            except BaseException:
+                shutil.rmtree(self._data_dir, ignore_errors=True)
+                self._generation = None
+                self._reset()
+                raise
+            self._remove_stale_files()
+            return len(self._rows)
+
+    def _remove_stale_files(self):
+        """Delete old data directories, interrupted rebuilds and the files of the first layout."""
+        for path in self.path.iterdir():
+            if path.is_dir() and path != self._data_dir and path.name.startswith(('data-', '.rebuild-')):
+                shutil.rmtree(path, ignore_errors=True)
+        for name in ('vectors.f32', 'ids.npy'):
+            (self.path / name).unlink(missing_ok=True)
+
+    def search_ids(self, query, k):
+        """Return up to ``k`` ``(document_id, score)`` pairs, best first."""
+        with self._lock:
+            self._load()
+            if not self._rows or k < 1:
+                return []
+            ids = self._ids[:self.count]
+            scores = np.asarray(self._vectors[:self.count]) @ self.embedder.embed([query])[0]
+            scores[ids == 0] = -1
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] >= MIN_SCORE]
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._rows)
+
+
+def get_vector_store():
+    """Get or create the configured vector store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = get_vector_store_settings()
+            _store = VectorStore(config['PATH'], config['DIMENSIONS'])
+        return _store
+
+
+def reset_vector_store():
+    """Drop the current store so the next call re-reads the settings."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def search(query, k=None):
+    """
+    Return the ``k`` documents most similar to ``query``, best first, each
+    with its similarity as ``score``.
+    """
+    from .models import Document
+
+    if k is None:
+        k = get_vector_store_settings()['TOP_K']
+    results = get_vector_store().search_ids(query, k)
+    documents = Document.objects.in_bulk([doc_id for doc_id, _ in results])
+    found = []
+    for doc_id, score in results:
+        # Rows of documents deleted without the signal (bulk deletes) are skipped
+        if doc_id in documents:
+            documents[doc_id].score = score
+            found.append(documents[doc_id])
+    return found
+
+
+def rebuild_index(batch_size=None):
+    """Re-embed every Document in batches, replacing the index; returns the number indexed."""
+    from .models import Document
+
+    batch_size = batch_size or get_vector_store_settings()['BATCH_SIZE']
+
+    def batches():
+        batch = []
+        for document in Document.objects.order_by('id').iterator(chunk_size=batch_size):
+            batch.append(document)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    return get_vector_store().rebuild(batches())
@@ -1,8 +1,24 @@
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from . import metrics as request_metrics
 
 # Create your views here.
 @login_required
 def index(request):
     context = {'username': request.user.username}
-    return render(request, 'resumax_algo/index.html',context)
\ No newline at end of file
+    return render(request, 'resumax_algo/index.html',context)
+
+@require_GET
+def metrics(request):
+    """Request metrics in the Prometheus text format, for scrapers sending
+    `Authorization: Bearer <RESUMAX_METRICS_TOKEN>` or for staff users."""
+    token = getattr(settings, 'RESUMAX_METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '')
+    if not (token and constant_time_compare(authorization, f"Bearer {token}")) and not request.user.is_staff:
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(request_metrics.REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
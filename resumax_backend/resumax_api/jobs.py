@@ -0,0 +1,21 @@
+"""
+Critique job handler run by the job workers.
+"""
+from asgiref.sync import sync_to_async
+from resumax_algo.ats_analyzer import analyze_uploaded_files
+from resumax_algo.gemini_model import generate_response
+from .views import save_conversation
+
+
+async def run_critique_job(job):
+    """Generate the critique for a queued job and save it like a synchronous request would.
+    Returns the saved Conversation."""
+    file_urls = [file_data['file_url'] for file_data in job.file_data]
+    internal_analysis, analysis_summary = await sync_to_async(analyze_uploaded_files)(job.file_data, job.prompt)
+    usage = {}
+    response = await generate_response(job.prompt, file_urls, thread_id=job.thread_id, user_id=job.user_id,
+                                       analysis=analysis_summary, usage=usage)
+    conversation, _ = await sync_to_async(save_conversation)(
+        job.prompt, response, job.thread_id, job.file_data, internal_analysis, usage
+    )
+    return conversation
@@ -0,0 +1,34 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resumax_algo.knowledge_base import build_corpus, get_knowledge_base_settings, store_corpus
+
+
+class Command(BaseCommand):
+    help = "Chunk the base knowledge files into tagged passages and index them in the vector store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default=None,
+                            help="Folder of base knowledge files (default RESUMAX_KNOWLEDGE_BASE['DIRECTORY'])")
+        parser.add_argument("--chunk-chars", type=int, default=None,
+                            help="Maximum characters per passage (default RESUMAX_KNOWLEDGE_BASE['CHUNK_CHARS'])")
+
+    def handle(self, *args, **options):
+        config = get_knowledge_base_settings()
+        directory = options["directory"] or config['DIRECTORY']
+        start = time.perf_counter()
+        try:
+            passages = build_corpus(directory, options["chunk_chars"] or config['CHUNK_CHARS'])
+        except FileNotFoundError:
+            raise CommandError(f"Base knowledge directory not found: {directory}")
+        indexed = store_corpus(passages)
+
+        tags = Counter(tag for passage in passages for tag in passage['doc_types'] + passage['disciplines'])
+        self.stdout.write(
+            f"Stored {len(passages)} passages from {len({p['source'] for p in passages})} files "
+            f"({indexed} documents indexed) in {time.perf_counter() - start:.1f}s"
+        )
+        if tags:
+            self.stdout.write("Tags: " + ", ".join(f"{tag} {count}" for tag, count in tags.most_common()))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from resumax_algo.vector_store import get_vector_store, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-embed every Document into the vector store, replacing and compacting it"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Documents embedded per batch (default RESUMAX_VECTOR_STORE['BATCH_SIZE'])")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rebuild_index(options["batch_size"])
+        self.stdout.write(
+            f"Indexed {count} documents into {get_vector_store().path} in {time.perf_counter() - start:.1f}s"
+        )
@@ -0,0 +1,40 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from resumax_algo.job_queue import JobWorkerPool, get_job_queue
+from resumax_api.jobs import run_critique_job
+
+
+class Command(BaseCommand):
+    help = "Run critique job workers until interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8,
+                            help="Number of jobs to run at once")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds between polls while the queue is empty")
+        parser.add_argument("--drain", action="store_true",
+                            help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        pool = JobWorkerPool(
+            get_job_queue(),
+            run_critique_job,
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+        )
+        self.stdout.write(f"Running {options['concurrency']} job workers")
+        asyncio.run(self.run_pool(pool, options["drain"]))
+        self.stdout.write(
+            f"Stopped: {pool.stats['succeeded']} succeeded, {pool.stats['failed']} failed"
+        )
+
+    async def run_pool(self, pool, drain):
+        # Finish the jobs in progress on Ctrl+C or SIGTERM instead of abandoning them
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        await pool.run(stop_event, drain=drain)
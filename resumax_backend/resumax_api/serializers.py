@@ -9,9 +9,9 @@ class ConversationsThreadSerializer(serializers.ModelSerializer):
 class ConversationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Conversation
-        fields = ['prompt', 'response', 'thread']
+        fields = ['prompt', 'response', 'thread', 'internal_analysis', 'input_tokens', 'output_tokens']
 class AttachedFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = AttachedFile
-        fields = ['conversation', 'original_filename', 'stored_filename', 'file_path', 'file_size', 'file_type', 'processing_status', 'error_message']
+        fields = ['conversation', 'original_filename', 'stored_filename', 'file_path', 'file_size', 'file_type', 'processing_status', 'error_message', 'content_hash']
     
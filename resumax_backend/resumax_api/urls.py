@@ -2,7 +2,8 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('threads/', views.get_all_threads, name='thread-list'),
+    path('threads/', views.threads, name='thread-list'),
     path('threads/<int:thread_id>/', views.conversations, name='thread-detail'),
     path('threads/<int:thread_id>/delete/', views.delete_thread, name='thread-delete'),
+    path('jobs/<int:job_id>/', views.job_status, name='job-detail'),
 ]
\ No newline at end of file
@@ -1,171 +1,368 @@
 from django.contrib.auth.decorators import login_required
 from django.forms import ValidationError
-from rest_framework.parsers import MultiPartParser
-from resumax_algo.models import AttachedFile, ConversationsThread, Conversation
-from rest_framework.decorators import api_view,parser_classes
-from rest_framework.response import Response
-from resumax_algo.gemini_model import generate_response
+from django.views.decorators.http import require_http_methods
+from resumax_algo.models import AttachedFile, ConversationsThread, Conversation, CritiqueJob
+from resumax_algo.gemini_model import generate_response, generate_response_stream
+from resumax_algo.ats_analyzer import analyze_uploaded_files
+from resumax_algo.extraction import extract_uploaded_files
+from resumax_algo.file_store import file_url, ingest_upload
+from resumax_algo.job_queue import get_job_queue
+from resumax_algo import metrics
+from resumax_algo.thread_deletion import delete_threads
 from .serializers import AttachedFileSerializer, ConversationSerializer, ConversationsThreadSerializer
-from django.core.files.storage import FileSystemStorage
-import asyncio
-import uuid
-import os
+from django.db.models import Count, Max, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlsafe_base64_decode, urlsafe_base64_encode
+from asgiref.sync import sync_to_async
+from datetime import datetime
+import json
 import mimetypes
 
+# Page size for thread history and the thread list
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Threads deleted by one DELETE /api/threads/ request
+MAX_DELETE_IDS = 1000
+
 # Create your views here.
+# The API views are async so a single ASGI worker can keep many Gemini calls
+# in flight; ORM and filesystem work is pushed to threads with sync_to_async.
 @login_required
-@api_view(['GET', 'POST'])
-@parser_classes([MultiPartParser])
-def conversations(request, thread_id):
-    user = request.user
+@require_http_methods(['GET', 'POST'])
+async def conversations(request, thread_id):
+    user = await request.auser()
     if request.method == 'GET':
         try:
-            currentThread = ConversationsThread.objects.get(user=user, id=thread_id)
-        except ConversationsThread.DoesNotExist:
-            return Response({"error": "Thread not found"}, status=404)
-        context = {
-                "conversations": [
-                    {
-                        "prompt": conversation.prompt,
-                        "response": conversation.response,
-                        "attachedFiles": [ attachedFile.original_filename for attachedFile in AttachedFile.objects.filter(conversation=conversation.id)]
-                    }
-                    for conversation in Conversation.objects.filter(thread=currentThread)
-                ]
-            }
-        return Response(context)
+            before = int(request.GET["before"]) if request.GET.get("before") else None
+            limit = min(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({"error": "before and limit must be integers"}, status=400)
+        if limit < 1:
+            return JsonResponse({"error": "limit must be positive"}, status=400)
+        context = await get_thread_conversations(user, thread_id, before, limit)
+        if context is None:
+            return JsonResponse({"error": "Thread not found"}, status=404)
+        return JsonResponse(context)
     if request.method == 'POST':
         # Get and validate prompt text
-        promptText = request.data.get("prompt-text")
+        promptText = request.POST.get("prompt-text")
         if not promptText or not promptText.strip():
-            return Response({"error": "Prompt text is required and cannot be empty"}, status=400)
+            return JsonResponse({"error": "Prompt text is required and cannot be empty"}, status=400)
         
         # Create a new thread if the request thread_id is 0
         if thread_id == 0:       
             title = promptText[0:20]
-            thread = ConversationsThread.objects.create(title=title, user=user)
+            thread = await ConversationsThread.objects.acreate(title=title, user=user)
             thread_id = thread.id
-        # save conversation
         promptAttachedFiles = request.FILES.getlist("prompt-file")
-        # if no file is provided
-        if not promptAttachedFiles:
-            # Generate response using Gemini
-            try:
-                response = asyncio.run(generate_response(promptText, thread_id=thread_id, user_id=user.id))
-            except Exception as e:
-                return Response({"error": str(e)}, status=500)
-            # Save conversation to the database
-            promptData = {
-                "prompt": promptText,
-                "response": response,
-                 "thread": thread_id
-            }
-            promptSerializer = ConversationSerializer(data = promptData)
-            if promptSerializer.is_valid():
-                conversation = promptSerializer.save()
-            else:
-                return Response({"error": promptSerializer.errors}, status=400)
-            # Return response
-            return Response({"response": response})
-        # # if file is provided
         #upload file to user_uploads folder (configured in settings) with user-specific directories
-        uploaded_file_data = []  # Store both original and stored filenames
-        for promptAttachedFile in promptAttachedFiles:
-            validate_file(promptAttachedFile)
-            # Get file extension
-            file_extension = os.path.splitext(promptAttachedFile.name)[1]
-            # Generate unique filename while preserving extension
-            unique_filename = f"{uuid.uuid4().hex}{file_extension}"
-            
-            # Create user-specific directory structure within MEDIA_ROOT
-            user_dir = f"user_{user.id}"
-            user_upload_path = os.path.join(user_dir, unique_filename)
-            
-            # Use default FileSystemStorage (uses settings.MEDIA_ROOT and MEDIA_URL)
-            fs = FileSystemStorage()
-            stored_filename = fs.save(user_upload_path, promptAttachedFile)
-            file_url = fs.url(stored_filename)
-            
-            uploaded_file_data.append({
-                'original_filename': promptAttachedFile.name,
-                'stored_filename': stored_filename,
-                'file_url': file_url,
-                'file_size': promptAttachedFile.size,
-                'file_type': promptAttachedFile.content_type
-            })
-        # Generate response
         try:
-            # Generate response considering attached files
-            file_urls = [file_data['file_url'] for file_data in uploaded_file_data]
-            response = asyncio.run(generate_response(promptText, file_urls, thread_id=thread_id, user_id=user.id))
-            
-            # Truncate response if it's too long for the database
-            if len(response) > 20000:
-                response = response[:19950] + "... [Response truncated]"
-                
+            uploaded_file_data = await sync_to_async(store_uploaded_files)(user.id, promptAttachedFiles)
+        except ValidationError as e:
+            return JsonResponse({"error": e.messages}, status=400)
+        # Extract text and layout hints locally, so the model can get compact text instead of the file
+        await extract_uploaded_files(uploaded_file_data)
+        file_urls = [file_data['file_url'] for file_data in uploaded_file_data]
+        
+        # Queue the critique for a job worker and let the client poll for it
+        if request.GET.get("job") == "1":
+            return await enqueue_critique_job(user, thread_id, promptText, uploaded_file_data)
+        
+        # Run the PASS 1 checks locally; the model gets the summary, the report is stored
+        internal_analysis, analysis_summary = await sync_to_async(analyze_uploaded_files)(uploaded_file_data, promptText)
+        
+        # Stream the response as server-sent events when requested
+        if request.GET.get("stream") == "1":
+            return stream_conversation(promptText, file_urls, thread_id, user.id, uploaded_file_data,
+                                       internal_analysis, analysis_summary)
+        
+        # Generate response considering attached files
+        usage = {}
+        try:
+            response = await generate_response(promptText, file_urls, thread_id=thread_id, user_id=user.id,
+                                               analysis=analysis_summary, usage=usage)
         except Exception as e:
-            return Response({"error": str(e)}, status=500)
-        # Save conversation to the database
-        promptData = {
-                "prompt": promptText,
-                "response": response,
-                 "thread": thread_id
-            }
-        promptSerializer = ConversationSerializer(data = promptData)
-        if promptSerializer.is_valid():
-            conversation = promptSerializer.save()
-            # save files to the database
-            original_filenames = []
-            for file_data in uploaded_file_data:
-                fileData = {
-                    "conversation": conversation.id, 
-                    "original_filename": file_data['original_filename'],
-                    "stored_filename": file_data['stored_filename'],
-                    "file_path": file_data['file_url'],
-                    "file_size": file_data['file_size'],
-                    "file_type": detect_mime_type(file_data['original_filename'], None) or file_data['file_type'],
-                    "processing_status": "completed"
+            return JsonResponse({"error": str(e)}, status=500)
+        # Save conversation and files to the database
+        try:
+            _, original_filenames = await sync_to_async(save_conversation)(
+                promptText, response, thread_id, uploaded_file_data, internal_analysis, usage
+            )
+        except ValidationError as e:
+            return JsonResponse({"error": e.message_dict if hasattr(e, 'error_dict') else e.messages}, status=400)
+        if not uploaded_file_data:
+            return JsonResponse({"response": truncate_response(response)})
+        return JsonResponse({"response": truncate_response(response), "attachedFiles": original_filenames})
+
+@sync_to_async
+def get_thread_conversations(user, thread_id, before=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of a user's thread, newest page first and oldest message
+    first within the page, or None if the thread doesn't exist.
+
+    Pages are keyed by conversation id: pass the returned `next_before` as
+    `before` to get older messages. Always runs three queries (thread, page,
+    attached files) regardless of thread length."""
+    if not ConversationsThread.objects.filter(user=user, id=thread_id).exists():
+        return None
+    conversations = Conversation.objects.filter(thread_id=thread_id)
+    if before is not None:
+        conversations = conversations.filter(id__lt=before)
+    # Fetch one extra row to know whether an older page exists
+    page = list(conversations.order_by('-id').values('id', 'prompt', 'response')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit][::-1]
+    
+    # Attach file names with a single query for the whole page
+    attached_files = {conversation['id']: [] for conversation in page}
+    for conversation_id, original_filename in AttachedFile.objects.filter(
+        conversation_id__in=attached_files
+    ).order_by('id').values_list('conversation_id', 'original_filename'):
+        attached_files[conversation_id].append(original_filename)
+    
+    return {
+            "conversations": [
+                {
+                    "id": conversation['id'],
+                    "prompt": conversation['prompt'],
+                    "response": conversation['response'],
+                    "attachedFiles": attached_files[conversation['id']]
                 }
-                fileSerializer = AttachedFileSerializer(data=fileData)
-                if fileSerializer.is_valid():
-                    fileSerializer.save()
-                    original_filenames.append(file_data['original_filename'])
-                else:               
-                    return Response({"error": fileSerializer.errors}, status=400)
-            return Response({"response": response, "attachedFiles": original_filenames})
-        else:
-            return Response({"error": promptSerializer.errors}, status=400)
+                for conversation in page
+            ],
+            "has_more": has_more,
+            "next_before": page[0]['id'] if has_more else None,
+        }
+
+def store_uploaded_files(user_id, promptAttachedFiles):
+    """Validate and store uploaded files in the user's upload directory.
+    Files are stored by content hash, so a file the user uploaded before is
+    reused instead of stored again (see resumax_algo.file_store)."""
+    uploaded_file_data = []  # Store both original and stored filenames
+    for promptAttachedFile in promptAttachedFiles:
+        validate_file(promptAttachedFile)
+        stored_filename, content_hash, deduplicated = ingest_upload(promptAttachedFile, user_id)
+        
+        uploaded_file_data.append({
+            'original_filename': promptAttachedFile.name,
+            'stored_filename': stored_filename,
+            'file_url': file_url(stored_filename),
+            'file_size': promptAttachedFile.size,
+            'file_type': promptAttachedFile.content_type,
+            'content_hash': content_hash,
+            'deduplicated': deduplicated,
+        })
+    return uploaded_file_data
+
+def truncate_response(response):
+    """Truncate response if it's too long for the database"""
+    if len(response) > 20000:
+        return response[:19950] + "... [Response truncated]"
+    return response
+
+@metrics.stage('db_save')
+def save_conversation(promptText, response, thread_id, uploaded_file_data, internal_analysis="", usage=None):
+    """Save a conversation and its attached files, returning the conversation and
+    the original filenames. `usage` holds the request's token counts as filled by
+    generate_response. Raises ValidationError if the data is invalid."""
+    promptData = {
+            "prompt": promptText,
+            "response": truncate_response(response),
+             "thread": thread_id
+        }
+    if internal_analysis:
+        promptData["internal_analysis"] = internal_analysis
+    if usage:
+        promptData["input_tokens"] = usage.get("input_tokens")
+        promptData["output_tokens"] = usage.get("output_tokens")
+    promptSerializer = ConversationSerializer(data = promptData)
+    if not promptSerializer.is_valid():
+        raise ValidationError(promptSerializer.errors)
+    conversation = promptSerializer.save()
+    # Mark the thread as recently active for the thread list ordering
+    ConversationsThread.objects.filter(id=thread_id).update(updated_at=timezone.now())
+    # save files to the database
+    original_filenames = []
+    for file_data in uploaded_file_data:
+        fileData = {
+            "conversation": conversation.id, 
+            "original_filename": file_data['original_filename'],
+            "stored_filename": file_data['stored_filename'],
+            "file_path": file_data['file_url'],
+            "file_size": file_data['file_size'],
+            "file_type": detect_mime_type(file_data['original_filename'], None) or file_data['file_type'],
+            "processing_status": file_data.get('processing_status', "completed"),
+            "content_hash": file_data.get('content_hash', ""),
+        }
+        if file_data.get('error_message'):
+            fileData["error_message"] = file_data['error_message']
+        fileSerializer = AttachedFileSerializer(data=fileData)
+        if not fileSerializer.is_valid():
+            raise ValidationError(fileSerializer.errors)
+        fileSerializer.save()
+        original_filenames.append(file_data['original_filename'])
+    return conversation, original_filenames
+
+async def enqueue_critique_job(user, thread_id, promptText, uploaded_file_data):
+    """Store a critique job and return 202 with the URL to poll for its result"""
+    job = await CritiqueJob.objects.acreate(
+        user=user, thread_id=thread_id, prompt=promptText, file_data=uploaded_file_data
+    )
+    await sync_to_async(get_job_queue().enqueue)(job)
+    response = JsonResponse({"job_id": job.id, "thread_id": thread_id, "status": job.status}, status=202)
+    response["Location"] = reverse("job-detail", args=[job.id])
+    return response
+
+def sse_event(data, event=None):
+    """Format a server-sent event with a JSON payload"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+def stream_conversation(promptText, file_urls, thread_id, user_id, uploaded_file_data,
+                        internal_analysis="", analysis_summary=""):
+    """Stream the Gemini response as server-sent events and save the conversation
+    once the stream finishes.
+
+    Events: unnamed `data: {"text": ...}` chunks, then either `done` with the
+    thread id and attached files or `error` with a message."""
+    async def event_stream():
+        chunks = []
+        usage = {}
+        try:
+            async for chunk in generate_response_stream(promptText, file_urls, thread_id=thread_id, user_id=user_id,
+                                                        analysis=analysis_summary, usage=usage):
+                chunks.append(chunk)
+                yield sse_event({"text": chunk})
+        except Exception as e:
+            yield sse_event({"error": str(e)}, event="error")
+            return
+        try:
+            _, original_filenames = await sync_to_async(save_conversation)(
+                promptText, "".join(chunks), thread_id, uploaded_file_data, internal_analysis, usage
+            )
+        except ValidationError as e:
+            yield sse_event({"error": e.messages}, event="error")
+            return
+        yield sse_event({"thread_id": thread_id, "attachedFiles": original_filenames}, event="done")
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Disable proxy buffering so chunks reach the browser immediately
+    response["X-Accel-Buffering"] = "no"
+    return response
     
 
 @login_required
-@api_view(['GET'])
-def get_all_threads(request):
-    user = request.user
-    allThreads = ConversationsThread.objects.filter(user=user)
-    # Reverse the order of threads to start from the most recent
-    context = {
-        "threads": [
-            {
-                "id": thread.id,
-                "title": thread.title,
-                "created_at": thread.created_at,
-                "updated_at": thread.updated_at
-            }
-            for thread in allThreads
-        ].__reversed__()
+@require_http_methods(['GET', 'DELETE'])
+async def threads(request):
+    user = await request.auser()
+    if request.method == 'DELETE':
+        try:
+            thread_ids = json.loads(request.body)["ids"]
+            if not isinstance(thread_ids, list) or not all(type(thread_id) is int for thread_id in thread_ids):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({"error": 'Expected a JSON body like {"ids": [1, 2]}'}, status=400)
+        if len(thread_ids) > MAX_DELETE_IDS:
+            return JsonResponse({"error": f"At most {MAX_DELETE_IDS} threads can be deleted at once"}, status=400)
+        deleted, _ = await sync_to_async(delete_threads)(user.id, thread_ids)
+        return JsonResponse({
+            "deleted": deleted,
+            "not_found": sorted(set(thread_ids) - set(deleted)),
+            "count": len(deleted),
+        })
+
+    try:
+        cursor = decode_thread_cursor(request.GET["cursor"]) if request.GET.get("cursor") else None
+        limit = min(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor or limit"}, status=400)
+    if limit < 1:
+        return JsonResponse({"error": "limit must be positive"}, status=400)
+
+    # Any new, updated or deleted thread changes the count or the latest
+    # updated_at, so they identify the current state of the list
+    user_threads = ConversationsThread.objects.filter(user=user)
+    state = await user_threads.aaggregate(total=Count('id'), last_modified=Max('updated_at'))
+    last_modified = state["last_modified"]
+    etag = f'"{state["total"]}-{last_modified.timestamp() if last_modified else 0}"'
+    # HTTP dates have one-second precision
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    context = await get_thread_page(user, cursor, limit)
+    context["total"] = state["total"]
+    response = JsonResponse(context)
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Let the browser keep the list but revalidate it on every visit
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+@sync_to_async
+def get_thread_page(user, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of the user's threads, most recently active first.
+
+    Pages are keyed by (updated_at, id) so they stay stable while new threads
+    are created: pass the returned `next_cursor` as `cursor` to get the next
+    page. Reads only the listed columns through the (user, updated_at) index."""
+    threads = ConversationsThread.objects.filter(user=user)
+    if cursor is not None:
+        updated_at, thread_id = cursor
+        threads = threads.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=thread_id))
+    # Fetch one extra row to know whether another page exists
+    page = list(
+        threads.order_by('-updated_at', '-id').values('id', 'title', 'created_at', 'updated_at')[:limit + 1]
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+    return {
+        "threads": page,
+        "has_more": has_more,
+        "next_cursor": encode_thread_cursor(page[-1]) if has_more else None,
     }
-    return Response(context)
+
+def encode_thread_cursor(thread):
+    """Encode a thread's position in the thread list as an opaque cursor"""
+    return urlsafe_base64_encode(f"{thread['updated_at'].isoformat()}|{thread['id']}".encode())
+
+def decode_thread_cursor(cursor):
+    """Decode a cursor from encode_thread_cursor. Raises ValueError if it's malformed."""
+    try:
+        updated_at, thread_id = urlsafe_base64_decode(cursor).decode().split("|")
+    except (TypeError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return datetime.fromisoformat(updated_at), int(thread_id)
+
+@login_required
+@require_http_methods(['DELETE'])
+async def delete_thread(request, thread_id):
+    user = await request.auser()
+    deleted, _ = await sync_to_async(delete_threads)(user.id, [thread_id])
+    if not deleted:
+        return JsonResponse({"error": "Thread not found"}, status=404)
+    return JsonResponse({"message": "Thread deleted successfully"}, status=200)
 
 @login_required
-@api_view(['DELETE'])
-def delete_thread(request, thread_id):
-    user = request.user
+@require_http_methods(['GET'])
+async def job_status(request, job_id):
+    user = await request.auser()
     try:
-        thread = ConversationsThread.objects.get(user=user, id=thread_id)
-    except ConversationsThread.DoesNotExist:
-        return Response({"error": "Thread not found"}, status=404)
-    thread.delete()
-    return Response({"message": "Thread deleted successfully"}, status=200)
+        job = await CritiqueJob.objects.select_related('conversation').aget(user=user, id=job_id)
+    except CritiqueJob.DoesNotExist:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    context = {"job_id": job.id, "thread_id": job.thread_id, "status": job.status}
+    if job.status == CritiqueJob.SUCCEEDED and job.conversation:
+        context["response"] = job.conversation.response
+        context["attachedFiles"] = [file_data['original_filename'] for file_data in job.file_data]
+    elif job.status == CritiqueJob.FAILED:
+        context["error"] = job.error_message
+    return JsonResponse(context)
 
 def validate_file(file):  
     # Define allowed MIME types for different categories
@@ -224,5 +421,3 @@ def detect_mime_type(filename, uploaded_file=None):
     # Fallback to filename detection
     mime_type, _ = mimetypes.guess_type(filename)
     return mime_type or 'application/octet-stream'
-
-# TODO: add a functionality to vectorize all the messages in the same thread and send them with the prompt to the server
\ No newline at end of file
@@ -33,7 +33,6 @@ INSTALLED_APPS = [
     'resumax_auth',
     'resumax_api',
     'rest_framework',
-    #'vectordb',
 ]
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -61,6 +60,7 @@ TEMPLATES = [
     },
 ]
 WSGI_APPLICATION = 'resumax_backend.wsgi.application'
+ASGI_APPLICATION = 'resumax_backend.asgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 DATABASES = {
@@ -114,3 +114,133 @@ LOGIN_URL = 'login'
 MEDIA_URL = '/user_uploads/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'user_uploads')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+
+# Gemini chat sessions (per user, per thread). The in-memory store is local to
+# each worker process; CacheChatSessionStore keeps serialized histories in a
+# Django cache so every worker sharing that cache can rehydrate a chat.
+RESUMAX_CHAT_SESSION_STORE = {
+    'BACKEND': 'resumax_algo.session_store.InMemoryChatSessionStore',
+    'OPTIONS': {
+        'max_size': 1000,
+        'ttl': 60 * 60,
+    },
+}
+
+# Store the system prompt and base knowledge documents in a Gemini context cache
+# and reference it from new chats instead of resending them with every session.
+RESUMAX_CONTEXT_CACHE = {
+    'ENABLED': False,
+    'TTL_SECONDS': 60 * 60,
+    'REFRESH_MARGIN_SECONDS': 5 * 60,
+}
+
+# Critique jobs posted with ?job=1 are stored in this queue and run by
+# `python manage.py run_job_workers` instead of inside the web request.
+RESUMAX_JOB_QUEUE = {
+    'BACKEND': 'resumax_algo.job_queue.DatabaseJobQueue',
+    'OPTIONS': {
+        'stale_after': 10 * 60,
+        'max_attempts': 3,
+    },
+}
+
+# Attached PDFs and text files are extracted locally with PyMuPDF when stored.
+# With SEND_EXTRACTED_TEXT the compact text is sent to Gemini instead of
+# uploading the file itself.
+RESUMAX_EXTRACTION = {
+    'ENABLED': True,
+    'SEND_EXTRACTED_TEXT': False,
+    'MAX_WORKERS': 2,
+}
+
+# Rebuild each chat from the last few turns and attach the earlier turns and
+# file passages most relevant to the prompt, retrieved from a local per-thread
+# index, instead of replaying the last 15 turns verbatim.
+RESUMAX_RETRIEVAL = {
+    'ENABLED': False,
+    'RECENT_TURNS': 3,
+    'TOP_K': 6,
+    'MAX_CONTEXT_CHARS': 8000,
+}
+
+# Local vector store of Document rows (resumax_algo.vector_store). When enabled,
+# documents are embedded on save and the passages relevant to each prompt are
+# attached to it instead of uploading every base-knowledge PDF per session.
+RESUMAX_VECTOR_STORE = {
+    'ENABLED': False,
+    'PATH': os.path.join(BASE_DIR, 'vector_store'),
+    'TOP_K': 5,
+}
+
+# Base-knowledge passages built by `python manage.py build_knowledge_base`.
+# Each prompt gets the passages for its document type and discipline that fit
+# in TOKEN_BUDGET, chosen from the vector store's top CANDIDATES.
+RESUMAX_KNOWLEDGE_BASE = {
+    'DIRECTORY': os.path.join(BASE_DIR, 'base_knowledge'),
+    'CHUNK_CHARS': 1500,
+    'CANDIDATES': 40,
+    'TOKEN_BUDGET': 2000,
+}
+
+# Token accounting for Gemini requests (resumax_algo.token_budget). Token counts
+# are always recorded on Conversation; when enabled, chat history is trimmed to
+# the newest turns that fit HISTORY_TOKENS and the request to MAX_INPUT_TOKENS.
+RESUMAX_TOKEN_BUDGET = {
+    'ENABLED': False,
+    'HISTORY_TOKENS': 8000,
+    'MAX_INPUT_TOKENS': 32000,
+    'MAX_OUTPUT_TOKENS': 2048,
+}
+
+# Running summaries of long threads (resumax_algo.summarizer). When enabled,
+# turns older than the last RECENT_TURNS are folded into the thread's summary
+# in the background, and chats are rebuilt from the summary plus the newer turns.
+RESUMAX_SUMMARY = {
+    'ENABLED': False,
+    'RECENT_TURNS': 3,
+    'BACKEND': 'resumax_algo.summarizer.GeminiSummarizer',
+    'OPTIONS': {
+        'model': 'models/gemini-2.5-flash-lite',
+        'max_chars': 4000,
+    },
+}
+
+# Answer repeated identical requests (same prompt, files, recent history and
+# model config) from a cache instead of calling Gemini again. Use
+# resumax_algo.response_cache.CacheResponseCache to share it between workers.
+RESUMAX_RESPONSE_CACHE = {
+    'ENABLED': False,
+    'BACKEND': 'resumax_algo.response_cache.InMemoryResponseCache',
+    'OPTIONS': {
+        'max_size': 500,
+        'ttl': 60 * 60,
+    },
+}
+
+# Request metrics in the Prometheus text format are served at /metrics to staff
+# users and to scrapers sending `Authorization: Bearer <RESUMAX_METRICS_TOKEN>`.
+RESUMAX_METRICS_TOKEN = os.getenv('RESUMAX_METRICS_TOKEN')
+
+# Application logs, including one `gemini_request` line per Gemini request with
+# its stage timings and token counts (resumax_algo.metrics).
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'resumax_algo': {'handlers': ['console'], 'level': os.getenv('RESUMAX_LOG_LEVEL', 'INFO')},
+    },
+}
+
+# Gemini client class and its options. Set RESUMAX_GEMINI_CLIENT to
+# resumax_algo.fake_gemini.FakeClient to run the request path without network
+# access, e.g. for `python benchmarks/load_test.py` in CI.
+RESUMAX_GEMINI_CLIENT = {
+    'BACKEND': os.getenv('RESUMAX_GEMINI_CLIENT', 'google.genai.Client'),
+    'OPTIONS': {},
+}
@@ -0,0 +1,94 @@
+"""
+Tests for the async API views.
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+
+from resumax_algo.models import ConversationsThread, Conversation
+
+
+class TestAsyncAPIViews(TransactionTestCase):
+    """Test the API views through the async test client."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='asyncuser', email='async@example.com')
+        self.async_client.force_login(self.user)
+
+    async def test_get_thread_conversations(self):
+        """Test that GET returns the thread's conversations."""
+        thread = await ConversationsThread.objects.acreate(title="Thread", user=self.user)
+        await Conversation.objects.acreate(thread=thread, prompt="Hello", response="Hi there!")
+
+        response = await self.async_client.get(f'/api/threads/{thread.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["conversations"][0]["response"], "Hi there!")
+
+    async def test_get_unknown_thread_returns_404(self):
+        """Test that a missing thread returns 404."""
+        response = await self.async_client.get('/api/threads/99999/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_post_saves_conversation(self):
+        """Test that POST generates and saves a conversation in a new thread."""
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            return "Looks good"
+
+        with patch('resumax_api.views.generate_response', fake_generate):
+            response = await self.async_client.post('/api/threads/0/', {'prompt-text': 'Review my resume'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"response": "Looks good"})
+        self.assertEqual(await Conversation.objects.acount(), 1)
+
+    async def test_post_rejects_empty_prompt(self):
+        """Test that an empty prompt returns 400."""
+        response = await self.async_client.post('/api/threads/0/', {'prompt-text': '  '})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_concurrent_posts_overlap(self):
+        """Test that concurrent requests wait on Gemini concurrently, not one after another."""
+        latency = 0.2
+        request_count = 10
+
+        async def slow_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            await asyncio.sleep(latency)
+            return "Looks good"
+
+        threads = [
+            await ConversationsThread.objects.acreate(title=f"Thread {i}", user=self.user)
+            for i in range(request_count)
+        ]
+        with patch('resumax_api.views.generate_response', slow_generate):
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                self.async_client.post(f'/api/threads/{thread.id}/', {'prompt-text': 'Hello'})
+                for thread in threads
+            ))
+            elapsed = time.perf_counter() - start
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertLess(elapsed, latency * request_count / 2)
+
+    async def test_thread_list_and_delete(self):
+        """Test listing threads newest first and deleting one."""
+        older = await ConversationsThread.objects.acreate(title="Older", user=self.user)
+        newer = await ConversationsThread.objects.acreate(title="Newer", user=self.user)
+
+        response = await self.async_client.get('/api/threads/')
+        self.assertEqual([thread["id"] for thread in response.json()["threads"]], [newer.id, older.id])
+
+        response = await self.async_client.delete(f'/api/threads/{older.id}/delete/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(await ConversationsThread.objects.filter(id=older.id).aexists())
+
+    async def test_login_required(self):
+        """Test that anonymous requests are redirected to the login page."""
+        await self.async_client.alogout()
+        response = await self.async_client.get('/api/threads/')
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,185 @@
+"""
+Tests for the local PASS 1 ATS analyzer.
+"""
+
+import json
+import pathlib
+import tempfile
+import time
+from unittest.mock import patch
+
+import pymupdf
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from resumax_algo import ats_analyzer, extraction
+from resumax_algo.models import Conversation
+
+
+def make_pdf(path, sections, body_size=11, pages=1, table=False, image=False):
+    """Write a resume with a contact line and the given (heading, lines) sections."""
+    document = pymupdf.open()
+    page = document.new_page()
+    page.insert_text((72, 60), "Jane Doe", fontsize=18, fontname="hebo")
+    page.insert_text((72, 80), "jane@example.com | (555) 123-4567", fontsize=body_size)
+    y = 110
+    for heading, lines in sections:
+        page.insert_text((72, y), heading, fontsize=14, fontname="hebo")
+        y += 18
+        for line in lines:
+            page.insert_text((72, y), line, fontsize=body_size)
+            y += body_size + 4
+        y += 8
+    if table:
+        for row in range(2):
+            for col in range(2):
+                page.draw_rect(pymupdf.Rect(72 + col * 100, y + row * 20, 172 + col * 100, y + 20 + row * 20))
+                page.insert_text((77 + col * 100, y + 14 + row * 20), f"cell {row}{col}", fontsize=body_size)
+    if image:
+        pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 8, 8), False)
+        page.insert_image(pymupdf.Rect(400, 40, 440, 80), pixmap=pixmap)
+    for _ in range(pages - 1):
+        document.new_page().insert_text((72, 72), "More experience", fontsize=body_size)
+    document.save(path)
+    document.close()
+
+
+STANDARD_SECTIONS = [
+    ("Education", ["B.S. Computer Science, State University, 2024"]),
+    ("Experience", ["- Built a Python data pipeline processing 2M records daily",
+                    "- Reduced API latency by 40% with Redis caching"]),
+    ("Projects", ["- Resume parser using Django and PostgreSQL"]),
+    ("Skills", ["Python, Django, SQL, Docker, AWS"]),
+]
+
+
+class TestATSAnalyzer(TestCase):
+    """Test the PASS 1 checks and score."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def analyze(self, job_description='', **pdf_options):
+        path = pathlib.Path(self.tmp_dir.name) / "resume.pdf"
+        make_pdf(path, **{'sections': STANDARD_SECTIONS, **pdf_options})
+        extraction.extract_file(path, "application/pdf")
+        return ats_analyzer.analyze(extraction.load_extraction(path), "resume.pdf", job_description)
+
+    def checks(self, report):
+        return {check['id']: check for check in report['checks']}
+
+    def test_compliant_resume_scores_100(self):
+        """Test that a clean one-page resume passes every check."""
+        report = self.analyze()
+
+        self.assertEqual(report['score'], 100)
+        self.assertEqual(report['sections'], ['education', 'experience', 'projects', 'skills'])
+        self.assertTrue(all(check['passed'] for check in report['checks']))
+        self.assertNotIn('keywords', self.checks(report))
+
+    def test_structural_problems_are_flagged(self):
+        """Test that tables, images, extra pages and small fonts fail their checks."""
+        report = self.analyze(body_size=8, pages=3, table=True, image=True)
+        checks = self.checks(report)
+
+        for check_id in ('page_count', 'font_size', 'tables', 'graphics'):
+            self.assertFalse(checks[check_id]['passed'], check_id)
+        self.assertTrue(checks['sections']['passed'])
+        # 55 of 100 points lost
+        self.assertEqual(report['score'], 45)
+
+    def test_section_order_and_missing_sections(self):
+        """Test that skills listed before experience and a missing education section are flagged."""
+        sections = [STANDARD_SECTIONS[3], STANDARD_SECTIONS[1]]
+        checks = self.checks(self.analyze(sections=sections))
+
+        self.assertFalse(checks['section_order']['passed'])
+        self.assertEqual(checks['section_order']['detail'], "unusual order: skills > experience")
+        self.assertFalse(checks['sections']['passed'])
+        self.assertIn("missing education", checks['sections']['detail'])
+
+    def test_job_description_keyword_coverage(self):
+        """Test that a pasted job description is scored by keyword coverage."""
+        job_description = (
+            "We are hiring a backend engineer. You will build Python services with Django and PostgreSQL, "
+            "maintain Kubernetes deployments on AWS, write Terraform, tune Redis caching, and design Kafka "
+            "streaming pipelines. Python and Django experience required; Kubernetes, Terraform and Kafka "
+            "are a plus. Strong SQL and Docker skills needed for this backend role."
+        )
+        report = self.analyze(job_description=job_description)
+        keywords = report['keywords']
+
+        self.assertIn('kubernetes', keywords['missing_keywords'])
+        self.assertNotIn('python', keywords['missing_keywords'])
+        self.assertEqual(self.checks(report)['keywords']['max_points'], 15)
+        self.assertLess(report['score'], 100)
+
+    def test_analysis_is_fast(self):
+        """Test that a report is computed in milliseconds from the cached extraction."""
+        path = pathlib.Path(self.tmp_dir.name) / "resume.pdf"
+        make_pdf(path, STANDARD_SECTIONS)
+        extraction.extract_file(path, "application/pdf")
+        extracted = extraction.load_extraction(path)
+
+        start = time.perf_counter()
+        for _ in range(100):
+            ats_analyzer.analyze(extracted, "resume.pdf", "Python Django engineer " * 20)
+        self.assertLess((time.perf_counter() - start) / 100, 0.01)
+
+    def test_summary_lists_every_check(self):
+        """Test that the summary sent to the model has the score and one line per check."""
+        report = self.analyze(table=True)
+        summary = ats_analyzer.summarize(report)
+
+        self.assertIn(f"ATS compliance score {report['score']}/100", summary)
+        self.assertIn("- tables: FAIL (1 table(s)", summary)
+        self.assertEqual(summary.count("\n- "), len(report['checks']))
+
+
+class TestAnalysisOnUpload(TransactionTestCase):
+    """Test that the conversations view stores the report and sends its summary."""
+
+    def setUp(self):
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_dir.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='atsuser', email='ats@example.com')
+        self.client.force_login(self.user)
+
+    def test_report_is_stored_and_summary_sent(self):
+        """Test that internal_analysis holds the report and generate_response gets the summary."""
+        pdf_path = pathlib.Path(self.media_dir.name) / "source.pdf"
+        make_pdf(pdf_path, STANDARD_SECTIONS)
+        upload = SimpleUploadedFile("resume.pdf", pdf_path.read_bytes(), content_type="application/pdf")
+        received = {}
+
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            received['analysis'] = analysis
+            return "Nice resume"
+
+        with patch('resumax_api.views.generate_response', fake_generate):
+            response = self.client.post('/api/threads/0/', {'prompt-text': 'Review', 'prompt-file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        stored = json.loads(Conversation.objects.get().internal_analysis)
+        self.assertEqual(stored['ats_reports'][0]['file'], "resume.pdf")
+        self.assertEqual(stored['ats_reports'][0]['score'], 100)
+        self.assertIn("Local ATS pre-analysis of resume.pdf", received['analysis'])
+
+    def test_no_files_means_no_analysis(self):
+        """Test that prompts without files are unchanged."""
+        received = {}
+
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            received['analysis'] = analysis
+            return "Hi"
+
+        with patch('resumax_api.views.generate_response', fake_generate):
+            self.client.post('/api/threads/0/', {'prompt-text': 'Hello'})
+
+        self.assertEqual(received['analysis'], "")
+        self.assertEqual(Conversation.objects.get().internal_analysis, "")
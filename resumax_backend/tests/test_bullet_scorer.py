@@ -0,0 +1,129 @@
+"""
+Tests for the PASS 2 bullet scorer.
+"""
+
+import json
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from resumax_algo import bullet_scorer
+from resumax_algo.models import Conversation
+
+
+class TestBulletScorer(SimpleTestCase):
+    """Test splitting, per-bullet flags and the quantified share."""
+
+    def test_split_bullets_joins_wrapped_lines(self):
+        """Test that wrapped bullets are joined and headings and short fragments are dropped."""
+        extracted = {'pages': [
+            "Experience\n"
+            "- Built a Python data pipeline processing 2M records\n"
+            "daily for the analytics team\n"
+            "• Reduced API latency by 40% with\n"
+            "Redis caching\n"
+            "Skills\n"
+            "- Python\n"
+        ]}
+
+        self.assertEqual(bullet_scorer.split_bullets(extracted), [
+            "Built a Python data pipeline processing 2M records daily for the analytics team",
+            "Reduced API latency by 40% with Redis caching",
+        ])
+
+    def test_bullet_flags(self):
+        """Test that weak verbs, missing metrics and passive voice are flagged per bullet."""
+        report = bullet_scorer.score_bullets([
+            "Reduced API latency by 40% for 12,000 users",
+            "Helped with the customer onboarding flow",
+            "Assisted in campus outreach events",
+            "The billing system was redesigned by me in 3 months",
+            "Published reports weekly for leadership",
+        ])
+        bullets = report['bullets']
+
+        self.assertEqual(bullets[0]['flags'], [])
+        self.assertEqual(bullets[0]['metrics'], ['scale', 'impact'])
+        self.assertEqual(bullets[1]['flags'], ['no_metric', 'weak_verb'])
+        self.assertEqual(bullets[2]['flags'], ['no_metric', 'weak_verb'])
+        self.assertEqual(bullets[3]['flags'], ['no_action_verb', 'passive_voice'])
+        self.assertEqual(bullets[3]['metrics'], ['time'])
+        self.assertTrue(bullets[4]['quantified'])
+        self.assertEqual(bullets[4]['metrics'], ['frequency'])
+        self.assertEqual(report['weak_verb_count'], 2)
+
+    def test_years_are_not_metrics(self):
+        """Test that dates don't count as quantification."""
+        report = bullet_scorer.score_bullets(["Led the robotics club from 2021 to 2023"])
+        self.assertFalse(report['bullets'][0]['quantified'])
+
+    def test_quantified_share_threshold(self):
+        """Test that fewer than 70% quantified bullets is high priority."""
+        quantified = ["Cut costs by 23% across teams"] * 7
+        unquantified = ["Worked on the mobile app team"] * 3
+
+        report = bullet_scorer.score_bullets(quantified + unquantified)
+        self.assertEqual(report['quantified_pct'], 70)
+        self.assertFalse(report['high_priority'])
+
+        report = bullet_scorer.score_bullets(quantified[:6] + unquantified)
+        self.assertEqual(report['quantified_pct'], 67)
+        self.assertTrue(report['high_priority'])
+        self.assertIn("(below 70%: high priority)", bullet_scorer.summarize(report))
+
+    def test_corpus_matches_single_documents(self):
+        """Test that batch scoring a corpus gives each document's own counts, empty ones included."""
+        documents = [
+            ["Cut costs by 23% across teams", "Helped with weekly reporting", "Worked on the mobile app"],
+            [],
+            ["Served 5,000 customers a month", "Attended design reviews"],
+        ]
+
+        corpus = bullet_scorer.score_corpus(documents)
+
+        for index, document in enumerate(documents):
+            report = bullet_scorer.score_bullets(document)
+            self.assertEqual(corpus['bullet_count'][index], report['bullet_count'])
+            self.assertEqual(corpus['quantified_count'][index], report['quantified_count'])
+            self.assertEqual(corpus['weak_verb_count'][index], report['weak_verb_count'])
+            self.assertEqual(corpus['high_priority'][index], report['high_priority'])
+        self.assertEqual(bullet_scorer.summarize(bullet_scorer.score_bullets([])), "- bullets: none detected")
+
+
+class TestBulletsInAnalysis(TransactionTestCase):
+    """Test that bullet scores are stored with the ATS report and summarized for the model."""
+
+    def setUp(self):
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_dir.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='bulletuser', email='bullet@example.com')
+        self.client.force_login(self.user)
+
+    def test_internal_analysis_has_bullet_scores(self):
+        """Test that internal_analysis holds the bullet report and the prompt gets its summary."""
+        resume = (
+            "Experience\n"
+            "- Reduced API latency by 40% with Redis caching\n"
+            "- Helped with the customer onboarding flow\n"
+        )
+        upload = SimpleUploadedFile("resume.txt", resume.encode(), content_type="text/plain")
+        received = {}
+
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            received['analysis'] = analysis
+            return "Nice resume"
+
+        with patch('resumax_api.views.generate_response', fake_generate):
+            self.client.post('/api/threads/0/', {'prompt-text': 'Review', 'prompt-file': upload})
+
+        bullets = json.loads(Conversation.objects.get().internal_analysis)['ats_reports'][0]['bullets']
+        self.assertEqual(bullets['bullet_count'], 2)
+        self.assertEqual(bullets['quantified_pct'], 50)
+        self.assertEqual(bullets['bullets'][1]['flags'], ['no_metric', 'weak_verb'])
+        self.assertIn("weak-verb bullets: Helped with the customer onboarding flow", received['analysis'])
@@ -0,0 +1,119 @@
+"""
+Tests for the pluggable chat session stores.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from google import genai
+
+from resumax_algo import gemini_model
+from resumax_algo.session_store import (
+    CacheChatSessionStore,
+    InMemoryChatSessionStore,
+    create_chat_session_store,
+    serialize_chat,
+)
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'chat_sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chat-sessions',
+    },
+}
+
+
+def make_chat(history, cached_content=None):
+    """Create a real SDK chat object; creating a chat makes no network calls."""
+    client = genai.Client(api_key="test")
+    return client.chats.create(model='models/gemini-2.5-flash', history=history)
+
+
+class TestInMemoryChatSessionStore(TestCase):
+    """Test the process-local store."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used session is evicted when full."""
+        store = InMemoryChatSessionStore(max_size=2)
+        store.put((1, 1), "chat-1")
+        store.put((1, 2), "chat-2")
+        store.get((1, 1), make_chat)
+        store.put((1, 3), "chat-3")
+
+        self.assertEqual(store.get((1, 1), make_chat), "chat-1")
+        self.assertIsNone(store.get((1, 2), make_chat))
+        self.assertEqual(store.stats()['active_chat_sessions'], 2)
+
+    def test_expired_sessions_are_dropped(self):
+        """Test that sessions idle for longer than the TTL are not returned."""
+        store = InMemoryChatSessionStore(ttl=10)
+        with patch('resumax_algo.caching.time.time', return_value=1000):
+            store.put((1, 1), "chat-1")
+        with patch('resumax_algo.caching.time.time', return_value=1011):
+            self.assertIsNone(store.get((1, 1), make_chat))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestCacheChatSessionStore(TestCase):
+    """Test the serializable store backed by the Django cache."""
+
+    def setUp(self):
+        caches['chat_sessions'].clear()
+
+    def test_history_round_trips_through_cache(self):
+        """Test that a stored chat is rehydrated with the same history."""
+        store = CacheChatSessionStore(cache_alias='chat_sessions')
+        chat = make_chat([
+            {'role': 'user', 'parts': [
+                {'text': 'Review my resume'},
+                {'file_data': {'file_uri': 'https://files.example/1', 'mime_type': 'application/pdf'}},
+            ]},
+            {'role': 'model', 'parts': [{'text': 'Looks good'}]},
+        ])
+        store.put((1, 1), chat)
+
+        restored = store.get((1, 1), make_chat)
+
+        self.assertEqual(serialize_chat(restored), serialize_chat(chat))
+        parts = restored.get_history()[0].parts
+        self.assertEqual(parts[1].file_data.file_uri, 'https://files.example/1')
+
+    def test_missing_session_returns_none(self):
+        """Test that an unknown key is a miss."""
+        store = CacheChatSessionStore(cache_alias='chat_sessions')
+        self.assertIsNone(store.get((1, 99), make_chat))
+
+    @override_settings(RESUMAX_CHAT_SESSION_STORE={
+        'BACKEND': 'resumax_algo.session_store.CacheChatSessionStore',
+        'OPTIONS': {'cache_alias': 'chat_sessions', 'ttl': 60},
+    })
+    def test_store_is_built_from_settings(self):
+        """Test that the backend and options come from settings."""
+        store = create_chat_session_store()
+        self.assertIsInstance(store, CacheChatSessionStore)
+        self.assertEqual(store.ttl, 60)
+
+    @override_settings(RESUMAX_CHAT_SESSION_STORE={
+        'BACKEND': 'resumax_algo.session_store.CacheChatSessionStore',
+        'OPTIONS': {'cache_alias': 'chat_sessions'},
+    })
+    def test_rehydrated_session_skips_history_rebuild(self):
+        """Test that a worker with an empty process finds the chat in the cache."""
+        gemini_model.reset_chat_session_store()
+        self.addCleanup(gemini_model.reset_chat_session_store)
+
+        async def fake_history(thread_id, max_history=20):
+            return []
+
+        with patch.object(gemini_model, '_get_genai_client', return_value=genai.Client(api_key="test")), \
+                patch.object(gemini_model, 'upload_base_knowledge_files', return_value=[]), \
+                patch.object(gemini_model, '_get_conversation_history', side_effect=fake_history) as history:
+            asyncio.run(gemini_model._get_or_create_chat_session(thread_id=1, user_id=1))
+            # Simulate another worker process: no live chat objects, same cache
+            gemini_model.reset_chat_session_store()
+            asyncio.run(gemini_model._get_or_create_chat_session(thread_id=1, user_id=1))
+
+        self.assertEqual(history.call_count, 1)
@@ -0,0 +1,249 @@
+"""
+Tests for Gemini context caching of the system prompt and base knowledge.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from google.genai import errors
+
+from resumax_algo import gemini_model
+from resumax_algo.context_cache import ContextCacheManager
+
+
+class StubClient:
+    """Stub genai client with caches and chats APIs."""
+
+    def __init__(self, fail_create=False):
+        self.fail_create = fail_create
+        self.created = []
+        self.updated = []
+        self.chat_configs = []
+        self.remote_caches = {}
+        self.caches = SimpleNamespace(create=self._create_cache, get=self._get_cache, update=self._update_cache)
+        self.chats = SimpleNamespace(create=self._create_chat)
+
+    def _create_cache(self, model, config):
+        if self.fail_create:
+            raise Exception("caching not supported")
+        self.created.append(config)
+        name = f"cachedContents/{len(self.created)}"
+        self.remote_caches[name] = SimpleNamespace(
+            name=name, display_name=config.display_name, expire_time=timezone.now() + timedelta(hours=1),
+        )
+        return self.remote_caches[name]
+
+    def _get_cache(self, name):
+        if name not in self.remote_caches:
+            raise errors.ClientError(404, {'error': {'code': 404, 'message': "not found", 'status': 'NOT_FOUND'}})
+        return self.remote_caches[name]
+
+    def _update_cache(self, name, config):
+        self.updated.append((name, config))
+        self.remote_caches[name].expire_time = timezone.now() + timedelta(hours=1)
+        return self.remote_caches[name]
+
+    def _create_chat(self, model, config, history):
+        self.chat_configs.append((config, history))
+        return SimpleNamespace(get_history=lambda curated=False: [])
+
+
+class TestContextCacheManager(TestCase):
+    """Test cache creation, reuse and refresh."""
+
+    def get_name(self, manager, client, uris=("https://files.example/1",)):
+        return manager.get_cache_name(client, "models/test", "system prompt", [], list(uris))
+
+    def test_cache_is_created_once_and_reused(self):
+        """Test that the same context reuses the existing cache."""
+        manager = ContextCacheManager()
+        client = StubClient()
+
+        first = self.get_name(manager, client)
+        second = self.get_name(manager, client)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(client.created), 1)
+        self.assertEqual(manager.stats['reused'], 1)
+
+    def test_new_base_knowledge_creates_new_cache(self):
+        """Test that changed file URIs produce a new cache."""
+        manager = ContextCacheManager()
+        client = StubClient()
+
+        first = self.get_name(manager, client)
+        second = self.get_name(manager, client, uris=("https://files.example/2",))
+
+        self.assertNotEqual(first, second)
+
+    def test_cache_is_refreshed_inside_margin(self):
+        """Test that the TTL is extended before the cache expires."""
+        manager = ContextCacheManager(ttl_seconds=3600, refresh_margin_seconds=300)
+        client = StubClient()
+        name = self.get_name(manager, client)
+        manager._expires_at = timezone.now() + timedelta(seconds=60)
+
+        self.assertTrue(manager.ensure_fresh(client, name))
+
+        self.assertEqual(len(client.updated), 1)
+        self.assertGreater(manager._expires_at, timezone.now() + timedelta(minutes=30))
+
+    def test_expired_cache_is_not_fresh(self):
+        """Test that chats using an expired cache must be rebuilt."""
+        manager = ContextCacheManager()
+        client = StubClient()
+        name = self.get_name(manager, client)
+        manager._expires_at = timezone.now() - timedelta(seconds=1)
+        client.remote_caches[name].expire_time = manager._expires_at
+
+        self.assertFalse(manager.ensure_fresh(client, name))
+
+    def test_deleted_cache_is_not_fresh(self):
+        """Test that chats using a cache Gemini no longer has must be rebuilt."""
+        manager = ContextCacheManager()
+        client = StubClient()
+
+        self.assertFalse(manager.ensure_fresh(client, "cachedContents/unknown"))
+
+    def test_cache_created_elsewhere_is_adopted(self):
+        """Test that a cache created by another worker is looked up and reused for new sessions."""
+        client = StubClient()
+        name = self.get_name(ContextCacheManager(), client)
+        manager = ContextCacheManager()
+
+        self.assertTrue(manager.ensure_fresh(client, name))
+
+        self.assertEqual(self.get_name(manager, client), name)
+        self.assertEqual(len(client.created), 1)
+        self.assertEqual(manager.stats['adopted'], 1)
+
+    def test_lookup_failure_keeps_chat(self):
+        """Test that a failed lookup, unlike a missing cache, doesn't drop the chat."""
+        manager = ContextCacheManager()
+        client = StubClient()
+        client.caches.get = lambda name: (_ for _ in ()).throw(ConnectionError("network down"))
+
+        self.assertTrue(manager.ensure_fresh(client, "cachedContents/1"))
+        self.assertEqual(manager.stats['failures'], 1)
+
+    def test_failed_refresh_of_expired_cache_is_not_fresh(self):
+        """Test that a cache whose refresh failed after it expired can't be used."""
+        manager = ContextCacheManager()
+        client = StubClient()
+        name = self.get_name(manager, client)
+        manager._expires_at = timezone.now() - timedelta(seconds=1)
+        client.caches.update = lambda name, config: (_ for _ in ()).throw(ConnectionError("network down"))
+
+        self.assertFalse(manager._refresh_if_needed(client, name))
+        self.assertEqual(manager.stats['failures'], 1)
+
+    def test_gemini_calls_do_not_hold_the_lock(self):
+        """Test that concurrent builds make one create call, without blocking the state lock."""
+        manager = ContextCacheManager()
+        client = StubClient()
+        create = client.caches.create
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_create(model, config):
+            entered.set()
+            self.assertTrue(release.wait(timeout=5))
+            return create(model=model, config=config)
+
+        client.caches.create = slow_create
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(self.get_name, manager, client)
+            self.assertTrue(entered.wait(timeout=5))
+            second = executor.submit(self.get_name, manager, client)
+            self.assertFalse(manager._lock.locked())
+            self.assertEqual(manager.stats, {'created': 0, 'reused': 0, 'refreshed': 0, 'adopted': 0, 'failures': 0})
+            release.set()
+            names = {first.result(timeout=5), second.result(timeout=5)}
+
+        self.assertEqual(names, {"cachedContents/1"})
+        self.assertEqual(len(client.created), 1)
+
+    def test_creation_failure_returns_none(self):
+        """Test that failures fall back to sending the context inline."""
+        manager = ContextCacheManager()
+
+        self.assertIsNone(self.get_name(manager, StubClient(fail_create=True)))
+        self.assertEqual(manager.stats['failures'], 1)
+
+
+class TestChatSessionWithContextCache(TestCase):
+    """Test that session builds reference the cache or fall back."""
+
+    def setUp(self):
+        gemini_model.reset_chat_session_store()
+        gemini_model._context_cache_manager = None
+        self.addCleanup(gemini_model.reset_chat_session_store)
+        self.addCleanup(setattr, gemini_model, '_context_cache_manager', None)
+        self.history_loads = 0
+
+    def build_session(self, client):
+        async def fake_history(thread_id, max_history=20):
+            self.history_loads += 1
+            return []
+
+        with patch.object(gemini_model, '_get_genai_client', return_value=client), \
+                patch.object(gemini_model, 'upload_base_knowledge_files', return_value=["https://files.example/1"]), \
+                patch.object(gemini_model, '_get_conversation_history', side_effect=fake_history):
+            return asyncio.run(gemini_model._get_or_create_chat_session(thread_id=1, user_id=1))
+
+    @override_settings(RESUMAX_CONTEXT_CACHE={'ENABLED': True})
+    def test_chat_references_cached_content(self):
+        """Test that the chat config points at the cache and omits inline context."""
+        client = StubClient()
+
+        chat = self.build_session(client)
+
+        config, history = client.chat_configs[0]
+        self.assertEqual(config["cached_content"], "cachedContents/1")
+        self.assertNotIn("system_instruction", config)
+        self.assertEqual(history, [])
+        self.assertEqual(chat.cached_content, "cachedContents/1")
+
+    @override_settings(RESUMAX_CONTEXT_CACHE={'ENABLED': True})
+    def test_falls_back_when_caching_fails(self):
+        """Test that a caching failure keeps today's inline behaviour."""
+        client = StubClient(fail_create=True)
+
+        self.build_session(client)
+
+        config, history = client.chat_configs[0]
+        self.assertIn("system_instruction", config)
+        self.assertNotIn("cached_content", config)
+        self.assertEqual(history[0]['role'], 'model')
+
+    def test_disabled_by_default(self):
+        """Test that no cache is created unless enabled in settings."""
+        client = StubClient()
+
+        self.build_session(client)
+
+        self.assertEqual(client.created, [])
+
+    @override_settings(
+        RESUMAX_CONTEXT_CACHE={'ENABLED': True},
+        RESUMAX_CHAT_SESSION_STORE={'BACKEND': 'resumax_algo.session_store.CacheChatSessionStore'},
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sessions'}},
+    )
+    def test_workers_share_stored_chat_and_cache(self):
+        """Test that a worker with its own manager reuses a chat and cache stored by another."""
+        client = StubClient()
+        self.build_session(client)
+
+        # Another worker: same shared session store, a manager that never saw the cache
+        gemini_model._context_cache_manager = ContextCacheManager()
+        chat = self.build_session(client)
+
+        self.assertEqual(chat.cached_content, "cachedContents/1")
+        self.assertEqual(len(client.created), 1)
+        self.assertEqual(self.history_loads, 1)
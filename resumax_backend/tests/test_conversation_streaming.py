@@ -0,0 +1,106 @@
+"""
+Tests for streaming responses from the thread endpoint.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+
+from resumax_algo.models import ConversationsThread, Conversation
+from resumax_algo.gemini_model import generate_response_stream
+
+
+async def parse_events(streaming_content):
+    """Parse server-sent events into (event, data) tuples."""
+    body = b"".join([chunk async for chunk in streaming_content]).decode()
+    events = []
+    for raw_event in body.strip().split("\n\n"):
+        event = "message"
+        data = ""
+        for line in raw_event.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data += line[len("data: "):]
+        events.append((event, json.loads(data)))
+    return events
+
+
+class TestStreamingEndpoint(TransactionTestCase):
+    """Test the ?stream=1 mode of the thread endpoint."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='streamuser', email='stream@example.com')
+        self.async_client.force_login(self.user)
+
+    async def test_stream_yields_chunks_and_saves_conversation(self):
+        """Test that chunks are streamed and the conversation is saved at the end."""
+        async def fake_stream(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            for chunk in ["Great ", "resume!"]:
+                yield chunk
+
+        with patch('resumax_api.views.generate_response_stream', fake_stream):
+            response = await self.async_client.post('/api/threads/0/?stream=1', {'prompt-text': 'Review my resume'})
+            events = await parse_events(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        self.assertEqual(events[0], ("message", {"text": "Great "}))
+        self.assertEqual(events[1], ("message", {"text": "resume!"}))
+        self.assertEqual(events[-1][0], "done")
+        conversation = await Conversation.objects.aget()
+        self.assertEqual(conversation.response, "Great resume!")
+        self.assertEqual(events[-1][1]["thread_id"], conversation.thread_id)
+
+    async def test_stream_error_does_not_save_conversation(self):
+        """Test that a failed generation emits an error event and saves nothing."""
+        async def failing_stream(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            yield "partial"
+            raise Exception("Content generation failed: boom")
+
+        thread = await ConversationsThread.objects.acreate(title="Thread", user=self.user)
+        with patch('resumax_api.views.generate_response_stream', failing_stream):
+            response = await self.async_client.post(f'/api/threads/{thread.id}/?stream=1', {'prompt-text': 'Hello'})
+            events = await parse_events(response.streaming_content)
+
+        self.assertEqual(events[-1][0], "error")
+        self.assertIn("boom", events[-1][1]["error"])
+        self.assertEqual(await Conversation.objects.acount(), 0)
+
+
+class TestGenerateResponseStream(TransactionTestCase):
+    """Test the streaming generator in gemini_model."""
+
+    def test_chunks_are_forwarded(self):
+        """Test that non-empty chunks from the SDK stream are yielded in order."""
+        chat = MagicMock()
+        chat.send_message_stream.return_value = iter([
+            SimpleNamespace(text="Hello"),
+            SimpleNamespace(text=None),
+            SimpleNamespace(text=" world"),
+        ])
+
+        async def fake_prepare(promptText, fileUrls, thread_id, user_id, analysis=None):
+            return chat, ["parts"]
+
+        async def collect():
+            return [chunk async for chunk in generate_response_stream("Hi", thread_id=1, user_id=1)]
+
+        with patch('resumax_algo.gemini_model._prepare_chat_message', fake_prepare):
+            chunks = asyncio.run(collect())
+
+        self.assertEqual(chunks, ["Hello", " world"])
+        chat.send_message_stream.assert_called_once_with(["parts"])
+
+    def test_empty_prompt_is_rejected(self):
+        """Test that empty prompts raise before contacting Gemini."""
+        async def collect():
+            return [chunk async for chunk in generate_response_stream("   ")]
+
+        with self.assertRaises(Exception):
+            asyncio.run(collect())
@@ -0,0 +1,163 @@
+"""
+Tests for background critique jobs and the job status API.
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from resumax_algo.job_queue import DatabaseJobQueue, JobWorkerPool
+from resumax_algo.models import Conversation, ConversationsThread, CritiqueJob
+from resumax_api.jobs import run_critique_job
+
+
+class TestCritiqueJobs(TransactionTestCase):
+    """Test enqueueing, running and polling critique jobs."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='jobuser', email='job@example.com')
+        self.async_client.force_login(self.user)
+        self.queue = DatabaseJobQueue(stale_after=60, max_attempts=2)
+
+    async def run_workers(self, fake_generate, concurrency=4):
+        pool = JobWorkerPool(self.queue, run_critique_job, concurrency=concurrency, poll_interval=0.01)
+        with patch('resumax_api.jobs.generate_response', fake_generate):
+            await pool.run(drain=True)
+        return pool
+
+    async def test_post_with_job_returns_202_without_generating(self):
+        """Test that job mode stores a queued job and returns its id without calling Gemini."""
+        async def fail_generate(*args, **kwargs):
+            raise AssertionError("generate_response must not run in the request")
+
+        with patch('resumax_api.views.generate_response', fail_generate):
+            response = await self.async_client.post('/api/threads/0/?job=1', {'prompt-text': 'Review my resume'})
+
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data["status"], CritiqueJob.QUEUED)
+        self.assertEqual(response["Location"], f'/api/jobs/{data["job_id"]}/')
+        self.assertTrue(await ConversationsThread.objects.filter(id=data["thread_id"], user=self.user).aexists())
+        self.assertEqual(await Conversation.objects.acount(), 0)
+
+        response = await self.async_client.get(f'/api/jobs/{data["job_id"]}/')
+        self.assertEqual(response.json()["status"], CritiqueJob.QUEUED)
+
+    async def test_worker_runs_job_and_saves_conversation(self):
+        """Test that a worker generates the critique and the status API returns it."""
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            return f"Critique of: {promptText}"
+
+        response = await self.async_client.post('/api/threads/0/?job=1', {'prompt-text': 'Review my resume'})
+        job_id = response.json()["job_id"]
+
+        pool = await self.run_workers(fake_generate)
+
+        self.assertEqual(pool.stats, {'succeeded': 1, 'failed': 0})
+        data = (await self.async_client.get(f'/api/jobs/{job_id}/')).json()
+        self.assertEqual(data["status"], CritiqueJob.SUCCEEDED)
+        self.assertEqual(data["response"], "Critique of: Review my resume")
+        self.assertEqual(data["attachedFiles"], [])
+        conversation = await Conversation.objects.aget()
+        self.assertEqual(conversation.thread_id, data["thread_id"])
+
+    async def test_failed_job_reports_error(self):
+        """Test that a Gemini failure marks the job as failed with the error."""
+        async def broken_generate(*args, **kwargs):
+            raise Exception("Gemini unavailable")
+
+        response = await self.async_client.post('/api/threads/0/?job=1', {'prompt-text': 'Review my resume'})
+        job_id = response.json()["job_id"]
+
+        await self.run_workers(broken_generate)
+
+        data = (await self.async_client.get(f'/api/jobs/{job_id}/')).json()
+        self.assertEqual(data["status"], CritiqueJob.FAILED)
+        self.assertEqual(data["error"], "Gemini unavailable")
+        self.assertEqual(await Conversation.objects.acount(), 0)
+
+    async def test_other_users_job_is_not_found(self):
+        """Test that a user can't poll another user's job."""
+        other = await User.objects.acreate(username='otherjobuser')
+        thread = await ConversationsThread.objects.acreate(title="Other", user=other)
+        job = await CritiqueJob.objects.acreate(user=other, thread=thread, prompt="Hi")
+
+        response = await self.async_client.get(f'/api/jobs/{job.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_workers_run_jobs_concurrently(self):
+        """Test that a pool of workers overlaps slow Gemini calls."""
+        latency = 0.2
+        job_count = 8
+
+        async def slow_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            await asyncio.sleep(latency)
+            return "Done"
+
+        for i in range(job_count):
+            await self.async_client.post('/api/threads/0/?job=1', {'prompt-text': f'Resume {i}'})
+
+        start = time.perf_counter()
+        pool = await self.run_workers(slow_generate, concurrency=job_count)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(pool.stats['succeeded'], job_count)
+        self.assertEqual(await Conversation.objects.acount(), job_count)
+        self.assertLess(elapsed, latency * job_count / 2)
+
+
+class TestDatabaseJobQueue(TransactionTestCase):
+    """Test claiming and recovering jobs in the database queue."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='queueuser', email='queue@example.com')
+        self.thread = ConversationsThread.objects.create(title="Thread", user=self.user)
+        self.queue = DatabaseJobQueue(stale_after=60, max_attempts=2)
+
+    def create_job(self):
+        job = CritiqueJob.objects.create(user=self.user, thread=self.thread, prompt="Review")
+        self.queue.enqueue(job)
+        return job
+
+    def test_claim_takes_oldest_job_once(self):
+        """Test that jobs are claimed oldest first and never twice."""
+        first = self.create_job()
+        second = self.create_job()
+
+        self.assertEqual(self.queue.claim().id, first.id)
+        claimed = self.queue.claim()
+        self.assertEqual(claimed.id, second.id)
+        self.assertEqual(claimed.status, CritiqueJob.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(self.queue.claim())
+
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        """Test that jobs abandoned by a dead worker run again, up to max_attempts."""
+        job = self.create_job()
+        stale_time = timezone.now() - timedelta(minutes=5)
+
+        self.queue.claim()
+        CritiqueJob.objects.filter(id=job.id).update(started_at=stale_time)
+        self.assertEqual(self.queue.claim().attempts, 2)
+
+        CritiqueJob.objects.filter(id=job.id).update(started_at=stale_time)
+        self.assertIsNone(self.queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, CritiqueJob.FAILED)
+        self.assertEqual(job.error_message, "Job timed out")
+
+    def test_stats_counts_jobs_by_status(self):
+        """Test that stats reports the number of jobs in each status."""
+        self.create_job()
+        self.create_job()
+        self.queue.claim()
+
+        stats = self.queue.stats()
+        self.assertEqual(stats['queued'], 1)
+        self.assertEqual(stats['running'], 1)
+        self.assertEqual(stats['succeeded'], 0)
@@ -0,0 +1,118 @@
+"""
+Tests for the offline Gemini client and the request path running against it.
+"""
+
+import json
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from resumax_algo import fake_gemini, gemini_model, metrics
+from resumax_algo.models import Conversation, ConversationsThread
+
+
+def fake_client_settings(**options):
+    return {'BACKEND': 'resumax_algo.fake_gemini.FakeClient',
+            'OPTIONS': {'latency': 0, 'upload_delay': 0, **options}}
+
+
+class FakeClientMixin:
+    def setUp(self):
+        super().setUp()
+        gemini_model.reset_genai_client()
+        self.addCleanup(gemini_model.reset_genai_client)
+
+
+class TestFakeClient(FakeClientMixin, SimpleTestCase):
+    """Test the fake client on its own."""
+
+    @override_settings(RESUMAX_GEMINI_CLIENT=fake_client_settings(response_text="Fake critique"))
+    def test_selected_by_settings_and_records_history(self):
+        """Test that the setting picks the fake and chats keep their turns with usage metadata."""
+        client = gemini_model._get_genai_client()
+        self.assertIsInstance(client, fake_gemini.FakeClient)
+
+        chat = client.chats.create(model="models/gemini-2.5-flash", history=[
+            {'role': 'user', 'parts': [{'text': "Hi"}]}, {'role': 'model', 'parts': [{'text': "Hello"}]},
+        ])
+        response = chat.send_message(["Review my resume"])
+
+        self.assertEqual(response.text, "Fake critique")
+        self.assertGreater(response.usage_metadata.prompt_token_count, 0)
+        self.assertEqual([content.role for content in chat.get_history(curated=True)],
+                         ['user', 'model', 'user', 'model'])
+
+    def test_stream_chunks_and_failures(self):
+        """Test that streams arrive in the configured chunks and failures are injected before any text."""
+        client = fake_gemini.FakeClient(latency=0, stream_chunks=4, response_text="abcdefgh")
+        chunks = list(client.chats.create().send_message_stream(["Review"]))
+        self.assertEqual([chunk.text for chunk in chunks], ["ab", "cd", "ef", "gh"])
+        self.assertIsNotNone(chunks[-1].usage_metadata)
+
+        failing = fake_gemini.FakeClient(latency=0, failure_rate=1.0)
+        with self.assertRaises(fake_gemini.FakeGeminiError):
+            failing.chats.create().send_message(["Review"])
+        self.assertEqual(failing.stats()['failures'], 1)
+
+
+class TestRequestPathWithFakeClient(FakeClientMixin, TransactionTestCase):
+    """Test the thread endpoint end to end against the fake client, without mocking generate_response."""
+
+    def setUp(self):
+        super().setUp()
+        media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_dir.cleanup)
+        override = override_settings(MEDIA_ROOT=media_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        gemini_model.reset_chat_session_store()
+        self.addCleanup(gemini_model.reset_chat_session_store)
+        patcher = patch.object(gemini_model, '_base_knowledge_uris', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        metrics.REGISTRY.clear()
+        self.addCleanup(metrics.REGISTRY.clear)
+        self.user = User.objects.create_user(username='fakeuser', email='fake@example.com')
+        self.client.force_login(self.user)
+        self.thread = ConversationsThread.objects.create(title="Thread", user=self.user)
+
+    @override_settings(RESUMAX_GEMINI_CLIENT=fake_client_settings(response_text="Fake critique"))
+    def test_request_with_attachment(self):
+        """Test that a prompt with a resume is answered, saved with its tokens and timed per stage."""
+        upload = SimpleUploadedFile("resume.txt", b"Software Engineer, Acme Corp", content_type="text/plain")
+
+        response = self.client.post(f'/api/threads/{self.thread.id}/',
+                                    {'prompt-text': 'Review my resume', 'prompt-file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["response"], "Fake critique")
+        conversation = Conversation.objects.get(thread=self.thread)
+        self.assertGreater(conversation.input_tokens, 0)
+        for stage in ('history_load', 'file_upload', 'send_message', 'db_save'):
+            self.assertEqual(metrics.STAGE_SECONDS.count(stage=stage), 1, stage)
+
+    @override_settings(RESUMAX_GEMINI_CLIENT=fake_client_settings(stream_chunks=3))
+    async def test_streamed_request(self):
+        """Test that a streamed prompt arrives in the fake's chunks and is saved once done."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(f'/api/threads/{self.thread.id}/?stream=1', {'prompt-text': 'Review'})
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+        events = [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+        self.assertEqual("".join(event.get("text", "") for event in events[:-1]), fake_gemini.DEFAULT_RESPONSE_TEXT)
+        self.assertEqual(len(events), 4)
+        self.assertIn("event: done", body)
+        self.assertTrue(await Conversation.objects.filter(thread=self.thread).aexists())
+
+    @override_settings(RESUMAX_GEMINI_CLIENT=fake_client_settings(failure_rate=1.0))
+    def test_failures_are_retried(self):
+        """Test that a failing Gemini is tried three times before the request fails."""
+        with patch('resumax_algo.gemini_model.asyncio.sleep', return_value=None):
+            response = self.client.post(f'/api/threads/{self.thread.id}/', {'prompt-text': 'Review'})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(gemini_model._get_genai_client().stats()['requests'], 3)
+        self.assertEqual(metrics.RETRIES.value(), 2)
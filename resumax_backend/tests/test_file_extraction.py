@@ -0,0 +1,144 @@
+"""
+Tests for local PDF/text extraction of attached files.
+"""
+
+import asyncio
+import pathlib
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pymupdf
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from resumax_algo import extraction, gemini_model
+from resumax_algo.models import AttachedFile
+
+
+def make_resume_pdf(path):
+    """Write a one-page resume with headings, bullets and a 3x2 table."""
+    document = pymupdf.open()
+    page = document.new_page()
+    page.insert_text((72, 72), "Jane Doe", fontsize=20, fontname="hebo")
+    page.insert_text((72, 100), "Experience", fontsize=14, fontname="hebo")
+    y = 120
+    for i in range(5):
+        page.insert_text((72, y), f"- Led a team of {i + 2} engineers to ship a product", fontsize=10)
+        y += 14
+    page.insert_text((72, 220), "Skills", fontsize=14, fontname="hebo")
+    for row in range(3):
+        for col in range(2):
+            page.draw_rect(pymupdf.Rect(72 + col * 120, 240 + row * 20, 192 + col * 120, 260 + row * 20))
+            page.insert_text((77 + col * 120, 254 + row * 20), f"skill {row}-{col}", fontsize=9)
+    document.save(path)
+    document.close()
+
+
+class TestExtractFile(TestCase):
+    """Test extraction results and their sidecar cache."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.pdf_path = pathlib.Path(self.tmp_dir.name) / "resume.pdf"
+        make_resume_pdf(self.pdf_path)
+
+    def test_pdf_extraction_writes_sidecar(self):
+        """Test that a PDF's text, headings, fonts and tables are cached next to it."""
+        status, error = extraction.extract_file(self.pdf_path, "application/pdf", "My Resume.pdf")
+
+        self.assertEqual((status, error), ("completed", ""))
+        self.assertTrue(extraction.sidecar_path(self.pdf_path).exists())
+        result = extraction.load_extraction(self.pdf_path)
+        self.assertEqual(result["page_count"], 1)
+        self.assertEqual(result["headings"], ["Jane Doe", "Experience", "Skills"])
+        self.assertEqual(result["tables"], [{"page": 1, "rows": 3, "cols": 2}])
+        self.assertEqual(result["body_font_size"], 10)
+        self.assertTrue(result["text"].startswith("[Attached file My Resume.pdf: 1 page(s), 1 table(s)"))
+        # Table cells appear once, as markdown, after the section heading
+        self.assertEqual(result["text"].count("skill 1-0"), 1)
+        self.assertIn("|skill 1-0|skill 1-1|", result["text"])
+        self.assertLess(result["text"].index("Skills"), result["text"].index("|skill 0-0|"))
+
+    def test_compact_text_is_smaller_than_the_pdf(self):
+        """Test that the text sent to the model is a fraction of the file size."""
+        extraction.extract_file(self.pdf_path, "application/pdf")
+        text = extraction.load_compact_text(self.pdf_path)
+        self.assertLess(len(text.encode()), self.pdf_path.stat().st_size / 2)
+
+    def test_text_file_and_image(self):
+        """Test that text files are extracted and images are skipped."""
+        text_path = pathlib.Path(self.tmp_dir.name) / "notes.txt"
+        text_path.write_text("Objective:   \n\n\n\nBuild   things")
+        image_path = pathlib.Path(self.tmp_dir.name) / "photo.png"
+        image_path.write_bytes(b"\x89PNG")
+
+        self.assertEqual(extraction.extract_file(text_path, "text/plain")[0], "completed")
+        self.assertEqual(extraction.load_extraction(text_path)["pages"], ["Objective:\n\nBuild things"])
+        self.assertEqual(extraction.extract_file(image_path, "image/png"), ("skipped", ""))
+        self.assertIsNone(extraction.load_extraction(image_path))
+
+    def test_broken_pdf_fails(self):
+        """Test that an unreadable PDF reports a failure instead of raising."""
+        broken = pathlib.Path(self.tmp_dir.name) / "broken.pdf"
+        broken.write_bytes(b"not a pdf")
+
+        status, error = extraction.extract_file(broken, "application/pdf")
+        self.assertEqual(status, "failed")
+        self.assertTrue(error.startswith("Extraction failed"))
+
+    def test_sidecar_is_stale_after_file_changes(self):
+        """Test that a sidecar is ignored once the file it describes changes."""
+        extraction.extract_file(self.pdf_path, "application/pdf")
+        with open(self.pdf_path, "ab") as f:
+            f.write(b"\n% appended")
+        self.assertIsNone(extraction.load_extraction(self.pdf_path))
+
+    @override_settings(RESUMAX_EXTRACTION={'SEND_EXTRACTED_TEXT': True})
+    def test_extracted_text_replaces_upload(self):
+        """Test that the compact text is sent instead of uploading the file when configured."""
+        extraction.extract_file(self.pdf_path, "application/pdf")
+        client = MagicMock()
+
+        part = asyncio.run(gemini_model._upload_single_file(client, (self.pdf_path, "application/pdf")))
+
+        self.assertIn("Jane Doe", part.text)
+        client.files.upload.assert_not_called()
+
+
+class TestExtractionOnUpload(TransactionTestCase):
+    """Test that files posted to the conversations view are extracted in the process pool."""
+
+    def setUp(self):
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_dir.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='extractuser', email='extract@example.com')
+        self.client.force_login(self.user)
+
+    def test_upload_is_extracted_and_sidecar_deleted_with_file(self):
+        """Test that processing_status reflects extraction and deleting the file removes its sidecar."""
+        pdf_path = pathlib.Path(self.media_dir.name) / "source.pdf"
+        make_resume_pdf(pdf_path)
+        upload = SimpleUploadedFile("resume.pdf", pdf_path.read_bytes(), content_type="application/pdf")
+
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            return "Nice resume"
+
+        with patch('resumax_api.views.generate_response', fake_generate):
+            response = self.client.post('/api/threads/0/', {'prompt-text': 'Review', 'prompt-file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        attached = AttachedFile.objects.get()
+        self.assertEqual(attached.processing_status, "completed")
+        stored_path = attached.get_full_file_path()
+        sidecar = extraction.sidecar_path(stored_path)
+        self.assertTrue(sidecar.exists())
+        self.assertIn("Jane Doe", extraction.load_compact_text(stored_path))
+
+        attached.delete()
+        self.assertFalse(stored_path.exists())
+        self.assertFalse(sidecar.exists())
@@ -0,0 +1,168 @@
+"""
+Tests for content-addressed storage of uploaded files.
+"""
+
+import asyncio
+import hashlib
+import pathlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from resumax_algo import extraction, file_store
+from resumax_algo.models import AttachedFile, Conversation, ConversationsThread
+
+PDF_BYTES = b"%PDF-1.4\n% resume\n"
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_dir.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.media = pathlib.Path(self.media_dir.name)
+
+
+class TestIngestUpload(MediaRootMixin, SimpleTestCase):
+    """Test hashing, de-duplication and content checks while storing uploads."""
+
+    def test_same_content_is_stored_once_per_user(self):
+        """Test that a repeated upload reuses the stored file and other users get their own copy."""
+        first = file_store.ingest_upload(SimpleUploadedFile("Resume.PDF", PDF_BYTES, "application/pdf"), 1)
+        again = file_store.ingest_upload(SimpleUploadedFile("resume (1).pdf", PDF_BYTES, "application/pdf"), 1)
+        other = file_store.ingest_upload(SimpleUploadedFile("resume.pdf", PDF_BYTES, "application/pdf"), 2)
+
+        content_hash = hashlib.sha256(PDF_BYTES).hexdigest()
+        self.assertEqual(first, (f"user_1/{content_hash}.pdf", content_hash, False))
+        self.assertEqual(again, (f"user_1/{content_hash}.pdf", content_hash, True))
+        self.assertEqual(other[0], f"user_2/{content_hash}.pdf")
+        self.assertEqual([p.name for p in (self.media / "user_1").iterdir()], [f"{content_hash}.pdf"])
+        self.assertEqual((self.media / first[0]).read_bytes(), PDF_BYTES)
+
+    def test_content_must_match_type(self):
+        """Test that a file claiming to be a PDF without a PDF header is rejected and nothing is kept."""
+        with self.assertRaises(ValidationError):
+            file_store.ingest_upload(SimpleUploadedFile("resume.pdf", b"MZ\x90\x00", "application/pdf"), 1)
+
+        self.assertEqual(list((self.media / "user_1").iterdir()), [])
+
+    def test_stored_extraction_is_reused(self):
+        """Test that a repeated upload with a current extraction isn't extracted again."""
+        stored_filename, _, _ = file_store.ingest_upload(SimpleUploadedFile("notes.txt", b"Notes", "text/plain"), 1)
+        extraction.extract_file(self.media / stored_filename, "text/plain")
+        file_data = [{'stored_filename': stored_filename, 'file_type': "text/plain",
+                      'original_filename': "notes.txt", 'deduplicated': True}]
+
+        with patch.object(extraction, '_get_process_pool', return_value=ThreadPoolExecutor(1)), \
+                patch.object(extraction, 'extract_file') as extract:
+            asyncio.run(extraction.extract_uploaded_files(file_data))
+
+        extract.assert_not_called()
+        self.assertEqual(file_data[0]['processing_status'], "completed")
+
+
+class TestSharedStoredFiles(MediaRootMixin, TransactionTestCase):
+    """Test that conversations share repeated uploads and the file goes with the last of them."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='dedupuser', email='dedup@example.com')
+        self.client.force_login(self.user)
+
+    def post_resume(self, name):
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            return "Critique"
+
+        async def skip_extraction(uploaded_file_data):
+            return uploaded_file_data
+
+        upload = SimpleUploadedFile(name, PDF_BYTES, content_type="application/pdf")
+        with patch('resumax_api.views.generate_response', fake_generate), \
+                patch('resumax_api.views.extract_uploaded_files', skip_extraction):
+            return self.client.post('/api/threads/0/', {'prompt-text': 'Review', 'prompt-file': upload})
+
+    def test_repeat_upload_shares_file_until_last_delete(self):
+        """Test that both rows point at one file with its hash, which is deleted with the second row."""
+        self.assertEqual(self.post_resume("resume.pdf").status_code, 200)
+        self.assertEqual(self.post_resume("resume-copy.pdf").status_code, 200)
+
+        first, second = AttachedFile.objects.order_by('id')
+        self.assertEqual(first.stored_filename, second.stored_filename)
+        self.assertEqual(second.content_hash, hashlib.sha256(PDF_BYTES).hexdigest())
+        stored_path = first.get_full_file_path()
+
+        Conversation.objects.get(id=first.conversation_id).delete()
+        self.assertTrue(stored_path.exists())
+        second.delete()
+        self.assertFalse(stored_path.exists())
+
+    def test_mismatched_content_is_rejected(self):
+        """Test that the view answers 400 when the content doesn't match the declared type."""
+        upload = SimpleUploadedFile("resume.pdf", b"not a pdf", content_type="application/pdf")
+
+        response = self.client.post('/api/threads/0/', {'prompt-text': 'Review', 'prompt-file': upload})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AttachedFile.objects.count(), 0)
+
+
+class TestReplacedStoredFile(MediaRootMixin, TestCase):
+    """Test cleanup of the old file when a row points at a new one."""
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user(username='replaceuser', email='replace@example.com')
+        thread = ConversationsThread.objects.create(title="Thread", user=user)
+        self.conversation = Conversation.objects.create(thread=thread, prompt="Review", response="Critique")
+        for name in ("old.pdf", "new.pdf"):
+            (self.media / name).write_bytes(PDF_BYTES)
+        self.file = AttachedFile.objects.create(conversation=self.conversation, stored_filename="old.pdf")
+
+    def test_saving_a_loaded_row_does_not_select_it_again(self):
+        """Test that status updates are a single UPDATE and replacing the file deletes the old one."""
+        attached = AttachedFile.objects.get(pk=self.file.pk)
+        attached.processing_status = "completed"
+        with self.assertNumQueries(1):
+            attached.save(update_fields=['processing_status'])
+
+        attached.stored_filename = "new.pdf"
+        attached.save()
+        self.assertFalse((self.media / "old.pdf").exists())
+        attached.save()
+        self.assertTrue((self.media / "new.pdf").exists())
+
+    def test_failed_save_keeps_the_stored_file(self):
+        """Test that the stored file is only tracked as replaced once the save went through."""
+        attached = AttachedFile.objects.get(pk=self.file.pk)
+        attached.stored_filename = "new.pdf"
+        with patch.object(AttachedFile, '_do_update', side_effect=DatabaseError("disk I/O error")), \
+                self.assertRaises(DatabaseError), transaction.atomic():
+            attached.save()
+
+        self.assertEqual(attached._loaded_stored_filename, "old.pdf")
+        attached.save()
+        self.assertEqual(attached._loaded_stored_filename, "new.pdf")
+
+    def test_save_of_other_fields_keeps_the_old_file(self):
+        """Test that an unsaved stored_filename change doesn't delete the file the row still has."""
+        self.file.stored_filename = "new.pdf"
+        self.file.save(update_fields=['processing_status'])
+
+        self.assertTrue((self.media / "old.pdf").exists())
+
+    def test_shared_old_file_is_kept(self):
+        """Test that the old file stays while another row still references it."""
+        AttachedFile.objects.create(conversation=self.conversation, stored_filename="old.pdf")
+        self.file.stored_filename = "new.pdf"
+        self.file.save()
+
+        self.assertTrue((self.media / "old.pdf").exists())
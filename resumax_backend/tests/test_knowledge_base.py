@@ -0,0 +1,140 @@
+"""
+Tests for the chunked base-knowledge corpus and per-prompt passage selection.
+"""
+
+import io
+import pathlib
+import tempfile
+
+import pymupdf
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from resumax_algo import knowledge_base, vector_store
+from resumax_algo.models import Conversation, ConversationsThread, Document
+
+
+def write_corpus(directory):
+    """A two-page cover letter guide and an untagged page of general advice."""
+    document = pymupdf.open()
+    document.new_page().insert_text((72, 72), "Address the hiring manager by name in the greeting.", fontsize=11)
+    document.new_page().insert_text((72, 72), "Close the letter with a clear call to action.", fontsize=11)
+    document.save(pathlib.Path(directory) / "Cover_Letter_Guide.pdf")
+    document.close()
+    (pathlib.Path(directory) / "general_tips.txt").write_text(
+        "Software engineering resumes: list Python and data science projects.\n\n"
+        "Engineering recruiters read a resume in seconds, so lead each bullet with a result."
+    )
+
+
+def passage(text, doc_types=(), disciplines=()):
+    return {'title': '', 'source': 'guide.pdf', 'page': 1, 'text': text,
+            'doc_types': list(doc_types), 'disciplines': list(disciplines)}
+
+
+class TestCorpusAndSelection(SimpleTestCase):
+    """Test chunking with page anchors, diagnostics and budgeted selection."""
+
+    def test_corpus_is_chunked_per_page_and_tagged(self):
+        """Test that passages keep their file and page and are tagged by file name or text."""
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus(directory)
+            passages = knowledge_base.build_corpus(directory, chunk_chars=60)
+
+        cover = [p for p in passages if p['source'] == "Cover_Letter_Guide.pdf"]
+        self.assertEqual([p['page'] for p in cover], [1, 2])
+        self.assertTrue(all(p['doc_types'] == ['cover_letter'] for p in cover))
+        general = [p for p in passages if p['source'] == "general_tips.txt"]
+        self.assertIsNone(general[0]['page'])
+        self.assertTrue(all(len(p['text']) <= 60 for p in general))
+        self.assertIn('stem', general[0]['disciplines'])
+
+    def test_parse_diagnostic(self):
+        """Test that the model's declared document type and discipline are recognised."""
+        response = "**Document Type:** ACADEMIC_CV\n**Target Discipline:** STEM (Neuroscience)\n\nThanks for sharing!"
+
+        self.assertEqual(knowledge_base.parse_diagnostic(response), ('academic_cv', 'stem'))
+        self.assertEqual(knowledge_base.parse_diagnostic("Happy to help!"), (None, None))
+
+    def test_selection_filters_by_context(self):
+        """Test that passages for other document types or disciplines are dropped and tailored ones ranked up."""
+        candidates = [
+            (0.50, passage("General formatting advice")),
+            (0.45, passage("Cover letter advice for STEM roles", ['cover_letter'], ['stem'])),
+            (0.90, passage("Academic CV publication style", ['academic_cv'])),
+            (0.80, passage("Cover letters for finance", ['cover_letter'], ['business'])),
+        ]
+
+        selected, _ = knowledge_base.select_passages(candidates, 'cover_letter', 'stem', token_budget=1000)
+
+        self.assertEqual(len(selected), 2)
+        self.assertIn("Cover letter advice for STEM roles", selected[0])
+        self.assertIn("General formatting advice", selected[1])
+        self.assertTrue(selected[0].startswith("--- guide.pdf, p. 1 ---"))
+
+    def test_selection_respects_token_budget(self):
+        """Test that passages are packed into the budget, skipping ones that don't fit."""
+        candidates = [(0.9, passage("x" * 400)), (0.8, passage("y" * 2000)), (0.7, passage("z" * 200))]
+
+        selected, tokens = knowledge_base.select_passages(candidates, token_budget=200)
+
+        self.assertEqual(len(selected), 2)
+        self.assertLessEqual(tokens, 200)
+        self.assertNotIn("y" * 10, "".join(selected))
+
+
+class TestKnowledgeBaseContext(TestCase):
+    """Test building the corpus into Documents and selecting passages for a thread."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.corpus_dir = pathlib.Path(self.tmp_dir.name) / "base_knowledge"
+        self.corpus_dir.mkdir()
+        write_corpus(self.corpus_dir)
+        override = override_settings(
+            RESUMAX_VECTOR_STORE={'ENABLED': True, 'PATH': str(pathlib.Path(self.tmp_dir.name) / "store")},
+            RESUMAX_KNOWLEDGE_BASE={'DIRECTORY': str(self.corpus_dir), 'TOKEN_BUDGET': 100},
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        vector_store.reset_vector_store()
+        self.addCleanup(vector_store.reset_vector_store)
+
+    def test_build_command_replaces_passages(self):
+        """Test that the command stores tagged passages and rebuilding doesn't duplicate them."""
+        Document.objects.create(title="Hand-written note", content="Kept across rebuilds")
+
+        call_command('build_knowledge_base', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('build_knowledge_base', stdout=out)
+
+        self.assertIn("Stored 3 passages from 2 files (4 documents indexed)", out.getvalue())
+        self.assertEqual(Document.objects.filter(source="Cover_Letter_Guide.pdf").count(), 2)
+        self.assertTrue(Document.objects.filter(title="Hand-written note").exists())
+        self.assertEqual(Document.objects.get(source="Cover_Letter_Guide.pdf", page=2).doc_types, ['cover_letter'])
+
+    def test_thread_diagnostic_selects_passages(self):
+        """Test that a cover-letter thread gets cover letter passages, not resume ones, within budget."""
+        call_command('build_knowledge_base', stdout=io.StringIO())
+        user = User.objects.create_user(username='kbuser', email='kb@example.com')
+        thread = ConversationsThread.objects.create(title="Letter", user=user)
+        Conversation.objects.create(thread=thread, prompt="Please review",
+                                    response="Document Type: Cover Letter\nTarget Discipline: Business\n\nGreat start!")
+
+        context = knowledge_base.build_context("How should I address the hiring manager and close?", thread.id)
+
+        self.assertTrue(context.startswith("[Relevant passages from the Loeb center reference documents "
+                                           "for a cover letter in business"))
+        self.assertIn("--- Cover_Letter_Guide.pdf, p. 1 ---", context)
+        self.assertNotIn("Software engineering", context)
+        self.assertLessEqual(knowledge_base.estimate_tokens(context.split('\n', 1)[1]), 100)
+
+    def test_first_turn_is_classified_from_files(self):
+        """Test that without a diagnostic the attached text decides the document type."""
+        doc_type, discipline = knowledge_base.detect_context(
+            "Can you review this?", ["Dear hiring manager, ... Sincerely, Jane. I studied computer science."]
+        )
+
+        self.assertEqual((doc_type, discipline), ('cover_letter', 'stem'))
@@ -0,0 +1,82 @@
+"""
+Tests for the bounded LRU + TTL cache.
+"""
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from resumax_algo.caching import LRUCache
+
+
+class TestLRUCache(SimpleTestCase):
+    """Test eviction order, expiry and counters."""
+
+    def test_get_and_put(self):
+        """Test basic storage and hit/miss counting."""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that reading an entry protects it from eviction."""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_updating_existing_key_does_not_evict(self):
+        """Test that re-putting a key refreshes it without evicting others."""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.put("a", 10)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), 10)
+        self.assertEqual(cache.stats()['evictions'], 0)
+
+    def test_idle_entries_expire(self):
+        """Test that entries idle past the TTL are swept lazily."""
+        cache = LRUCache(max_size=10, ttl=60)
+        with patch('resumax_algo.caching.time.time', return_value=1000):
+            cache.put("old", 1)
+        with patch('resumax_algo.caching.time.time', return_value=1050):
+            cache.put("new", 2)
+        with patch('resumax_algo.caching.time.time', return_value=1070):
+            self.assertIsNone(cache.get("old"))
+            self.assertEqual(cache.get("new"), 2)
+
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_access_extends_ttl(self):
+        """Test that the TTL counts from the last access."""
+        cache = LRUCache(max_size=10, ttl=60)
+        with patch('resumax_algo.caching.time.time', return_value=1000):
+            cache.put("a", 1)
+        with patch('resumax_algo.caching.time.time', return_value=1050):
+            cache.get("a")
+        with patch('resumax_algo.caching.time.time', return_value=1100):
+            self.assertEqual(cache.get("a"), 1)
+
+    def test_large_cache_stays_bounded(self):
+        """Test that thousands of entries respect the capacity."""
+        cache = LRUCache(max_size=5000)
+        for i in range(20000):
+            cache.put(i, i)
+
+        self.assertEqual(len(cache), 5000)
+        self.assertEqual(cache.stats()['evictions'], 15000)
+        self.assertIn(19999, cache)
+        self.assertNotIn(0, cache)
@@ -0,0 +1,128 @@
+"""
+Tests for the request metrics and the /metrics endpoint.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from resumax_algo import gemini_model, metrics
+
+
+class TestRegistry(SimpleTestCase):
+    """Test counters, histograms and their text exposition."""
+
+    def test_render_prometheus_text(self):
+        """Test that histograms render cumulative buckets, sum and count per label set."""
+        registry = metrics.Registry()
+        latency = registry.histogram('test_seconds', "Test latency.", ['stage'], buckets=(0.1, 1.0))
+        calls = registry.counter('test_calls_total', "Test calls.")
+        latency.observe(0.05, stage='load')
+        latency.observe(0.5, stage='load')
+        latency.observe(3.0, stage='load')
+        calls.inc()
+        calls.inc(2)
+
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP test_calls_total Test calls.',
+            '# TYPE test_calls_total counter',
+            'test_calls_total 3',
+            '# HELP test_seconds Test latency.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{stage="load",le="0.1"} 1',
+            'test_seconds_bucket{stage="load",le="1.0"} 2',
+            'test_seconds_bucket{stage="load",le="+Inf"} 3',
+            'test_seconds_sum{stage="load"} 3.55',
+            'test_seconds_count{stage="load"} 3',
+        ])
+
+    def test_labels_must_match(self):
+        """Test that observing with the wrong labels is an error."""
+        histogram = metrics.Registry().histogram('test_seconds', "Test latency.", ['stage'])
+        with self.assertRaises(ValueError):
+            histogram.observe(1.0, mode='sync')
+
+
+class StubChat:
+    """Chat failing its first send, then answering with usage metadata."""
+
+    cached_content = None
+
+    def __init__(self):
+        self.attempts = 0
+
+    def get_history(self, curated=False):
+        return []
+
+    def send_message(self, parts):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise ConnectionError("Connection reset")
+        return SimpleNamespace(text="Critique", usage_metadata=SimpleNamespace(
+            prompt_token_count=1200, candidates_token_count=300, thoughts_token_count=80,
+        ))
+
+
+class TestRequestMetrics(SimpleTestCase):
+    """Test what a Gemini request records."""
+
+    def setUp(self):
+        metrics.REGISTRY.clear()
+        self.addCleanup(metrics.REGISTRY.clear)
+
+    def test_stages_tokens_and_retries_are_recorded(self):
+        """Test that a retried request records its stages, tokens and retry, and logs one line."""
+        async def fake_prepare(promptText, fileUrls, thread_id, user_id, analysis=None):
+            with metrics.stage('history_load'):
+                pass
+            return StubChat(), [promptText]
+
+        with patch.object(gemini_model, '_prepare_chat_message', fake_prepare), \
+                patch.object(gemini_model, '_save_chat_session', return_value=None), \
+                patch('resumax_algo.gemini_model.asyncio.sleep', return_value=None), \
+                self.assertLogs('resumax_algo.metrics', level='INFO') as logs:
+            asyncio.run(gemini_model.generate_response("Review my resume", thread_id=1, user_id=1))
+
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='history_load'), 1)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='send_message'), 2)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='retry_backoff'), 1)
+        self.assertEqual(metrics.RETRIES.value(), 1)
+        self.assertEqual(metrics.TOKENS.count(kind='thoughts'), 1)
+        self.assertEqual(metrics.REQUESTS.value(mode='sync', outcome='ok'), 1)
+        [line] = logs.output
+        self.assertIn("gemini_request mode=sync", line)
+        self.assertIn("input_tokens=1200 ", line)
+        self.assertIn("output_tokens=380 ", line)
+        self.assertIn("retries=1", line)
+
+    def test_failed_request_is_counted_as_error(self):
+        """Test that a request raising an exception is recorded with the error outcome."""
+        async def failing_prepare(promptText, fileUrls, thread_id, user_id, analysis=None):
+            raise RuntimeError("No session")
+
+        with patch.object(gemini_model, '_prepare_chat_message', failing_prepare), \
+                self.assertLogs('resumax_algo.metrics', level='INFO'), self.assertRaises(Exception):
+            asyncio.run(gemini_model.generate_response("Review", thread_id=1, user_id=1))
+
+        self.assertEqual(metrics.REQUESTS.value(mode='sync', outcome='error'), 1)
+
+
+@override_settings(RESUMAX_METRICS_TOKEN="scrape-secret")
+class TestMetricsEndpoint(TestCase):
+    """Test access to the /metrics endpoint."""
+
+    def test_token_or_staff_required(self):
+        """Test that only the scrape token or a staff user gets the metrics."""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE resumax_gemini_stage_seconds histogram", response.content.decode())
+
+        staff = User.objects.create_user(username='staffuser', email='staff@example.com', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
@@ -0,0 +1,167 @@
+"""
+Tests for the response cache of repeated identical requests.
+"""
+
+import asyncio
+import pathlib
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from resumax_algo import gemini_model, response_cache
+from resumax_algo.models import AttachedFile, Conversation, ConversationsThread
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'responses'},
+}
+
+
+class TestResponseCacheBackends(SimpleTestCase):
+    """Test expiry, eviction and counters of the backends."""
+
+    def test_in_memory_eviction_and_stats(self):
+        """Test that the least recently used response is evicted and hits count their saved latency."""
+        cache = response_cache.InMemoryResponseCache(max_size=2)
+        cache.put("a", "Answer A", latency=4.0)
+        cache.put("b", "Answer B", latency=2.0)
+        cache.get("a")
+        cache.put("c", "Answer C", latency=1.0)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "Answer A")
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (2, 1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.667)
+        self.assertEqual(stats['saved_seconds'], 8.0)
+
+    def test_ttl_is_absolute(self):
+        """Test that entries expire TTL seconds after they were cached, however often they are read."""
+        cache = response_cache.InMemoryResponseCache(ttl=60)
+        with patch('resumax_algo.response_cache.time.time', return_value=1000.0):
+            cache.put("a", "Answer", latency=1.0)
+        with patch('resumax_algo.response_cache.time.time', return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_django_cache_backend(self):
+        """Test that responses are shared through the configured Django cache."""
+        writer = response_cache.CacheResponseCache(cache_alias='responses')
+        reader = response_cache.CacheResponseCache(cache_alias='responses')
+        writer.put("key", "Shared answer", latency=3.0)
+
+        self.assertEqual(reader.get("key"), "Shared answer")
+        self.assertEqual(reader.stats()['saved_seconds'], 3.0)
+
+
+class TestRequestKey(TestCase):
+    """Test what identifies a request."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        media = pathlib.Path(self.tmp_dir.name)
+        override = override_settings(MEDIA_ROOT=str(media))
+        override.enable()
+        self.addCleanup(override.disable)
+        (media / "first.pdf").write_bytes(b"resume v1")
+        (media / "copy.pdf").write_bytes(b"resume v1")
+        (media / "edited.pdf").write_bytes(b"resume v2")
+        self.media = media
+        self.user = User.objects.create_user(username='cacheuser', email='cache@example.com')
+        self.thread = ConversationsThread.objects.create(title="Thread", user=self.user)
+
+    def key(self, prompt, filename, thread_id=None):
+        return response_cache.request_key(prompt, [self.media / filename], thread_id, self.user.id)
+
+    def test_same_prompt_and_content_match(self):
+        """Test that whitespace, case and file names don't matter but file content does."""
+        self.assertEqual(self.key("Review my resume", "first.pdf"), self.key("  review my   Resume\n", "copy.pdf"))
+        self.assertNotEqual(self.key("Review my resume", "first.pdf"), self.key("Review my resume", "edited.pdf"))
+
+    def test_retry_after_saved_answer_matches(self):
+        """Test that a resubmission still matches once the first answer is saved, but a new turn doesn't."""
+        Conversation.objects.create(thread=self.thread, prompt="Hi", response="Hello!")
+        before = self.key("Review my resume", "first.pdf", self.thread.id)
+        saved = Conversation.objects.create(thread=self.thread, prompt="Review my resume", response="Critique")
+        AttachedFile.objects.create(conversation=saved, stored_filename="copy.pdf", file_type="application/pdf")
+
+        self.assertEqual(self.key("Review my resume", "first.pdf", self.thread.id), before)
+        Conversation.objects.create(thread=self.thread, prompt="Thanks", response="Welcome")
+        self.assertNotEqual(self.key("Review my resume", "first.pdf", self.thread.id), before)
+
+
+class StubChat:
+    def __init__(self):
+        self.sent = 0
+
+    def get_history(self, curated=False):
+        return []
+
+    def send_message(self, parts):
+        self.sent += 1
+        return SimpleNamespace(text="Fresh critique")
+
+
+@override_settings(RESUMAX_RESPONSE_CACHE={'ENABLED': True, 'OPTIONS': {'max_size': 10}})
+class TestCachedGeneration(TransactionTestCase):
+    """Test that repeated requests skip Gemini."""
+
+    def setUp(self):
+        response_cache.reset_response_cache()
+        self.addCleanup(response_cache.reset_response_cache)
+        self.user = User.objects.create_user(username='repeatuser', email='repeat@example.com')
+        self.thread = ConversationsThread.objects.create(title="Thread", user=self.user)
+
+    def test_repeat_is_served_from_cache(self):
+        """Test that the second identical request returns without sending a message and costs no tokens."""
+        chat = StubChat()
+
+        async def fake_prepare(promptText, fileUrls, thread_id, user_id, analysis=None):
+            return chat, [promptText]
+
+        async def ask():
+            usage = {}
+            text = await gemini_model.generate_response("Review my resume", thread_id=self.thread.id,
+                                                        user_id=self.user.id, usage=usage)
+            return text, usage
+
+        with patch.object(gemini_model, '_prepare_chat_message', fake_prepare), \
+                patch.object(gemini_model, '_save_chat_session', return_value=None):
+            first = asyncio.run(ask())
+            second = asyncio.run(ask())
+
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(chat.sent, 1)
+        self.assertEqual(second[1], {'input_tokens': 0, 'output_tokens': 0, 'cached': True})
+        stats = gemini_model.get_cache_stats()['response_cache']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    @override_settings(RESUMAX_GEMINI_CLIENT={'BACKEND': 'resumax_algo.fake_gemini.FakeClient',
+                                              'OPTIONS': {'latency': 0, 'upload_delay': 0}})
+    def test_hit_keeps_the_stored_chat(self):
+        """Test that a cache hit adds its turn to the stored chat and the next prompt doesn't rebuild it."""
+        for reset in (gemini_model.reset_genai_client, gemini_model.reset_chat_session_store):
+            reset()
+            self.addCleanup(reset)
+
+        async def ask(prompt):
+            return await gemini_model.generate_response(prompt, thread_id=self.thread.id, user_id=self.user.id)
+
+        with patch.object(gemini_model, '_base_knowledge_uris', []), \
+                patch.object(gemini_model, '_build_chat_session', wraps=gemini_model._build_chat_session) as build:
+            asyncio.run(ask("Review my resume"))
+            asyncio.run(ask("Review my resume"))
+            asyncio.run(ask("Now make it shorter"))
+
+        self.assertEqual(build.call_count, 1)
+        chat = gemini_model.get_chat_session_store().get(
+            gemini_model._get_session_key(self.thread.id, self.user.id), gemini_model._create_chat
+        )
+        prompts = [content.parts[0].text for content in chat.get_history(curated=True) if content.role == 'user']
+        self.assertEqual(prompts[-3:], ["Review my resume", "Review my resume", "Now make it shorter"])
+        self.assertEqual(gemini_model._get_genai_client().stats()['requests'], 2)
+
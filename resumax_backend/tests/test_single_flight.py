@@ -0,0 +1,122 @@
+"""
+Tests for single-flight deduplication of chat session builds.
+"""
+
+import asyncio
+import pathlib
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from resumax_algo import gemini_model
+from resumax_algo.models import ConversationsThread
+from resumax_algo.single_flight import SingleFlight
+
+
+class CountingClient:
+    """Fake genai client that counts uploads and chat creations."""
+
+    def __init__(self, upload_delay=0.05):
+        self.upload_delay = upload_delay
+        self.uploads = 0
+        self.chats_created = 0
+        self._lock = threading.Lock()
+        self.files = SimpleNamespace(upload=self._upload)
+        self.chats = SimpleNamespace(create=self._create_chat)
+
+    def _upload(self, file):
+        with self._lock:
+            self.uploads += 1
+            count = self.uploads
+        time.sleep(self.upload_delay)
+        return SimpleNamespace(uri=f"https://files.example/{count}", mime_type="application/pdf")
+
+    def _create_chat(self, **kwargs):
+        with self._lock:
+            self.chats_created += 1
+        return SimpleNamespace(
+            send_message=lambda parts: SimpleNamespace(text="Fake critique"),
+            get_history=lambda curated=False: [],
+        )
+
+
+class TestSingleFlight(SimpleTestCase):
+    """Test the SingleFlight primitive."""
+
+    def test_concurrent_callers_share_one_call(self):
+        """Test that concurrent callers of a key run the work once."""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", work) for _ in range(10)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results, ["result"] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.shared, 9)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_exception_is_shared_and_not_cached(self):
+        """Test that failures reach every waiter and the next call retries."""
+        flight = SingleFlight()
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+
+
+class TestConcurrentSessionBuilds(TransactionTestCase):
+    """Test that concurrent first messages build one session."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='flightuser', email='flight@example.com')
+        self.thread = ConversationsThread.objects.create(title="Thread", user=self.user)
+
+        self.base_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.base_dir.cleanup)
+        knowledge_dir = pathlib.Path(self.base_dir.name) / "base_knowledge"
+        knowledge_dir.mkdir()
+        (knowledge_dir / "guide.pdf").write_bytes(b"%PDF-1.4 resume guide")
+        (knowledge_dir / "samples.pdf").write_bytes(b"%PDF-1.4 resume samples")
+
+        gemini_model.clear_base_knowledge_cache()
+        gemini_model.reset_chat_session_store()
+        self.addCleanup(gemini_model.clear_base_knowledge_cache)
+        self.addCleanup(gemini_model.reset_chat_session_store)
+
+    async def test_fifty_concurrent_first_messages(self):
+        """Test that 50 concurrent first messages upload base knowledge once and create one chat."""
+        client = CountingClient()
+
+        with override_settings(BASE_DIR=pathlib.Path(self.base_dir.name)), \
+                patch.object(gemini_model, '_get_genai_client', return_value=client):
+            responses = await asyncio.gather(*(
+                gemini_model.generate_response("Review my resume", thread_id=self.thread.id, user_id=self.user.id)
+                for _ in range(50)
+            ))
+
+        self.assertEqual(responses, ["Fake critique"] * 50)
+        self.assertEqual(client.uploads, 2)
+        self.assertEqual(client.chats_created, 1)
@@ -0,0 +1,96 @@
+"""
+Tests for bulk thread deletion.
+"""
+
+import json
+import pathlib
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from resumax_algo.extraction import sidecar_path
+from resumax_algo.models import AttachedFile, Conversation, ConversationsThread, CritiqueJob
+from resumax_algo.thread_deletion import delete_threads
+
+
+class TestDeleteThreads(TestCase):
+    """Test deleting threads with their rows and stored files."""
+
+    def setUp(self):
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_dir.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.media = pathlib.Path(self.media_dir.name)
+        self.user = User.objects.create_user(username='bulkuser', email='bulk@example.com')
+        self.other = User.objects.create_user(username='otheruser', email='other@example.com')
+        self.client.force_login(self.user)
+
+    def make_thread(self, turns, user=None, stored_filename=None):
+        thread = ConversationsThread.objects.create(title="Thread", user=user or self.user)
+        for turn in range(turns):
+            conversation = Conversation.objects.create(thread=thread, prompt=f"Prompt {turn}", response="Answer")
+            filename = stored_filename or f"user_{thread.user_id}/{thread.id}-{turn}.pdf"
+            path = self.media / filename
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"%PDF-")
+            sidecar_path(path).write_text("extracted")
+            AttachedFile.objects.create(conversation=conversation, stored_filename=filename,
+                                        original_filename="resume.pdf", file_type="application/pdf")
+        CritiqueJob.objects.create(user=thread.user, thread=thread, prompt="Review")
+        return thread
+
+    def count_queries(self, thread):
+        with CaptureQueriesContext(connection) as queries:
+            deleted, cleanup = delete_threads(self.user.id, [thread.id])
+        self.assertEqual(deleted, [thread.id])
+        cleanup.result()
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_thread_size(self):
+        """Test that deleting a thread of 40 turns takes as many queries as one of a single turn."""
+        small = self.count_queries(self.make_thread(1))
+        large = self.count_queries(self.make_thread(40))
+
+        self.assertEqual(small, large)
+        self.assertFalse(ConversationsThread.objects.exists())
+        self.assertFalse(Conversation.objects.exists())
+        self.assertFalse(AttachedFile.objects.exists())
+        self.assertFalse(CritiqueJob.objects.exists())
+        self.assertEqual([path for path in self.media.rglob("*") if path.is_file()], [])
+
+    def test_shared_files_and_other_users_are_kept(self):
+        """Test that a file still attached elsewhere and other users' threads survive."""
+        shared = f"user_{self.user.id}/shared.pdf"
+        deleted_thread = self.make_thread(2, stored_filename=shared)
+        kept_thread = self.make_thread(1, stored_filename=shared)
+        foreign_thread = self.make_thread(1, user=self.other)
+
+        deleted, cleanup = delete_threads(self.user.id, [deleted_thread.id, foreign_thread.id])
+
+        self.assertEqual(deleted, [deleted_thread.id])
+        self.assertIsNone(cleanup)
+        self.assertTrue((self.media / shared).exists())
+        self.assertEqual(AttachedFile.objects.filter(conversation__thread=kept_thread).count(), 1)
+        self.assertTrue(ConversationsThread.objects.filter(id=foreign_thread.id).exists())
+
+    def test_bulk_delete_endpoint(self):
+        """Test that DELETE /api/threads/ deletes the listed threads and reports the unknown ids."""
+        first, second, kept = self.make_thread(1), self.make_thread(2), self.make_thread(1)
+
+        response = self.client.delete('/api/threads/', json.dumps({"ids": [first.id, second.id, 999]}),
+                                      content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"deleted": [first.id, second.id], "not_found": [999], "count": 2})
+        self.assertEqual(list(ConversationsThread.objects.values_list('id', flat=True)), [kept.id])
+
+    def test_bulk_delete_endpoint_validates_ids(self):
+        """Test that a body without a list of integer ids is rejected."""
+        for body in ('{"ids": "1"}', '{"ids": [1.5]}', '[1, 2]', 'not json'):
+            response = self.client.delete('/api/threads/', body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
@@ -0,0 +1,84 @@
+"""
+Tests for paginated thread history on GET /api/threads/<id>/.
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from resumax_algo.models import ConversationsThread, Conversation, AttachedFile
+
+
+class TestThreadHistoryPagination(TestCase):
+    """Test cursor pagination and query counts of the thread history endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pageuser', email='page@example.com')
+        cls.thread = ConversationsThread.objects.create(title="Long thread", user=cls.user)
+        Conversation.objects.bulk_create([
+            Conversation(thread=cls.thread, prompt=f"Prompt {i}", response=f"Response {i}")
+            for i in range(500)
+        ])
+        conversations = list(Conversation.objects.filter(thread=cls.thread).order_by('id'))
+        cls.conversation_ids = [conversation.id for conversation in conversations]
+        AttachedFile.objects.bulk_create([
+            AttachedFile(conversation=conversation, original_filename=f"resume_{i}.pdf")
+            for i, conversation in enumerate(conversations)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_page(self, **params):
+        return self.client.get(f'/api/threads/{self.thread.id}/', params)
+
+    def test_first_page_is_the_latest_messages(self):
+        """Test that the default page holds the newest messages in chronological order."""
+        data = self.get_page(limit=20).json()
+
+        prompts = [conversation["prompt"] for conversation in data["conversations"]]
+        self.assertEqual(prompts, [f"Prompt {i}" for i in range(480, 500)])
+        self.assertTrue(data["has_more"])
+        self.assertEqual(data["next_before"], self.conversation_ids[480])
+        self.assertEqual(data["conversations"][0]["attachedFiles"], ["resume_480.pdf"])
+
+    def test_cursor_walks_back_to_the_start(self):
+        """Test that following next_before returns every message exactly once."""
+        seen = []
+        before = None
+        while True:
+            params = {'limit': 200}
+            if before:
+                params['before'] = before
+            data = self.get_page(**params).json()
+            seen = [conversation["id"] for conversation in data["conversations"]] + seen
+            if not data["has_more"]:
+                break
+            before = data["next_before"]
+
+        self.assertEqual(seen, self.conversation_ids)
+        self.assertIsNone(data["next_before"])
+
+    def test_query_count_is_constant_for_500_turn_thread(self):
+        """Test that a page costs the same number of queries however long the thread is."""
+        self.get_page(limit=200)  # warm up the session and user lookups
+        # session, user, thread, conversation page, attached files
+        with self.assertNumQueries(5):
+            response = self.get_page(limit=200)
+        self.assertEqual(len(response.json()["conversations"]), 200)
+
+    def test_invalid_parameters_return_400(self):
+        """Test that malformed cursors and limits are rejected."""
+        self.assertEqual(self.get_page(before="abc").status_code, 400)
+        self.assertEqual(self.get_page(limit=0).status_code, 400)
+
+    def test_limit_is_capped(self):
+        """Test that the page size can't exceed the maximum."""
+        data = self.get_page(limit=10000).json()
+        self.assertEqual(len(data["conversations"]), 200)
+
+    def test_other_users_thread_is_not_found(self):
+        """Test that threads are scoped to their owner."""
+        other = User.objects.create_user(username='other', email='other@example.com')
+        self.client.force_login(other)
+        self.assertEqual(self.get_page().status_code, 404)
@@ -0,0 +1,95 @@
+"""
+Tests for the paginated thread list on GET /api/threads/.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from resumax_algo.models import ConversationsThread
+
+
+class TestThreadListPagination(TestCase):
+    """Test keyset pagination and conditional requests of the thread list endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='listuser', email='list@example.com')
+        ConversationsThread.objects.bulk_create([
+            ConversationsThread(title=f"Thread {i}", user=cls.user) for i in range(120)
+        ])
+        # Spread activity out, with ties to exercise the id tie-breaker
+        now = timezone.now()
+        for i, thread in enumerate(ConversationsThread.objects.filter(user=cls.user).order_by('id')):
+            ConversationsThread.objects.filter(id=thread.id).update(updated_at=now - timedelta(minutes=(120 - i) // 2))
+        cls.expected_ids = list(
+            ConversationsThread.objects.filter(user=cls.user).order_by('-updated_at', '-id').values_list('id', flat=True)
+        )
+        other = User.objects.create_user(username='otheruser', email='other@example.com')
+        ConversationsThread.objects.create(title="Not mine", user=other)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_pages_cover_all_threads_in_order(self):
+        """Test that following next_cursor returns every thread once, most recently active first."""
+        ids, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 25, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get('/api/threads/', params).json()
+            ids += [thread["id"] for thread in data["threads"]]
+            pages += 1
+            cursor = data["next_cursor"]
+            if not data["has_more"]:
+                break
+
+        self.assertEqual(ids, self.expected_ids)
+        self.assertEqual(pages, 5)
+        self.assertIsNone(cursor)
+        self.assertEqual(data["total"], 120)
+
+    def test_default_page_size(self):
+        """Test that the first page is capped at the default page size."""
+        data = self.client.get('/api/threads/').json()
+        self.assertEqual(len(data["threads"]), 50)
+        self.assertEqual(set(data["threads"][0]), {"id", "title", "created_at", "updated_at"})
+
+    def test_invalid_params_return_400(self):
+        """Test that malformed cursors and limits are rejected."""
+        for params in ({'cursor': 'not-a-cursor'}, {'limit': 'abc'}, {'limit': 0}):
+            self.assertEqual(self.client.get('/api/threads/', params).status_code, 400)
+
+    def test_constant_query_count(self):
+        """Test that a page costs the same number of queries however many threads there are."""
+        # session + user + state aggregate + page
+        with self.assertNumQueries(4):
+            self.client.get('/api/threads/', {'limit': 100})
+
+    def test_etag_revalidation(self):
+        """Test that an unchanged list returns 304 and a new thread invalidates it."""
+        response = self.client.get('/api/threads/')
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        response = self.client.get('/api/threads/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        ConversationsThread.objects.create(title="New", user=self.user)
+        response = self.client.get('/api/threads/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_deleting_a_thread_changes_the_etag(self):
+        """Test that removing an older thread invalidates the cached list."""
+        etag = self.client.get('/api/threads/')["ETag"]
+        ConversationsThread.objects.filter(id=self.expected_ids[-1]).delete()
+        response = self.client.get('/api/threads/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        """Test that Last-Modified revalidation returns 304 when nothing changed."""
+        last_modified = self.client.get('/api/threads/')["Last-Modified"]
+        response = self.client.get('/api/threads/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,190 @@
+"""
+Tests for thread-level retrieval of earlier turns and file passages.
+"""
+
+import asyncio
+import pathlib
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from resumax_algo import extraction, gemini_model, retrieval
+from resumax_algo.models import AttachedFile, Conversation, ConversationsThread
+
+RETRIEVAL = {'ENABLED': True, 'RECENT_TURNS': 2, 'TOP_K': 2, 'MAX_CONTEXT_CHARS': 3000}
+
+TOPICS = [
+    ("How should I format my education section?", "List your degree, university and graduation date first."),
+    ("Is a two page resume okay for a PhD student?", "Two pages are fine for graduate students with publications."),
+    ("Which action verbs are strongest for leadership?", "Use spearheaded, directed and mentored for leadership bullets."),
+    ("Should I include my GPA?", "Include a GPA of 3.5 or higher."),
+    ("How do I describe my internship at the bank?", "Quantify the trading reports you automated at the bank."),
+]
+
+
+class TestRetrievalIndex(SimpleTestCase):
+    """Test the hashing embedder, chunking and exact search."""
+
+    def test_embeddings_are_normalized_and_stable(self):
+        """Test that vectors have unit length and don't depend on the process."""
+        embedder = retrieval.HashingEmbedder(dimensions=512)
+        vectors = embedder.embed(["Python data pipeline", "Python data pipeline", ""])
+
+        self.assertEqual(vectors.shape, (3, 512))
+        np.testing.assert_allclose(np.linalg.norm(vectors[:2], axis=1), 1, rtol=1e-5)
+        np.testing.assert_array_equal(vectors[0], vectors[1])
+        self.assertFalse(vectors[2].any())
+
+    def test_related_text_is_closer(self):
+        """Test that text sharing words scores higher than unrelated text."""
+        embedder = retrieval.HashingEmbedder()
+        query, related, unrelated = embedder.embed([
+            "format the education section",
+            "Put the education section first and format dates consistently",
+            "Negotiate your salary after the offer",
+        ])
+
+        self.assertGreater(query @ related, query @ unrelated)
+
+    def test_chunks_are_bounded(self):
+        """Test that chunks respect the size limit and keep every word."""
+        text = "\n\n".join(f"Paragraph {i} " + "word " * (i * 40) for i in range(1, 8))
+
+        chunks = retrieval.chunk_text(text, 300)
+
+        self.assertTrue(all(len(chunk) <= 300 for chunk in chunks))
+        self.assertEqual(" ".join(chunks).split(), text.split())
+
+    def test_search_excludes_conversations(self):
+        """Test that excluded conversations are never returned."""
+        index = retrieval.ThreadIndex(retrieval.HashingEmbedder())
+        index.add([1, 2], [
+            {'conversation_id': 1, 'label': 'a', 'text': 'education section order'},
+            {'conversation_id': 2, 'label': 'b', 'text': 'education section dates'},
+        ])
+
+        results = index.search("education section", 5, exclude_conversations=[2])
+
+        self.assertEqual([chunk['conversation_id'] for _, chunk in results], [1])
+
+
+@override_settings(RESUMAX_RETRIEVAL=RETRIEVAL)
+class TestThreadRetrieval(TestCase):
+    """Test per-thread indexes and the context attached to prompts."""
+
+    def setUp(self):
+        retrieval.reset_indexes()
+        self.addCleanup(retrieval.reset_indexes)
+        self.user = User.objects.create_user(username='raguser', email='rag@example.com')
+        self.thread = ConversationsThread.objects.create(title="Resume help", user=self.user)
+
+    def add_turns(self, turns):
+        return [
+            Conversation.objects.create(thread=self.thread, prompt=prompt, response=response)
+            for prompt, response in turns
+        ]
+
+    def test_relevant_earlier_turn_is_retrieved(self):
+        """Test that the most similar earlier turn is attached, not the recent window."""
+        self.add_turns(TOPICS)
+
+        context = retrieval.build_context(self.thread.id, "What about the education section format?")
+
+        self.assertIn("List your degree", context)
+        # The last two turns are replayed verbatim, so they aren't retrieved
+        self.assertNotIn("trading reports", context)
+        self.assertNotIn("GPA", context)
+
+    def test_index_is_updated_incrementally(self):
+        """Test that only conversations added since the last lookup are indexed."""
+        self.add_turns(TOPICS[:2])
+        index = retrieval.get_thread_index(self.thread.id)
+        chunk_count = len(index.chunks)
+
+        new, = self.add_turns(TOPICS[2:3])
+        with self.assertNumQueries(2):
+            index = retrieval.get_thread_index(self.thread.id)
+
+        self.assertEqual(index.last_conversation_id, new.id)
+        self.assertEqual(len(index.chunks), chunk_count + 1)
+
+    def test_deleted_turns_are_forgotten(self):
+        """Test that deleting a conversation drops the thread's index."""
+        first, *_ = self.add_turns(TOPICS)
+        retrieval.get_thread_index(self.thread.id)
+
+        first.delete()
+
+        self.assertNotIn("List your degree", retrieval.build_context(self.thread.id, "education section format"))
+
+    def test_file_passages_have_page_anchors(self):
+        """Test that attached files are indexed page by page from their extraction."""
+        with tempfile.TemporaryDirectory() as media_dir, override_settings(MEDIA_ROOT=media_dir):
+            path = pathlib.Path(media_dir) / "notes.txt"
+            path.write_text("Volunteer tutoring at the Loeb center every weekend.")
+            extraction.extract_file(path, "text/plain")
+            conversation, = self.add_turns([("Here are my notes", "Thanks")])
+            AttachedFile.objects.create(conversation=conversation, original_filename="notes.txt",
+                                        stored_filename="notes.txt", file_path="/user_uploads/notes.txt",
+                                        file_type="text/plain")
+            self.add_turns(TOPICS[:2])
+
+            context = retrieval.build_context(self.thread.id, "volunteer tutoring weekend")
+
+        self.assertIn("--- notes.txt ---\nVolunteer tutoring", context)
+
+
+class StubClient:
+    """Stub genai client that records the history of every chat it creates."""
+
+    def __init__(self):
+        self.histories = []
+        self.chats = SimpleNamespace(create=self._create_chat)
+
+    def _create_chat(self, model, config, history):
+        self.histories.append(history)
+        return SimpleNamespace()
+
+
+@override_settings(RESUMAX_RETRIEVAL=RETRIEVAL)
+class TestPromptSize(TransactionTestCase):
+    """Test that prompts stay bounded as a thread grows."""
+
+    def setUp(self):
+        retrieval.reset_indexes()
+        self.addCleanup(retrieval.reset_indexes)
+        gemini_model.reset_chat_session_store()
+        self.addCleanup(gemini_model.reset_chat_session_store)
+        self.user = User.objects.create_user(username='sizeuser', email='size@example.com')
+        self.thread = ConversationsThread.objects.create(title="Long thread", user=self.user)
+
+    def prompt_size(self, client):
+        with patch.object(gemini_model, '_get_genai_client', return_value=client), \
+                patch.object(gemini_model, 'upload_base_knowledge_files', return_value=[]):
+            chat, parts = asyncio.run(gemini_model._prepare_chat_message(
+                "Review the education section again", None, self.thread.id, self.user.id
+            ))
+        history_chars = sum(len(part['text']) for turn in client.histories[-1] for part in turn['parts'] if 'text' in part)
+        return history_chars + sum(len(part.text) for part in parts)
+
+    def test_prompt_size_is_bounded(self):
+        """Test that 60 turns cost no more than 20 and only the recent window is replayed."""
+        def add(count):
+            for i in range(count):
+                prompt, response = TOPICS[i % len(TOPICS)]
+                Conversation.objects.create(thread=self.thread, prompt=f"{prompt} ({i})", response=response * 5)
+
+        add(20)
+        client = StubClient()
+        small = self.prompt_size(client)
+        add(40)
+        large = self.prompt_size(client)
+
+        # The base knowledge note plus two recent turns
+        self.assertEqual(len(client.histories[-1]), 1 + 2 * RETRIEVAL['RECENT_TURNS'])
+        self.assertLessEqual(large, small * 1.2)
+        self.assertLess(large, RETRIEVAL['MAX_CONTEXT_CHARS'] + 2000)
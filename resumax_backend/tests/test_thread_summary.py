@@ -0,0 +1,185 @@
+"""
+Tests for rolling thread summaries.
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from resumax_algo import gemini_model, summarizer
+from resumax_algo.models import Conversation, ConversationsThread
+
+SUMMARY_SETTINGS = {
+    'ENABLED': True,
+    'RECENT_TURNS': 2,
+    'BATCH_TURNS': 2,
+    'BACKEND': 'resumax_algo.summarizer.StubSummarizer',
+    'OPTIONS': {'max_chars': 2000},
+}
+
+
+class RecordingSummarizer(summarizer.StubSummarizer):
+    """Stub summarizer that remembers the batches it was given."""
+
+    def __init__(self, max_chars=2000):
+        super().__init__(max_chars)
+        self.batches = []
+
+    def summarize(self, summary, turns):
+        self.batches.append([prompt for prompt, _ in turns])
+        return super().summarize(summary, turns)
+
+
+class TestStubSummarizer(SimpleTestCase):
+    """Test the offline summarizer."""
+
+    def test_one_line_per_turn(self):
+        """Test that each turn adds its prompt and the first sentence of the advice."""
+        summary = summarizer.StubSummarizer().summarize("", [
+            ("Review my CV", "Your publications need a consistent style. Also, list grants."),
+        ])
+
+        self.assertEqual(summary, "- Asked: Review my CV Advised: Your publications need a consistent style.")
+
+    def test_keeps_newest_lines_within_limit(self):
+        """Test that the oldest lines are dropped when the summary is over max_chars."""
+        stub = summarizer.StubSummarizer(max_chars=120)
+        summary = stub.summarize("", [(f"Question {i}", f"Answer {i}.") for i in range(5)])
+
+        self.assertLessEqual(len(summary), 120)
+        self.assertTrue(summary.endswith("Answer 4."))
+        self.assertNotIn("Question 0", summary)
+
+
+@override_settings(RESUMAX_SUMMARY=SUMMARY_SETTINGS)
+class TestThreadSummary(TestCase):
+    """Test folding turns into the thread summary."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='summaryuser', email='summary@example.com')
+        self.thread = ConversationsThread.objects.create(title="Long thread", user=self.user)
+
+    def add_turns(self, start, count):
+        for i in range(start, start + count):
+            Conversation.objects.create(thread=self.thread, prompt=f"Prompt {i}", response=f"Response {i}.")
+
+    def test_summary_is_updated_incrementally(self):
+        """Test that only turns older than the recent window are folded, each once, in batches."""
+        self.add_turns(0, 5)
+        stub = RecordingSummarizer()
+
+        self.assertEqual(summarizer.update_thread_summary(self.thread.id, stub), 2)
+        self.add_turns(5, 1)
+        self.assertEqual(summarizer.update_thread_summary(self.thread.id, stub), 2)
+        self.assertEqual(summarizer.update_thread_summary(self.thread.id, stub), 0)
+
+        self.assertEqual(stub.batches, [["Prompt 0", "Prompt 1"], ["Prompt 2", "Prompt 3"]])
+        self.thread.refresh_from_db()
+        self.assertIn("Prompt 3", self.thread.summary)
+        self.assertNotIn("Prompt 4", self.thread.summary)
+        self.assertEqual(self.thread.summarized_through,
+                         Conversation.objects.get(prompt="Prompt 3").id)
+
+    def store_chat(self, turns):
+        store = gemini_model.get_chat_session_store()
+        key = gemini_model._get_session_key(self.thread.id, self.user.id)
+        history = [
+            {'role': role, 'parts': [{'text': f"{role} message {i} " * 20}]} for i in range(turns) for role in ('user', 'model')
+        ]
+        store.put(key, SimpleNamespace(get_history=lambda curated=False: history))
+        self.addCleanup(store.delete, key)
+        return lambda: store.get(key, gemini_model._create_chat)
+
+    @override_settings(RESUMAX_TOKEN_BUDGET={'HISTORY_TOKENS': 500})
+    def test_update_drops_long_stored_chat(self):
+        """Test that a chat over the history budget is dropped so the next prompt is rebuilt from the summary."""
+        stored_chat = self.store_chat(turns=4)
+        self.add_turns(0, 4)
+
+        summarizer.update_thread_summary(self.thread.id)
+
+        self.assertIsNone(stored_chat())
+
+    @override_settings(RESUMAX_TOKEN_BUDGET={'HISTORY_TOKENS': 500})
+    def test_short_stored_chat_survives_new_turns(self):
+        """Test that a new turn doesn't drop the chat: turns wait for a full batch, and short chats are kept."""
+        stored_chat = self.store_chat(turns=1)
+        self.add_turns(0, 3)
+
+        self.assertEqual(summarizer.update_thread_summary(self.thread.id), 0)
+        self.assertIsNotNone(stored_chat())
+
+        self.add_turns(3, 1)
+        self.assertEqual(summarizer.update_thread_summary(self.thread.id), 2)
+        self.assertIsNotNone(stored_chat())
+
+    def test_saving_a_turn_schedules_an_update(self):
+        """Test that a new conversation queues a summary update once committed."""
+        with patch.object(summarizer, 'schedule_summary_update') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.add_turns(0, 1)
+
+        schedule.assert_called_once_with(self.thread.id)
+
+
+class TestSummaryHistory(TransactionTestCase):
+    """Test rebuilding chat history from the summary."""
+
+    @override_settings(RESUMAX_SUMMARY=SUMMARY_SETTINGS)
+    def test_history_is_summary_plus_recent_turns(self):
+        """Test that history rebuilds send the summary and only the turns it doesn't cover."""
+        user = User.objects.create_user(username='historyuser', email='history@example.com')
+        thread = ConversationsThread.objects.create(title="Thread", user=user)
+        with patch.object(summarizer, 'schedule_summary_update'):
+            for i in range(6):
+                Conversation.objects.create(thread=thread, prompt=f"Prompt {i}", response=f"Response {i}.")
+        summarizer.update_thread_summary(thread.id)
+
+        history = asyncio.run(gemini_model._get_conversation_history(thread.id, max_history=15))
+
+        self.assertTrue(history[0]['parts'][0]['text'].startswith(summarizer.SUMMARY_HEADER))
+        self.assertIn("Prompt 3", history[0]['parts'][0]['text'])
+        self.assertEqual([message['parts'][0]['text'] for message in history[2::2]], ["Prompt 4", "Prompt 5"])
+
+
+class TestSummaryScheduler(TransactionTestCase):
+    """Test running summary updates in the background."""
+
+    @override_settings(RESUMAX_SUMMARY=SUMMARY_SETTINGS)
+    def test_background_update(self):
+        """Test that the scheduler updates the summary from a worker thread."""
+        user = User.objects.create_user(username='scheduser', email='sched@example.com')
+        thread = ConversationsThread.objects.create(title="Thread", user=user)
+        with patch.object(summarizer, 'schedule_summary_update'):
+            for i in range(4):
+                Conversation.objects.create(thread=thread, prompt=f"Prompt {i}", response=f"Response {i}.")
+
+        summarizer.SummaryScheduler(max_workers=1).schedule(thread.id).result(timeout=10)
+
+        thread.refresh_from_db()
+        self.assertIn("Prompt 1", thread.summary)
+
+    def test_turn_saved_during_update_reruns_it(self):
+        """Test that a thread scheduled while it is being summarized is summarized again, not in parallel."""
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_update(thread_id):
+            calls.append(thread_id)
+            started.set()
+            release.wait(timeout=10)
+
+        scheduler = summarizer.SummaryScheduler(max_workers=2)
+        with patch.object(summarizer, 'update_thread_summary', slow_update):
+            future = scheduler.schedule(7)
+            started.wait(timeout=10)
+            self.assertIsNone(scheduler.schedule(7))
+            self.assertIsNone(scheduler.schedule(7))
+            release.set()
+            future.result(timeout=10)
+
+        self.assertEqual(calls, [7, 7])
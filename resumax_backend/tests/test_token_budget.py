@@ -0,0 +1,157 @@
+"""
+Tests for token accounting and history trimming.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from resumax_algo import gemini_model, summarizer, token_budget
+from resumax_algo.models import Conversation, ConversationsThread
+
+
+def turn(prompt, response):
+    return [{'role': 'user', 'parts': [{'text': prompt}]}, {'role': 'model', 'parts': [{'text': response}]}]
+
+
+class StubChat:
+    """Chat exposing the history and recording the sent message, with usage metadata."""
+
+    def __init__(self, history, cached_content=None):
+        self.history = history
+        self.cached_content = cached_content
+        self.sent = None
+
+    def get_history(self, curated=False):
+        return self.history
+
+    def send_message(self, parts):
+        self.sent = parts
+        return SimpleNamespace(text="Tighten the summary.", usage_metadata=SimpleNamespace(
+            prompt_token_count=1234, candidates_token_count=56, thoughts_token_count=100,
+        ))
+
+
+class TestTokenEstimates(SimpleTestCase):
+    """Test estimating, trimming and reading token counts."""
+
+    def test_trim_keeps_newest_whole_turns(self):
+        """Test that the oldest turns are dropped first and turns are never split."""
+        turns = turn("a" * 400, "b" * 400) + turn("c" * 40, "d" * 40) + turn("e" * 40, "f" * 40)
+
+        kept, tokens = token_budget.trim_history(turns, budget=60)
+
+        self.assertEqual([m['parts'][0]['text'][0] for m in kept], ['c', 'd', 'e', 'f'])
+        self.assertEqual(tokens, 40)
+
+    def test_files_are_counted(self):
+        """Test that file parts count FILE_TOKENS and text parts their length."""
+        parts = [{'text': "x" * 40}, {'file_data': {'file_uri': "https://files.example/1"}}]
+
+        self.assertEqual(token_budget.content_tokens([{'role': 'user', 'parts': parts}], file_tokens=500), 510)
+
+    @override_settings(RESUMAX_TOKEN_BUDGET={'ENABLED': True, 'HISTORY_TOKENS': 1000, 'MAX_INPUT_TOKENS': 400})
+    def test_request_ceiling_keeps_context(self):
+        """Test that the history shrinks to fit the input ceiling and the reference documents are kept."""
+        context = {'role': 'model', 'parts': [{'text': "Reference documents"}]}
+        history = [context] + turn("a" * 400, "b" * 400) + turn("c" * 200, "d" * 200)
+
+        kept, estimate = token_budget.fit_request("s" * 400, history, [{'text': "q" * 400}])
+
+        self.assertEqual(kept[0], context)
+        self.assertEqual(len(kept), 3)
+        self.assertEqual(estimate['dropped_messages'], 2)
+        self.assertLessEqual(estimate['estimated_input_tokens'], 400)
+
+    @override_settings(RESUMAX_TOKEN_BUDGET={'ENABLED': True, 'HISTORY_TOKENS': 150})
+    def test_summary_is_kept_when_trimming(self):
+        """Test that an over-budget thread drops its oldest turns, never the summary of the earlier ones."""
+        context = {'role': 'model', 'parts': [{'text': "Reference documents"}]}
+        summary = summarizer.summary_messages("- Asked: Review my CV Advised: List grants.")
+        history = [context] + summary + turn("a" * 400, "b" * 400) + turn("c" * 200, "d" * 200)
+
+        kept, estimate = token_budget.fit_request("", history, [])
+
+        self.assertEqual(kept[:3], [context] + summary)
+        self.assertEqual([m['parts'][0]['text'][0] for m in kept[3:]], ['c', 'd'])
+        self.assertEqual(estimate['dropped_messages'], 2)
+
+    def test_disabled_budget_only_estimates(self):
+        """Test that without the budget the history is kept whole but still counted."""
+        history = turn("a" * 400, "b" * 400)
+
+        kept, estimate = token_budget.fit_request("", history, [])
+
+        self.assertEqual(kept, history)
+        self.assertEqual(estimate['history_tokens'], 200)
+
+    def test_response_usage_prefers_metadata(self):
+        """Test that Gemini's counts win, with thinking tokens as output, and estimates fill in otherwise."""
+        estimate = {'estimated_input_tokens': 900}
+
+        self.assertEqual(token_budget.response_usage(StubChat([]).send_message([]), estimate),
+                         {'input_tokens': 1234, 'output_tokens': 156})
+        self.assertEqual(token_budget.response_usage(SimpleNamespace(text="x" * 40), estimate, "x" * 40),
+                         {'input_tokens': 900, 'output_tokens': 10})
+
+
+class TestTokenBudgetRequests(TransactionTestCase):
+    """Test trimming chats and recording token counts on conversations."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='tokenuser', email='tokens@example.com')
+        self.thread = ConversationsThread.objects.create(title="Tokens", user=self.user)
+
+    @override_settings(RESUMAX_TOKEN_BUDGET={'ENABLED': True, 'HISTORY_TOKENS': 150})
+    def test_history_rebuild_stops_at_budget(self):
+        """Test that rebuilding from the database reads only the newest turns that fit."""
+        for i in range(5):
+            Conversation.objects.create(thread=self.thread, prompt=f"Prompt {i} " + "p" * 200, response="ok")
+
+        history = asyncio.run(gemini_model._get_conversation_history(self.thread.id, max_history=50))
+
+        self.assertEqual([message['parts'][0]['text'][:8] for message in history[::2]], ["Prompt 3", "Prompt 4"])
+
+    @override_settings(RESUMAX_TOKEN_BUDGET={'ENABLED': True, 'HISTORY_TOKENS': 100})
+    def test_long_session_is_trimmed_before_sending(self):
+        """Test that a stored chat over budget is replaced by a trimmed one and usage is reported."""
+        chat = StubChat(turn("old " * 100, "old") + turn("new", "new"))
+        created = []
+
+        async def fake_prepare(promptText, fileUrls, thread_id, user_id, analysis=None):
+            return chat, [{'text': promptText}]
+
+        def fake_create_chat(history, cached_content=None):
+            created.append(StubChat(history, cached_content))
+            return created[-1]
+
+        usage = {}
+        with patch.object(gemini_model, '_prepare_chat_message', fake_prepare), \
+                patch.object(gemini_model, '_create_chat', fake_create_chat), \
+                patch.object(gemini_model, '_save_chat_session', return_value=None) as save:
+            text = asyncio.run(gemini_model.generate_response("Review", thread_id=self.thread.id, user_id=1,
+                                                              usage=usage))
+
+        self.assertEqual(text, "Tighten the summary.")
+        self.assertEqual(created[0].history, turn("new", "new"))
+        self.assertEqual(created[0].sent, [{'text': "Review"}])
+        save.assert_called_once_with(self.thread.id, 1, created[0])
+        self.assertEqual((usage['input_tokens'], usage['output_tokens'], usage['dropped_messages']), (1234, 156, 2))
+
+    def test_counts_are_saved_on_the_conversation(self):
+        """Test that the view stores the usage generate_response reports."""
+        self.client.force_login(self.user)
+
+        async def fake_generate(promptText, fileUrls=None, thread_id=None, user_id=None, analysis=None, usage=None):
+            usage.update(input_tokens=812, output_tokens=97)
+            return "Looks good"
+
+        with patch('resumax_api.views.generate_response', fake_generate):
+            response = self.client.post(f'/api/threads/{self.thread.id}/', {'prompt-text': 'Review my resume'})
+
+        self.assertEqual(response.status_code, 200)
+        conversation = Conversation.objects.get(thread=self.thread)
+        self.assertEqual((conversation.input_tokens, conversation.output_tokens), (812, 97))
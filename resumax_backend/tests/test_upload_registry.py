@@ -0,0 +1,113 @@
+"""
+Tests for the content-addressed Gemini upload registry.
+"""
+
+import tempfile
+import pathlib
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from resumax_algo import upload_registry
+from resumax_algo.models import RemoteFileUpload
+
+
+def make_fake_client():
+    """Create a fake client whose uploads return unique URIs."""
+    client = MagicMock()
+    client.files.upload.side_effect = lambda file: SimpleNamespace(
+        uri=f"https://files.example/{client.files.upload.call_count}",
+        mime_type="application/pdf",
+        expiration_time=timezone.now() + timedelta(hours=48),
+    )
+    return client
+
+
+class TestUploadRegistry(TestCase):
+    """Test upload reuse and expiry handling."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file_path = pathlib.Path(self.tmp_dir.name) / "resume.pdf"
+        self.file_path.write_bytes(b"%PDF-1.4 resume content")
+        upload_registry.reset_stats()
+
+    def test_same_content_is_uploaded_once(self):
+        """Test that a second request for the same file reuses the URI."""
+        client = make_fake_client()
+
+        first_uri, _ = upload_registry.get_or_upload(client, self.file_path, "application/pdf")
+        second_uri, mime_type = upload_registry.get_or_upload(client, self.file_path, "application/pdf")
+
+        self.assertEqual(first_uri, second_uri)
+        self.assertEqual(mime_type, "application/pdf")
+        self.assertEqual(client.files.upload.call_count, 1)
+        self.assertEqual(upload_registry.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_concurrent_registration_uses_the_first_row(self):
+        """Test that losing the race to register the same content returns the winner's URI."""
+        client = make_fake_client()
+        content_hash = upload_registry.hash_file(self.file_path)
+
+        def register_concurrently(**kwargs):
+            RemoteFileUpload.objects.create(content_hash=content_hash, file_uri="https://files.example/other",
+                                            mime_type="application/pdf",
+                                            expires_at=timezone.now() + timedelta(hours=48))
+            raise IntegrityError("UNIQUE constraint failed: resumax_algo_remotefileupload.content_hash")
+
+        with patch.object(RemoteFileUpload.objects, 'update_or_create', side_effect=register_concurrently):
+            uri, mime_type = upload_registry.get_or_upload(client, self.file_path)
+
+        self.assertEqual((uri, mime_type), ("https://files.example/other", "application/pdf"))
+
+    def test_copy_with_same_content_hits_registry(self):
+        """Test that files are keyed by content rather than by path."""
+        client = make_fake_client()
+        copy_path = pathlib.Path(self.tmp_dir.name) / "copy.pdf"
+        copy_path.write_bytes(self.file_path.read_bytes())
+
+        upload_registry.get_or_upload(client, self.file_path)
+        upload_registry.get_or_upload(client, copy_path)
+
+        self.assertEqual(client.files.upload.call_count, 1)
+        self.assertEqual(RemoteFileUpload.objects.count(), 1)
+
+    def test_expired_upload_is_refreshed(self):
+        """Test that an expired record triggers a new upload."""
+        client = make_fake_client()
+        upload_registry.get_or_upload(client, self.file_path)
+        RemoteFileUpload.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        uri, _ = upload_registry.get_or_upload(client, self.file_path)
+
+        self.assertEqual(client.files.upload.call_count, 2)
+        record = RemoteFileUpload.objects.get()
+        self.assertEqual(record.file_uri, uri)
+        self.assertGreater(record.expires_at, timezone.now())
+
+    @override_settings(RESUMAX_UPLOAD_TTL=timedelta(hours=1))
+    def test_missing_expiration_uses_configured_ttl(self):
+        """Test that the TTL setting applies when the SDK reports no expiry."""
+        client = MagicMock()
+        client.files.upload.return_value = SimpleNamespace(uri="https://files.example/1")
+
+        upload_registry.get_or_upload(client, self.file_path, "application/pdf")
+
+        record = RemoteFileUpload.objects.get()
+        self.assertLess(record.expires_at, timezone.now() + timedelta(hours=2))
+        self.assertEqual(record.mime_type, "application/pdf")
+
+    def test_cache_stats_include_registry(self):
+        """Test that get_cache_stats reports registry counters."""
+        from resumax_algo.gemini_model import get_cache_stats
+
+        client = make_fake_client()
+        upload_registry.get_or_upload(client, self.file_path)
+
+        stats = get_cache_stats()
+        self.assertEqual(stats['upload_registry']['misses'], 1)
@@ -0,0 +1,207 @@
+"""
+Tests for the on-disk Document vector store.
+"""
+
+import asyncio
+import io
+import json
+import pathlib
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from resumax_algo import gemini_model, vector_store
+from resumax_algo.models import Document
+
+PASSAGES = [
+    ("Action verbs", "Start every bullet with a strong action verb such as led, built or designed."),
+    ("Cover letters", "A cover letter should be one page and address the hiring manager by name."),
+    ("Academic CV", "List publications in reverse chronological order on an academic CV."),
+]
+
+
+class VectorStoreTestMixin:
+    """Point the vector store at a temporary directory and enable it."""
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.store_dir.cleanup)
+        override = override_settings(RESUMAX_VECTOR_STORE={'ENABLED': True, 'PATH': self.store_dir.name, 'TOP_K': 2})
+        override.enable()
+        self.addCleanup(override.disable)
+        vector_store.reset_vector_store()
+        self.addCleanup(vector_store.reset_vector_store)
+
+    def create_documents(self, passages=PASSAGES):
+        return [Document.objects.create(title=title, content=content) for title, content in passages]
+
+
+class TestVectorStore(VectorStoreTestMixin, TestCase):
+    """Test indexing through the signals and searching."""
+
+    def test_saved_documents_are_searchable(self):
+        """Test that the most similar document comes first."""
+        self.create_documents()
+
+        results = vector_store.search("how many pages should my cover letter be", k=2)
+
+        self.assertEqual(results[0].title, "Cover letters")
+        self.assertGreater(results[0].score, 0)
+
+    def test_update_replaces_the_row(self):
+        """Test that saving a document again re-embeds it in place."""
+        document, = self.create_documents(PASSAGES[:1])
+
+        document.content = "Negotiate salary after receiving the written offer."
+        document.save()
+
+        self.assertEqual(len(vector_store.get_vector_store()), 1)
+        self.assertEqual(vector_store.search("salary offer negotiation")[0].id, document.id)
+        self.assertEqual(vector_store.search("bullet led built designed"), [])
+
+    def test_deleted_documents_are_not_returned(self):
+        """Test that deleting a document tombstones its row."""
+        documents = self.create_documents()
+
+        documents[1].delete()
+
+        self.assertNotIn("Cover letters", [d.title for d in vector_store.search("cover letter hiring manager")])
+        self.assertEqual(len(vector_store.get_vector_store()), 2)
+
+    def test_store_grows_and_is_shared_through_disk(self):
+        """Test that the memmap grows past its capacity and another instance sees every row."""
+        with patch.object(vector_store, 'INITIAL_CAPACITY', 2):
+            documents = self.create_documents([(f"Tip {i}", f"career tip number{i} about interviews") for i in range(9)])
+
+        other = vector_store.VectorStore(self.store_dir.name)
+        self.assertEqual(len(other), 9)
+        self.assertEqual(other.search_ids("career tip number7", 1)[0][0], documents[7].id)
+
+    def test_disabled_store_skips_indexing(self):
+        """Test that nothing is written unless the store is enabled."""
+        with override_settings(RESUMAX_VECTOR_STORE={'ENABLED': False, 'PATH': self.store_dir.name}):
+            self.create_documents()
+
+        self.assertEqual(vector_store.search("cover letter"), [])
+
+    def test_rebuild_command_indexes_in_batches(self):
+        """Test that the rebuild command re-embeds documents created without the signals."""
+        Document.objects.bulk_create([Document(title=title, content=content) for title, content in PASSAGES])
+        out = io.StringIO()
+
+        call_command('rebuild_vector_store', batch_size=2, stdout=out)
+
+        self.assertIn("Indexed 3 documents", out.getvalue())
+        self.assertEqual(vector_store.search("publications academic CV")[0].title, "Academic CV")
+
+
+def stub_document(doc_id, text):
+    return SimpleNamespace(id=doc_id, get_vectordb_text=lambda: text)
+
+
+class TestVectorStoreAcrossProcesses(TestCase):
+    """Test stores sharing one directory, as the workers of a deployment do."""
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.store_dir.cleanup)
+
+    def open_store(self):
+        # Each instance has its own thread lock and lock file handle, like another process
+        return vector_store.VectorStore(self.store_dir.name, dimensions=256)
+
+    def test_concurrent_upserts_keep_every_row(self):
+        """Test that upserts from two stores are serialized instead of overwriting each other."""
+        stores = [self.open_store(), self.open_store()]
+
+        def index(store, first_id):
+            for doc_id in range(first_id, first_id + 25):
+                store.upsert([stub_document(doc_id, f"interview tip {doc_id}")])
+
+        workers = [threading.Thread(target=index, args=(store, 1 + 100 * n)) for n, store in enumerate(stores)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(self.open_store()), 50)
+
+    def test_searches_see_a_rebuild_from_another_store(self):
+        """Test that a rebuild is swapped in whole and picked up by searching stores."""
+        reader, writer = self.open_store(), self.open_store()
+        writer.upsert([stub_document(1, "cover letter length one page")])
+        self.assertEqual(reader.search_ids("cover letter", 1)[0][0], 1)
+
+        writer.rebuild([[stub_document(2, "academic publications list")]])
+
+        self.assertEqual(reader.search_ids("academic publications", 1)[0][0], 2)
+        self.assertEqual(len(reader), 1)
+        self.assertEqual(sorted(p.name for p in pathlib.Path(self.store_dir.name).iterdir() if p.is_dir()),
+                         ['data-2'])
+
+    def test_failed_rebuild_keeps_the_index(self):
+        """Test that an interrupted rebuild leaves the current files in place."""
+        store = self.open_store()
+        store.upsert([stub_document(1, "cover letter length one page")])
+
+        def batches():
+            yield [stub_document(2, "academic publications list")]
+            raise RuntimeError("database went away")
+
+        with self.assertRaises(RuntimeError):
+            store.rebuild(batches())
+
+        self.assertEqual(self.open_store().search_ids("cover letter", 1)[0][0], 1)
+        self.assertEqual(len(store), 1)
+
+    def test_rebuild_replaces_an_older_layout(self):
+        """Test that a store written by an older version is only searchable after a rebuild."""
+        path = pathlib.Path(self.store_dir.name)
+        (path / 'meta.json').write_text(json.dumps({'version': 1, 'dimensions': 256, 'count': 0, 'capacity': 0}))
+        (path / 'ids.npy').write_bytes(b"")
+        store = self.open_store()
+        with self.assertRaises(ValueError):
+            store.search_ids("cover letter", 1)
+
+        store.rebuild([[stub_document(1, "cover letter length one page")]])
+
+        self.assertEqual(store.search_ids("cover letter", 1)[0][0], 1)
+        self.assertFalse((path / 'ids.npy').exists())
+
+
+class StubClient:
+    """Stub genai client that records the history of every chat it creates."""
+
+    def __init__(self):
+        self.histories = []
+        self.chats = SimpleNamespace(create=self._create_chat)
+
+    def _create_chat(self, model, config, history):
+        self.histories.append(history)
+        return SimpleNamespace()
+
+
+class TestPassagesInPrompts(VectorStoreTestMixin, TransactionTestCase):
+    """Test that prompts carry the relevant passages instead of the base knowledge PDFs."""
+
+    def test_relevant_passages_replace_base_knowledge(self):
+        """Test that no base knowledge is uploaded and the matching passage is attached."""
+        self.create_documents()
+        gemini_model.reset_chat_session_store()
+        self.addCleanup(gemini_model.reset_chat_session_store)
+        client = StubClient()
+
+        with patch.object(gemini_model, '_get_genai_client', return_value=client), \
+                patch.object(gemini_model, 'upload_base_knowledge_files') as upload:
+            chat, parts = asyncio.run(gemini_model._prepare_chat_message(
+                "Which action verb should start a bullet?", None, thread_id=1, user_id=1
+            ))
+
+        upload.assert_not_called()
+        self.assertEqual(client.histories[0], [])
+        self.assertIn("--- Action verbs ---", parts[-1].text)
+        self.assertNotIn("Academic CV", parts[-1].text)